@@ -0,0 +1,80 @@
+"""
+Per-merchant analytics response cache
+
+Each merchant has a version counter in the shared cache; every cached
+analytics payload is stored with the version it was computed at and served
+only while that version is current. Transaction changes and webhook
+deliveries bump the version, so polling dashboards get a cached payload until
+something actually changes. A lookup is one MGET of the version and the entry.
+Concurrent misses for the same entry are coalesced: one caller computes while
+the others wait briefly for its result.
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(user_id):
+    return f"analytics_version:{user_id}"
+
+
+def _entry_key(user_id, name):
+    return f"analytics:{user_id}:{name}"
+
+
+class AnalyticsCache:
+    """Versioned, single-flight cache for per-user analytics payloads"""
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'ANALYTICS_CACHE_TTL', 300)
+        self.lock_timeout = getattr(settings, 'ANALYTICS_CACHE_LOCK_TIMEOUT', 10)
+        self.poll_interval = 0.05
+
+    def get_or_compute(self, user_id, name, compute, ttl=None):
+        """Cached payload for (user, name), computing it at most once per version"""
+        version_key, entry_key = _version_key(user_id), _entry_key(user_id, name)
+        lock_key = f"{entry_key}:lock"
+        deadline = time.monotonic() + self.lock_timeout
+
+        while True:
+            try:
+                found = cache.get_many([version_key, entry_key])
+            except Exception as e:
+                logger.error(f"Error reading analytics cache: {str(e)}")
+                return compute()
+            version = found.get(version_key, 0)
+            entry = found.get(entry_key)
+            if entry is not None and entry['version'] == version:
+                return entry['data']
+
+            # Only the caller that takes the lock computes; others poll for its result
+            if cache.add(lock_key, 1, timeout=self.lock_timeout) or time.monotonic() >= deadline:
+                break
+            # The lock vanishing without a fresh entry means the holder failed (or the cache is down)
+            if cache.get(lock_key) is None:
+                break
+            time.sleep(self.poll_interval)
+
+        try:
+            data = compute()
+            cache.set(entry_key, {'version': version, 'data': data}, ttl or self.ttl)
+            return data
+        finally:
+            cache.delete(lock_key)
+
+    def bump(self, user_id):
+        """Invalidate every cached payload for the user"""
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            # No version yet; entries were stored against the implicit version 0
+            if not cache.add(_version_key(user_id), 1, timeout=None):
+                cache.incr(_version_key(user_id))
+        except Exception as e:
+            logger.error(f"Error bumping analytics cache version: {str(e)}")
+
+
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,137 @@
+"""
+Single-pass transaction analytics for the merchant dashboard
+
+Scalar metrics come from one aggregate() with filtered aggregates; the
+provider, status and daily breakdowns come from one GROUPING SETS query on
+PostgreSQL (one grouped query per breakdown elsewhere). Both read the
+merchant's TransactionDailyStats rows rather than raw transactions, and both
+results are kept in the per-merchant analytics cache. REST and GraphQL both
+read from DashboardAnalytics.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from functools import cached_property
+from django.db import connection
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .analytics_models import TransactionDailyStats
+from .analytics_cache import analytics_cache
+
+DAILY_VOLUME_DAYS = 30
+
+BREAKDOWN_SQL = """
+    SELECT GROUPING(provider) AS by_provider, GROUPING(status) AS by_status,
+           provider, status, day, SUM(count) AS count, SUM(amount_sum) AS volume
+    FROM (
+        SELECT provider, status, count, amount_sum,
+               CASE WHEN date >= %s THEN date END AS day
+        FROM transaction_daily_stats
+        WHERE user_id = %s AND count > 0
+    ) AS merchant_stats
+    GROUP BY GROUPING SETS ((provider), (status), (day))
+"""
+
+
+class DashboardAnalytics:
+    """Lazily computed dashboard metrics for one merchant"""
+
+    def __init__(self, user, daily_days=DAILY_VOLUME_DAYS):
+        self.user = user
+        self.daily_days = daily_days
+        self.daily_since = timezone.localdate() - timedelta(days=daily_days)
+
+    def _stats(self):
+        return TransactionDailyStats.objects.filter(user=self.user, count__gt=0).order_by()
+
+    @cached_property
+    def summary(self):
+        return analytics_cache.get_or_compute(self.user.id, 'dashboard_summary', self._summary)
+
+    @cached_property
+    def breakdowns(self):
+        return analytics_cache.get_or_compute(self.user.id, f'dashboard_breakdowns:{self.daily_days}', self._breakdowns)
+
+    def _summary(self):
+        """Totals over the merchant's whole history in one aggregate query"""
+        completed = Q(status='completed')
+        totals = self._stats().aggregate(
+            total_transactions=Sum('count'),
+            completed_count=Sum('count', filter=completed),
+            failed_count=Sum('count', filter=Q(status='failed')),
+            pending_count=Sum('count', filter=Q(status='pending')),
+            total_volume=Sum('amount_sum', filter=completed),
+            total_fees=Sum('fee_sum', filter=completed),
+        )
+        for name in ('total_transactions', 'completed_count', 'failed_count', 'pending_count'):
+            totals[name] = totals[name] or 0
+        totals['total_volume'] = totals['total_volume'] or Decimal('0')
+        totals['total_fees'] = totals['total_fees'] or Decimal('0')
+        completed_count = totals['completed_count']
+        totals['average_transaction_size'] = (
+            (totals['total_volume'] / completed_count).quantize(Decimal('0.01')) if completed_count else Decimal('0')
+        )
+        total = totals['total_transactions']
+        totals['success_rate'] = (completed_count / total) * 100 if total else 0.0
+        return totals
+
+    def _breakdowns(self):
+        """by_provider, by_status and daily volume (last N days), all statuses"""
+        if connection.vendor == 'postgresql':
+            return self._grouping_sets_breakdowns()
+        return self._grouped_breakdowns()
+
+    def _grouping_sets_breakdowns(self):
+        by_provider, by_status, daily = {}, {}, {}
+        with connection.cursor() as cursor:
+            cursor.execute(BREAKDOWN_SQL, [self.daily_since, self.user.id])
+            for grouped_provider, grouped_status, provider, status, day, count, volume in cursor.fetchall():
+                # GROUPING() is 0 for the column the row is grouped by
+                if not grouped_provider:
+                    by_provider[provider] = {'count': count, 'volume': volume or Decimal('0')}
+                elif not grouped_status:
+                    by_status[status] = count
+                elif day is not None:
+                    daily[day] = {'count': count, 'volume': volume or Decimal('0')}
+        return {
+            'by_provider': by_provider,
+            'by_status': by_status,
+            'daily_volume': [dict(date=day, **daily[day]) for day in sorted(daily)],
+        }
+
+    def _grouped_breakdowns(self):
+        stats = self._stats()
+        providers = stats.values('provider').annotate(count=Sum('count'), volume=Sum('amount_sum'))
+        statuses = stats.values('status').annotate(count=Sum('count'))
+        days = stats.filter(date__gte=self.daily_since).values('date').annotate(
+            count=Sum('count'), volume=Sum('amount_sum')
+        ).order_by('date')
+        return {
+            'by_provider': {
+                p['provider']: {'count': p['count'], 'volume': p['volume'] or Decimal('0')} for p in providers
+            },
+            'by_status': {s['status']: s['count'] for s in statuses},
+            'daily_volume': [
+                {'date': d['date'], 'count': d['count'], 'volume': d['volume'] or Decimal('0')}
+                for d in days
+            ],
+        }
+
+    def dashboard(self):
+        """REST dashboard payload"""
+        summary = self.summary
+        breakdowns = self.breakdowns
+        return {
+            'total_transactions': summary['total_transactions'],
+            'total_volume': float(summary['total_volume']),
+            'success_rate': summary['success_rate'],
+            'average_transaction_size': float(summary['average_transaction_size']),
+            'transactions_by_provider': {
+                provider: {'count': data['count'], 'volume': float(data['volume'])}
+                for provider, data in breakdowns['by_provider'].items()
+            },
+            'transactions_by_status': breakdowns['by_status'],
+            'daily_volume': [
+                {'date': str(d['date']), 'volume': float(d['volume']), 'count': d['count']}
+                for d in breakdowns['daily_volume']
+            ],
+        }
@@ -0,0 +1,105 @@
+"""
+Pre-aggregated analytics models
+"""
+from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.contrib.auth.models import User
+import uuid
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500)
+LATENCY_FIELDS = tuple(f'latency_le_{bound}' for bound in LATENCY_BUCKETS) + ('latency_gt_2500',)
+
+# Stands in for "no API key" in the bucket uniqueness constraint
+NO_API_KEY = uuid.UUID(int=0)
+
+
+class APIUsageRollup(models.Model):
+    """
+    API request counters per (user, api key, route, method, status class, bucket).
+    Written incrementally by the API log writer at minute granularity and
+    compacted into hour and then day buckets.
+    """
+    GRANULARITY_CHOICES = (
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_usage_rollups')
+    # No DB constraint so deleting a key keeps its usage history
+    api_key = models.ForeignKey(
+        'api.APIKey', on_delete=models.DO_NOTHING, null=True, blank=True,
+        db_constraint=False, related_name='usage_rollups'
+    )
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    route = models.CharField(max_length=255)  # URL route template, not the raw path
+    method = models.CharField(max_length=10)
+    status_class = models.PositiveSmallIntegerField()  # 2 for 2xx, 4 for 4xx, ...
+
+    request_count = models.BigIntegerField(default=0)
+    request_bytes = models.BigIntegerField(default=0)
+    response_bytes = models.BigIntegerField(default=0)
+    response_time_sum = models.FloatField(default=0)  # milliseconds
+    response_time_max = models.FloatField(default=0)  # milliseconds
+
+    latency_le_50 = models.BigIntegerField(default=0)
+    latency_le_100 = models.BigIntegerField(default=0)
+    latency_le_250 = models.BigIntegerField(default=0)
+    latency_le_500 = models.BigIntegerField(default=0)
+    latency_le_1000 = models.BigIntegerField(default=0)
+    latency_le_2500 = models.BigIntegerField(default=0)
+    latency_gt_2500 = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_usage_rollups'
+        constraints = [
+            models.UniqueConstraint(
+                F('user'),
+                Coalesce(F('api_key'), Value(NO_API_KEY), output_field=models.UUIDField()),
+                F('route'),
+                F('method'),
+                F('status_class'),
+                F('granularity'),
+                F('bucket_start'),
+                name='api_usage_rollup_bucket_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'bucket_start'], name='api_usage_user_bucket_idx'),
+            models.Index(fields=['granularity', 'bucket_start'], name='api_usage_gran_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.method} {self.route} {self.granularity}@{self.bucket_start}"
+
+
+class TransactionDailyStats(models.Model):
+    """
+    Transaction counters per (user, day, provider, currency, status).
+    Kept in step with Transaction inside the same database transaction as each
+    create, status/amount change and delete; rebuilt with rebuild_transaction_stats.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_daily_stats')
+    date = models.DateField()
+    provider = models.CharField(max_length=20)
+    currency = models.CharField(max_length=3)
+    status = models.CharField(max_length=20)
+
+    count = models.BigIntegerField(default=0)
+    amount_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    fee_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'transaction_daily_stats'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date', 'provider', 'currency', 'status'],
+                name='transaction_daily_stats_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.date} {self.provider} {self.currency} {self.status}: {self.count}"
@@ -1,7 +1,8 @@
-from django.db.models import Sum, Count, Avg, Q
+from django.db.models import Sum, Q
 from django.utils import timezone
 from datetime import timedelta
-from .models import Transaction, APILog
+from .customer_sketches import CustomerSketchService
+from .analytics_models import TransactionDailyStats, APIUsageRollup, LATENCY_BUCKETS, LATENCY_FIELDS
 
 
 class AnalyticsService:
@@ -9,87 +10,107 @@ class AnalyticsService:
     
     @staticmethod
     def get_transaction_analytics(user, days=30):
-        """Get transaction analytics for the past N days"""
-        start_date = timezone.now() - timedelta(days=days)
+        """Get transaction analytics for the past N days from the daily stats"""
+        stats = AnalyticsService._daily_stats(user, days)
+        completed = Q(status='completed')
         
-        transactions = Transaction.objects.filter(
-            user=user,
-            created_at__gte=start_date
+        totals = stats.aggregate(
+            total_transactions=Sum('count'),
+            total_volume=Sum('amount_sum', filter=completed),
+            total_fees=Sum('fee_sum', filter=completed),
+            successful_count=Sum('count', filter=completed),
+            failed_count=Sum('count', filter=Q(status='failed')),
+            pending_count=Sum('count', filter=Q(status='pending')),
         )
+        successful_count = totals['successful_count'] or 0
+        total_volume = float(totals['total_volume'] or 0)
         
         return {
-            'total_transactions': transactions.count(),
-            'total_volume': float(transactions.filter(status='completed').aggregate(
-                Sum('amount'))['amount__sum'] or 0),
-            'total_fees': float(transactions.filter(status='completed').aggregate(
-                Sum('fee'))['fee__sum'] or 0),
-            'successful_count': transactions.filter(status='completed').count(),
-            'failed_count': transactions.filter(status='failed').count(),
-            'pending_count': transactions.filter(status='pending').count(),
-            'average_amount': float(transactions.filter(status='completed').aggregate(
-                Avg('amount'))['amount__avg'] or 0),
-            'by_provider': AnalyticsService._transactions_by_provider(transactions),
-            'by_currency': AnalyticsService._transactions_by_currency(transactions),
-            'by_status': AnalyticsService._transactions_by_status(transactions),
+            'total_transactions': totals['total_transactions'] or 0,
+            'total_volume': total_volume,
+            'total_fees': float(totals['total_fees'] or 0),
+            'successful_count': successful_count,
+            'failed_count': totals['failed_count'] or 0,
+            'pending_count': totals['pending_count'] or 0,
+            'average_amount': total_volume / successful_count if successful_count else 0.0,
+            'by_provider': AnalyticsService._transactions_by_provider(stats),
+            'by_currency': AnalyticsService._transactions_by_currency(stats),
+            'by_status': AnalyticsService._transactions_by_status(stats),
+            # HyperLogLog estimates; None when the sketches cannot be read
+            'customers': CustomerSketchService.customer_metrics_for_days(user.id, days),
         }
     
     @staticmethod
     def get_api_usage_analytics(user, days=30):
-        """Get API usage analytics"""
+        """Get API usage analytics from the pre-aggregated usage rollups"""
         start_date = timezone.now() - timedelta(days=days)
         
-        logs = APILog.objects.filter(
+        rollups = APIUsageRollup.objects.filter(
             user=user,
-            created_at__gte=start_date
+            bucket_start__gte=start_date
+        )
+        
+        totals = rollups.aggregate(
+            requests=Sum('request_count'),
+            errors=Sum('request_count', filter=Q(status_class__gte=4)),
+            response_time=Sum('response_time_sum'),
+            request_bytes=Sum('request_bytes'),
+            response_bytes=Sum('response_bytes'),
+            **{name: Sum(name) for name in LATENCY_FIELDS},
         )
+        total_requests = totals['requests'] or 0
         
         return {
-            'total_requests': logs.count(),
-            'total_errors': logs.filter(status_code__gte=400).count(),
-            'average_response_time': float(logs.aggregate(Avg('response_time'))['response_time__avg'] or 0),
+            'total_requests': total_requests,
+            'total_errors': totals['errors'] or 0,
+            'average_response_time': (totals['response_time'] or 0) / total_requests if total_requests else 0.0,
             'total_data_transferred': {
-                'request': float(logs.aggregate(Sum('request_size'))['request_size__sum'] or 0),
-                'response': float(logs.aggregate(Sum('response_size'))['response_size__sum'] or 0),
+                'request': float(totals['request_bytes'] or 0),
+                'response': float(totals['response_bytes'] or 0),
+            },
+            'latency_histogram': {
+                label: totals[name] or 0
+                for label, name in zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], LATENCY_FIELDS)
             },
-            'by_endpoint': AnalyticsService._requests_by_endpoint(logs),
-            'by_status_code': AnalyticsService._requests_by_status_code(logs),
-            'by_method': AnalyticsService._requests_by_method(logs),
+            'by_endpoint': AnalyticsService._requests_by_endpoint(rollups),
+            'by_status_code': AnalyticsService._requests_by_status_code(rollups),
+            'by_method': AnalyticsService._requests_by_method(rollups),
         }
     
     @staticmethod
     def get_revenue_analytics(user, days=30):
-        """Get revenue analytics"""
-        start_date = timezone.now() - timedelta(days=days)
+        """Get revenue analytics from the daily stats"""
+        stats = AnalyticsService._daily_stats(user, days).filter(status='completed')
         
-        transactions = Transaction.objects.filter(
-            user=user,
-            status='completed',
-            created_at__gte=start_date
-        )
-        
-        total_fees = float(transactions.aggregate(Sum('fee'))['fee__sum'] or 0)
+        totals = stats.aggregate(gross_volume=Sum('amount_sum'), platform_fees=Sum('fee_sum'))
         
         return {
-            'gross_volume': float(transactions.aggregate(Sum('amount'))['amount__sum'] or 0),
-            'platform_fees': total_fees,
-            'top_currencies': AnalyticsService._top_currencies(transactions, limit=5),
-            'daily_revenue': AnalyticsService._daily_revenue(transactions),
+            'gross_volume': float(totals['gross_volume'] or 0),
+            'platform_fees': float(totals['platform_fees'] or 0),
+            'top_currencies': AnalyticsService._top_currencies(stats, limit=5),
+            'daily_revenue': AnalyticsService._daily_revenue(stats),
         }
     
     @staticmethod
-    def _transactions_by_provider(transactions):
+    def _daily_stats(user, days):
+        """TransactionDailyStats rows for the last N days (today included)"""
+        start_date = timezone.localdate() - timedelta(days=days)
+        return TransactionDailyStats.objects.filter(user=user, date__gte=start_date, count__gt=0).order_by()
+    
+    @staticmethod
+    def _transactions_by_provider(stats):
         """Group transactions by provider"""
         return {
             item['provider']: item['count']
-            for item in transactions.values('provider').annotate(count=Count('id'))
+            for item in stats.values('provider').annotate(count=Sum('count'))
         }
     
     @staticmethod
-    def _transactions_by_currency(transactions):
+    def _transactions_by_currency(stats):
         """Group transactions by currency"""
-        data = transactions.values('currency').annotate(
-            count=Count('id'),
-            total=Sum('amount')
+        data = stats.values('currency').annotate(
+            count=Sum('count'),
+            total=Sum('amount_sum')
         )
         return [{
             'currency': item['currency'],
@@ -98,42 +119,42 @@ class AnalyticsService:
         } for item in data]
     
     @staticmethod
-    def _transactions_by_status(transactions):
+    def _transactions_by_status(stats):
         """Group transactions by status"""
         return {
             item['status']: item['count']
-            for item in transactions.values('status').annotate(count=Count('id'))
+            for item in stats.values('status').annotate(count=Sum('count'))
         }
     
     @staticmethod
-    def _requests_by_endpoint(logs):
-        """Group API requests by endpoint"""
+    def _requests_by_endpoint(rollups):
+        """Group API requests by route template"""
         return {
-            item['endpoint']: item['count']
-            for item in logs.values('endpoint').annotate(count=Count('id')).order_by('-count')[:10]
+            item['route']: item['count']
+            for item in rollups.values('route').annotate(count=Sum('request_count')).order_by('-count')[:10]
         }
     
     @staticmethod
-    def _requests_by_status_code(logs):
-        """Group requests by status code"""
+    def _requests_by_status_code(rollups):
+        """Group requests by status class (2xx, 4xx, ...)"""
         return {
-            str(item['status_code']): item['count']
-            for item in logs.values('status_code').annotate(count=Count('id'))
+            f"{item['status_class']}xx": item['count']
+            for item in rollups.values('status_class').annotate(count=Sum('request_count'))
         }
     
     @staticmethod
-    def _requests_by_method(logs):
+    def _requests_by_method(rollups):
         """Group requests by HTTP method"""
         return {
             item['method']: item['count']
-            for item in logs.values('method').annotate(count=Count('id'))
+            for item in rollups.values('method').annotate(count=Sum('request_count'))
         }
     
     @staticmethod
-    def _top_currencies(transactions, limit=5):
+    def _top_currencies(stats, limit=5):
         """Get top currencies by volume"""
-        data = transactions.values('currency').annotate(
-            total=Sum('amount')
+        data = stats.values('currency').annotate(
+            total=Sum('amount_sum')
         ).order_by('-total')[:limit]
         return [{
             'currency': item['currency'],
@@ -141,14 +162,11 @@ class AnalyticsService:
         } for item in data]
     
     @staticmethod
-    def _daily_revenue(transactions):
+    def _daily_revenue(stats):
         """Get daily revenue breakdown"""
-        from django.db.models.functions import TruncDate
-        data = transactions.annotate(
-            date=TruncDate('created_at')
-        ).values('date').annotate(
-            total_fees=Sum('fee'),
-            transaction_count=Count('id')
+        data = stats.values('date').annotate(
+            total_fees=Sum('fee_sum'),
+            transaction_count=Sum('count')
         ).order_by('date')
         return [{
             'date': item['date'].isoformat(),
@@ -2,15 +2,21 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Avg, Count, Q
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDate
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
-from .models import Transaction, APILog
+from .analytics_models import APIUsageRollup
+from .analytics_service import AnalyticsService
 from .webhook_models import WebhookSubscription
+from .analytics_cache import analytics_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+MAX_ANALYTICS_DAYS = 365
+
 
 class AnalyticsViewSet(viewsets.ViewSet):
     """System analytics and health metrics"""
@@ -22,92 +28,102 @@ class AnalyticsViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['get'], url_path='system-health')
     def system_health(self, request):
-        """Get system health metrics"""
+        """Get system health metrics; ?days= sets the uptime window (default 7)"""
         user = request.user
-        today = timezone.now().date()
-        
-        # Webhook delivery rate (last 24 hours)
-        # Use new webhook system
-        active_webhooks = WebhookSubscription.objects.filter(
-            user=user,
-            active=True
-        ).count()
+        days = self.get_days(request, default=7)
+        return Response(analytics_cache.get_or_compute(
+            user.id, f'system_health:{days}', lambda: self.get_system_health(user, days),
+            ttl=settings.ANALYTICS_LIVE_CACHE_TTL
+        ))
+    
+    def get_days(self, request, default):
+        """Window length from ?days=, clamped to 1..MAX_ANALYTICS_DAYS"""
+        try:
+            days = int(request.query_params.get('days', default))
+        except (TypeError, ValueError):
+            days = default
+        return max(1, min(days, MAX_ANALYTICS_DAYS))
+    
+    def get_system_health(self, user, days=7):
+        """Compute system health metrics; today's API traffic makes this short-lived"""
         
-        # Calculate delivery rate from webhook subscriptions
-        total_deliveries = sum([
-            ws.success_count + ws.failure_count 
-            for ws in WebhookSubscription.objects.filter(user=user)
-        ])
-        successful_deliveries = sum([
-            ws.success_count 
-            for ws in WebhookSubscription.objects.filter(user=user)
-        ])
+        # Webhook delivery rate from the subscription counters, summed in the database
+        deliveries = WebhookSubscription.objects.filter(user=user).aggregate(
+            successful=Sum('success_count'),
+            failed=Sum('failure_count'),
+        )
+        successful_deliveries = deliveries['successful'] or 0
+        total_deliveries = successful_deliveries + (deliveries['failed'] or 0)
         
         webhook_delivery_rate = (successful_deliveries / total_deliveries * 100) if total_deliveries > 0 else 100.0
         
-        # Average response time from API logs
-        api_logs = APILog.objects.filter(
+        # Today's API traffic from the usage rollups
+        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        usage = APIUsageRollup.objects.filter(
             user=user,
-            created_at__date=today
+            bucket_start__gte=today_start
+        ).aggregate(
+            total=Sum('request_count'),
+            failed=Sum('request_count', filter=Q(status_class__gte=4)),  # 4xx, 5xx
+            response_time=Sum('response_time_sum'),
         )
         
-        avg_response = api_logs.aggregate(
-            avg_time=Avg('response_time')
-        )['avg_time'] or 150  # Default 150ms
-        
         # Total requests today
-        total_requests = api_logs.count()
+        total_requests = usage['total'] or 0
         
         # Failed requests (4xx, 5xx status codes)
-        failed_requests = api_logs.filter(
-            Q(status_code__gte=400)
-        ).count()
+        failed_requests = usage['failed'] or 0
         
-        # System uptime (based on successful transactions)
-        total_txns = Transaction.objects.filter(
-            user=user,
-            created_at__gte=timezone.now() - timedelta(days=7)
-        ).count()
+        # Average response time
+        avg_response = usage['response_time'] / total_requests if total_requests else 150  # Default 150ms
         
-        successful_txns = Transaction.objects.filter(
-            user=user,
-            status='completed',
-            created_at__gte=timezone.now() - timedelta(days=7)
-        ).count()
+        # System uptime (based on successful transactions), from the daily transaction stats
+        txns = AnalyticsService._daily_stats(user, days).aggregate(
+            total=Sum('count'),
+            successful=Sum('count', filter=Q(status='completed')),
+        )
         
-        uptime_percentage = (successful_txns / total_txns * 100) if total_txns > 0 else 99.9
+        uptime_percentage = ((txns['successful'] or 0) / txns['total'] * 100) if txns['total'] else 99.9
         
-        return Response({
+        return {
             'webhook_delivery_rate': webhook_delivery_rate,
             'avg_response_time': int(avg_response),
             'uptime_percentage': uptime_percentage,
             'total_requests_today': total_requests,
             'failed_requests_today': failed_requests,
-        })
+        }
     
     @action(detail=False, methods=['get'], url_path='performance')
     def performance(self, request):
-        """Get performance metrics over time"""
+        """Get daily performance metrics; ?days= sets the window (default 7)"""
         user = request.user
+        days = self.get_days(request, default=7)
         
-        # Last 7 days performance
-        performance_data = []
-        for i in range(7):
-            date = timezone.now().date() - timedelta(days=i)
-            
-            day_logs = APILog.objects.filter(
+        # One grouped range query over the usage rollups, whatever the window
+        today = timezone.now().date()
+        start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        daily = {
+            item['date']: item
+            for item in APIUsageRollup.objects.filter(
                 user=user,
-                created_at__date=date
-            )
-            
-            avg_response = day_logs.aggregate(
-                avg_time=Avg('response_time')
-            )['avg_time'] or 0
+                bucket_start__gte=start
+            ).annotate(
+                date=TruncDate('bucket_start')
+            ).values('date').annotate(
+                total=Sum('request_count'),
+                failed=Sum('request_count', filter=Q(status_class__gte=4)),
+                response_time=Sum('response_time_sum'),
+            ).order_by()
+        }
+        
+        performance_data = []
+        for i in range(days):
+            date = today - timedelta(days=i)
+            day = daily.get(date, {})
             
-            total_requests = day_logs.count()
-            failed_requests = day_logs.filter(
-                Q(status_code__gte=400)
-            ).count()
+            total_requests = day.get('total') or 0
+            failed_requests = day.get('failed') or 0
+            avg_response = day['response_time'] / total_requests if total_requests else 0
             
             performance_data.append({
                 'date': date.isoformat(),
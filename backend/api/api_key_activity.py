@@ -0,0 +1,118 @@
+"""
+Coalesced API key last_used tracking
+Each authenticated request does a single HSET of key id -> timestamp; a
+periodic task flushes the hash into api_keys with one bulk UPDATE and sends
+at most one api_key_used event per key per flush. A claimed hash is only
+deleted once the UPDATE succeeds; otherwise it is merged back for the next run.
+"""
+import logging
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+LAST_USED_HASH = 'paybridge:api_key_last_used'
+
+
+def record_api_key_used(api_key_id, user_id):
+    """Remember that a key was just used; later uses overwrite earlier ones"""
+    try:
+        get_redis_connection('default').hset(LAST_USED_HASH, str(api_key_id), f"{time.time():.3f}:{user_id}")
+    except Exception as e:
+        logger.error(f"Error recording API key usage: {str(e)}")
+
+
+def _drain():
+    """
+    Atomically take the pending hash so concurrent writes go to a fresh one.
+    Returns (claimed key, usage); the caller deletes or restores the claimed hash.
+    """
+    redis_client = get_redis_connection('default')
+    claimed = f"{LAST_USED_HASH}:flush:{uuid.uuid4().hex}"
+    try:
+        redis_client.rename(LAST_USED_HASH, claimed)
+    except Exception:
+        # RENAME fails when nothing was recorded since the last flush
+        return None, {}
+    pending = redis_client.hgetall(claimed)
+
+    usage = {}
+    for key_id, value in pending.items():
+        if isinstance(key_id, bytes):
+            key_id, value = key_id.decode(), value.decode()
+        timestamp, user_id = value.split(':', 1)
+        usage[key_id] = (datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc), user_id)
+    return claimed, usage
+
+
+def _restore(claimed):
+    """Merge a claimed hash back into the pending one; uses recorded since then are newer and win"""
+    redis_client = get_redis_connection('default')
+    pending = redis_client.hgetall(claimed)
+    pipe = redis_client.pipeline(transaction=True)
+    for key_id, value in pending.items():
+        pipe.hsetnx(LAST_USED_HASH, key_id, value)
+    pipe.delete(claimed)
+    pipe.execute()
+
+
+def _bulk_update(usage):
+    from .models import APIKey
+
+    if connection.vendor == 'postgresql':
+        values_sql = ', '.join(['(%s::uuid, %s::timestamptz)'] * len(usage))
+        params = []
+        for key_id, (last_used, _) in usage.items():
+            params.extend([key_id, last_used])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE api_keys SET last_used = v.last_used "
+                f"FROM (VALUES {values_sql}) AS v(id, last_used) "
+                f"WHERE api_keys.id = v.id "
+                f"AND (api_keys.last_used IS NULL OR api_keys.last_used < v.last_used)",
+                params
+            )
+        return
+
+    for key_id, (last_used, _) in usage.items():
+        APIKey.objects.filter(id=key_id).update(last_used=last_used)
+
+
+def flush_last_used():
+    """Write pending last_used timestamps and notify dashboards; returns keys flushed"""
+    from channels.layers import get_channel_layer
+    from asgiref.sync import async_to_sync
+
+    claimed, usage = _drain()
+    if not usage:
+        return 0
+
+    try:
+        _bulk_update(usage)
+    except Exception:
+        # The UPDATE only moves last_used forward, so the next flush can retry these
+        _restore(claimed)
+        raise
+    get_redis_connection('default').delete(claimed)
+
+    channel_layer = get_channel_layer()
+    if channel_layer:
+        for key_id, (last_used, user_id) in usage.items():
+            try:
+                async_to_sync(channel_layer.group_send)(
+                    f"api_keys_{user_id}",
+                    {
+                        'type': 'api_key_used',
+                        'data': {
+                            'id': key_id,
+                            'last_used': last_used.isoformat(),
+                        }
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Error sending api_key_used event: {str(e)}")
+
+    return len(usage)
@@ -0,0 +1,156 @@
+"""
+Two-tier cache for API key authentication
+
+key_hash -> key id, owner and compiled IP whitelist, held in a per-process LRU in front
+of the shared Django cache (Redis). A hot key authenticates without touching
+the database. Saving or deleting a key invalidates both tiers; other processes
+drop their local copy through a Redis pub/sub channel, and the short local TTL
+bounds staleness if a message is missed.
+
+Shared entries carry the key's generation token, read before the database
+load. Invalidation replaces the token, so an entry loaded before a revoke and
+written after it is never served.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from .ip_whitelist import IPWhitelist
+from .local_cache import USER_FIELDS, LocalCache, instance_from_values
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'paybridge:api_key_invalidations'
+
+# Fields loaded onto the cached instances; anything else is deferred
+API_KEY_FIELDS = ('id', 'user_id', 'name', 'key_hash', 'status', 'ip_whitelist')
+
+
+def _cache_key(key_hash):
+    return f"api_key_auth:{key_hash}"
+
+
+def _generation_key(key_hash):
+    return f"api_key_auth_gen:{key_hash}"
+
+
+class APIKeyCache:
+    """Resolves active API keys by hash with a local LRU and a shared cache"""
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'API_KEY_CACHE_TTL', 300)
+        self.local_ttl = getattr(settings, 'API_KEY_CACHE_LOCAL_TTL', 30)
+        self.local_maxsize = getattr(settings, 'API_KEY_CACHE_LOCAL_MAXSIZE', 10000)
+        self._local = LocalCache(self.local_maxsize, self.local_ttl)
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_pid = None
+
+    def get(self, key_hash):
+        """Return (user, api_key) for an active key, or raise APIKey.DoesNotExist"""
+        self._ensure_listener()
+        entry = self._local.get(key_hash)
+        if entry is None:
+            generation = self._local.generation
+            entry = self._compile(self._shared_get(key_hash))
+            self._local.set(key_hash, entry, generation=generation)
+        return self._build(entry)
+
+    def _shared_get(self, key_hash):
+        """Shared cache entry for the key, loaded from the database on a miss"""
+        entry_key, generation_key = _cache_key(key_hash), _generation_key(key_hash)
+        values = cache.get_many([entry_key, generation_key])
+        entry, generation = values.get(entry_key), values.get(generation_key)
+        if entry is not None and generation is not None and entry.get('generation') == generation:
+            return entry
+
+        if generation is None:
+            cache.add(generation_key, uuid.uuid4().hex, self.ttl * 2)
+            generation = cache.get(generation_key)
+        entry = self._load(key_hash)
+        entry['generation'] = generation
+        cache.set(entry_key, entry, self.ttl)
+        return entry
+
+    def invalidate(self, key_hash, broadcast=True):
+        if not key_hash:
+            return
+        self._local.pop(key_hash)
+        try:
+            # Outlives any entry written with the old token by a load that raced with this
+            cache.set(_generation_key(key_hash), uuid.uuid4().hex, self.ttl * 2)
+            cache.delete(_cache_key(key_hash))
+            if broadcast:
+                from django_redis import get_redis_connection
+                get_redis_connection('default').publish(INVALIDATION_CHANNEL, json.dumps({'key_hash': key_hash}))
+        except Exception as e:
+            logger.error(f"Error invalidating API key cache: {str(e)}")
+
+    def _load(self, key_hash):
+        from .models import APIKey
+
+        api_key = APIKey.objects.select_related('user').get(key_hash=key_hash, status='active')
+        return {
+            'api_key': {
+                'id': str(api_key.id),
+                'user_id': api_key.user_id,
+                'name': api_key.name,
+                'key_hash': api_key.key_hash,
+                'status': api_key.status,
+                'ip_whitelist': api_key.ip_whitelist or [],
+            },
+            'user': {field: getattr(api_key.user, field) for field in USER_FIELDS},
+        }
+
+    def _compile(self, entry):
+        return {
+            'api_key': entry['api_key'],
+            'user': entry['user'],
+            'ip_whitelist': IPWhitelist(entry['api_key']['ip_whitelist']),
+        }
+
+    def _build(self, entry):
+        """Fresh model instances per request; unloaded fields are deferred, so save() is safe"""
+        from .models import APIKey
+
+        user = instance_from_values(User, entry['user'])
+        api_key = instance_from_values(APIKey, dict(entry['api_key'], id=uuid.UUID(entry['api_key']['id'])))
+        api_key.user = user
+        api_key.compiled_ip_whitelist = entry['ip_whitelist']
+        return user, api_key
+
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self._listener_pid == pid and self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener_pid == pid and self._listener is not None and self._listener.is_alive():
+                return
+            self._listener_pid = pid
+            self._local.clear()
+            self._listener = threading.Thread(target=self._listen, name='api-key-cache-invalidation', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        from django_redis import get_redis_connection
+
+        while True:
+            try:
+                pubsub = get_redis_connection('default').pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    data = json.loads(message['data'])
+                    self._local.pop(data.get('key_hash'))
+            except Exception as e:
+                logger.error(f"API key cache invalidation listener error: {str(e)}")
+                # Local entries may have missed invalidations while disconnected
+                self._local.clear()
+                time.sleep(5)
+
+
+api_key_cache = APIKeyCache()
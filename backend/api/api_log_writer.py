@@ -0,0 +1,119 @@
+"""
+Buffered APILog writer
+Request logs are queued in memory and written by a background thread with
+bulk_create, keeping the insert off the request path. Each batch is also
+folded into the per-minute usage rollups.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class APILogWriter:
+    """Bounded in-process queue of APILog rows flushed in batches"""
+
+    def __init__(self, maxlen=None, batch_size=None, flush_interval=None):
+        self.maxlen = maxlen or getattr(settings, 'API_LOG_BUFFER_MAXLEN', 10000)
+        self.batch_size = batch_size or getattr(settings, 'API_LOG_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(settings, 'API_LOG_FLUSH_INTERVAL', 2.0)
+        # deque(maxlen) drops the oldest entry when full
+        self.buffer = deque(maxlen=self.maxlen)
+        self.dropped = 0
+        self.written = 0
+        self.sampled_out = 0
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def enqueue(self, **fields):
+        """Queue one APILog row; never blocks or touches the database"""
+        if len(self.buffer) >= self.maxlen:
+            self.dropped += 1
+        self.buffer.append(fields)
+        self._ensure_thread()
+        if len(self.buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each worker process starts its own
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._flush_lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='api-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception as e:
+                logger.error(f"API log flusher error: {str(e)}")
+
+    def flush(self):
+        """Write everything currently buffered"""
+        from .models import APILog
+        from .usage_rollups import UsageRollupService
+
+        with self._flush_lock:
+            while self.buffer:
+                batch = []
+                while self.buffer and len(batch) < self.batch_size:
+                    batch.append(self.buffer.popleft())
+                # Unsampled requests (weight 0) only feed the rollups
+                stored = [fields for fields in batch if fields.get('sample_weight', 1)]
+                try:
+                    APILog.objects.bulk_create(self._build_logs(APILog, stored))
+                    self.written += len(stored)
+                    self.sampled_out += len(batch) - len(stored)
+                except Exception as e:
+                    self.dropped += len(stored)
+                    logger.error(f"Error writing {len(stored)} API logs: {str(e)}")
+                try:
+                    UsageRollupService.record_logs(batch)
+                except Exception as e:
+                    logger.error(f"Error updating usage rollups: {str(e)}")
+
+    def _build_logs(self, APILog, batch):
+        """Swap route and user agent strings for interned ids"""
+        from .log_dictionary import route_ids, user_agent_ids
+        from .usage_rollups import UNMATCHED_ROUTE
+
+        routes = route_ids.get_ids({fields.get('route') or UNMATCHED_ROUTE for fields in batch})
+        agents = user_agent_ids.get_ids({fields['user_agent'] for fields in batch if fields.get('user_agent')})
+        logs = []
+        for fields in batch:
+            fields = dict(fields)
+            route = fields.pop('route', None) or UNMATCHED_ROUTE
+            user_agent = fields.pop('user_agent', '')
+            logs.append(APILog(
+                route_id=routes[route],
+                user_agent_id=agents.get(user_agent) if user_agent else None,
+                **fields
+            ))
+        return logs
+
+    def stats(self):
+        return {
+            'buffered': len(self.buffer),
+            'written': self.written,
+            'sampled_out': self.sampled_out,
+            'dropped': self.dropped,
+        }
+
+
+api_log_writer = APILogWriter()
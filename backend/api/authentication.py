@@ -1,6 +1,9 @@
 from rest_framework.authentication import TokenAuthentication
 from rest_framework import exceptions
 from .models import APIKey
+from .api_key_cache import api_key_cache
+from .api_key_activity import record_api_key_used
+from .ip_whitelist import get_client_ip
 from django.utils import timezone
 import hashlib
 
@@ -38,25 +41,23 @@ class APIKeyAuthentication(TokenAuthentication):
         key_hash = hashlib.sha256(key.encode()).hexdigest()
         
         try:
-            api_key_obj = APIKey.objects.select_related('user').get(
-                key_hash=key_hash, 
-                status='active'
-            )
+            user, api_key_obj = api_key_cache.get(key_hash)
         except APIKey.DoesNotExist:
             raise exceptions.AuthenticationFailed('Invalid or expired API key')
         
-        # Check IP whitelist if configured
-        if api_key_obj.ip_whitelist:
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted')
+        
+        # Check IP whitelist (addresses and CIDR ranges) if configured
+        if api_key_obj.compiled_ip_whitelist:
             client_ip = self.get_client_ip(request)
-            if client_ip not in api_key_obj.ip_whitelist:
+            if client_ip not in api_key_obj.compiled_ip_whitelist:
                 raise exceptions.AuthenticationFailed('IP not whitelisted')
         
-        # Update last_used timestamp asynchronously to avoid blocking
-        from .tasks import update_api_key_last_used
-        update_api_key_last_used.delay(str(api_key_obj.id))
+        # Coalesced in Redis and flushed by flush_api_key_last_used
+        record_api_key_used(api_key_obj.id, user.id)
         
-        return (api_key_obj.user, api_key_obj)
+        return (user, api_key_obj)
     
     def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        return x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
+        return get_client_ip(request)
@@ -2,7 +2,8 @@ from decimal import Decimal
 from django.utils import timezone
 from django.db.models import Sum, Count
 from datetime import timedelta
-from .models import Invoice, UsageMetric, APILog, Transaction
+from .models import Invoice, UsageMetric, Transaction
+from .analytics_models import APIUsageRollup
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,10 +21,14 @@ class BillingService:
     @staticmethod
     def calculate_monthly_usage(user, billing_period_start, billing_period_end):
         """Calculate monthly usage metrics"""
-        api_logs = APILog.objects.filter(
+        # Rollups count every request; api_logs rows are sampled and only used for analytics
+        api_usage = APIUsageRollup.objects.filter(
             user=user,
-            created_at__gte=billing_period_start,
-            created_at__lte=billing_period_end
+            bucket_start__gte=billing_period_start,
+            bucket_start__lte=billing_period_end
+        ).aggregate(
+            calls=Sum('request_count'),
+            request_bytes=Sum('request_bytes'),
         )
         
         transactions = Transaction.objects.filter(
@@ -34,9 +39,9 @@ class BillingService:
         )
         
         # Calculate totals
-        api_calls = api_logs.count()
+        api_calls = api_usage['calls'] or 0
         transaction_volume = float(transactions.aggregate(Sum('amount'))['amount__sum'] or 0)
-        data_transferred = float(api_logs.aggregate(Sum('request_size'), Sum('response_size')).get('request_size__sum', 0) or 0)
+        data_transferred = float(api_usage['request_bytes'] or 0)
         
         return {
             'api_calls': api_calls,
@@ -2,6 +2,7 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
+from .principal_cache import principal_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -72,9 +73,9 @@ class DashboardConsumer(AsyncWebsocketConsumer):
     
     @database_sync_to_async
     def get_user(self, user_id):
-        """Get user from database"""
+        """Get user through the principal cache"""
         try:
-            return User.objects.get(id=user_id)
+            return principal_cache.get(user_id)
         except User.DoesNotExist:
             return None
     
@@ -275,9 +276,9 @@ class APIKeyConsumer(AsyncWebsocketConsumer):
     
     @database_sync_to_async
     def get_user(self, user_id):
-        """Get user from database"""
+        """Get user through the principal cache"""
         try:
-            return User.objects.get(id=user_id)
+            return principal_cache.get(user_id)
         except User.DoesNotExist:
             return None
     
@@ -0,0 +1,143 @@
+"""
+Unique customer and card counts from Redis HyperLogLog sketches
+
+Each new transaction adds its customer email (and tokenized payment method,
+when there is one) to the merchant's sketch for that day. Counts over any
+date range are a single PFCOUNT across the day keys, which merges them on
+the fly, so the cost depends on the number of days asked for and not on the
+number of transactions. Redis sketches have a standard error of 0.81%.
+
+Returning customers are customers in the range who also transacted in the
+CUSTOMER_SKETCH_LOOKBACK_DAYS before it, estimated by inclusion-exclusion:
+|range & prior| = |range| + |prior| - |range | prior|. The error of that
+estimate is relative to the union, so it is larger for small overlaps.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+SKETCH_KEY_PREFIX = 'paybridge:hll'
+
+# Standard error of a Redis HyperLogLog (16384 registers): 1.04 / sqrt(16384)
+STANDARD_ERROR = 0.0081
+
+
+def _key(kind, user_id, day):
+    return f"{SKETCH_KEY_PREFIX}:{kind}:{user_id}:{day:%Y%m%d}"
+
+
+def _keys(kind, user_id, start, end):
+    """Day keys for start..end inclusive"""
+    return [_key(kind, user_id, start + timedelta(days=offset)) for offset in range((end - start).days + 1)]
+
+
+def sketch_members(customer_email, payment_method_id):
+    """kind -> element for one transaction"""
+    members = {}
+    if customer_email:
+        members['customers'] = customer_email.strip().lower()
+    if payment_method_id:
+        members['cards'] = payment_method_id
+    return members
+
+
+class CustomerSketchService:
+    """Per-merchant, per-day HyperLogLog sketches of customers and cards"""
+
+    @staticmethod
+    def add_many(entries):
+        """
+        Add (user_id, created_at, customer_email, payment_method_id) tuples,
+        one PFADD per sketch key, in a single pipeline
+        """
+        grouped = {}
+        for user_id, created_at, customer_email, payment_method_id in entries:
+            day = timezone.localdate(created_at)
+            for kind, member in sketch_members(customer_email, payment_method_id).items():
+                grouped.setdefault(_key(kind, user_id, day), (day, set()))[1].add(member)
+        if not grouped:
+            return 0
+
+        # Day sketches expire a fixed time after their day, however late they were written
+        retention = timedelta(days=settings.CUSTOMER_SKETCH_RETENTION_DAYS + 1)
+        pipeline = get_redis_connection('default').pipeline(transaction=False)
+        for key, (day, members) in grouped.items():
+            expires = timezone.make_aware(datetime.combine(day + retention, time.min))
+            pipeline.pfadd(key, *members)
+            pipeline.expireat(key, int(expires.timestamp()))
+        pipeline.execute()
+        return len(grouped)
+
+    @staticmethod
+    def record_transaction(transaction):
+        try:
+            CustomerSketchService.add_many([(
+                transaction.user_id, transaction.created_at,
+                transaction.customer_email, transaction.stripe_payment_method_id,
+            )])
+        except Exception as e:
+            logger.error(f"Error recording customer sketches: {str(e)}")
+
+    @staticmethod
+    def customer_metrics(user_id, start, end):
+        """Unique customers/cards and the returning customer rate for a date range"""
+        lookback = getattr(settings, 'CUSTOMER_SKETCH_LOOKBACK_DAYS', 90)
+        range_keys = _keys('customers', user_id, start, end)
+        prior_keys = _keys('customers', user_id, start - timedelta(days=lookback), start - timedelta(days=1))
+
+        pipeline = get_redis_connection('default').pipeline(transaction=False)
+        pipeline.pfcount(*range_keys)
+        pipeline.pfcount(*prior_keys)
+        pipeline.pfcount(*range_keys, *prior_keys)
+        pipeline.pfcount(*_keys('cards', user_id, start, end))
+        unique_customers, prior_customers, either, unique_cards = pipeline.execute()
+
+        returning = min(unique_customers, max(0, unique_customers + prior_customers - either))
+        return {
+            'unique_customers': unique_customers,
+            'unique_cards': unique_cards,
+            'returning_customers': returning,
+            'repeat_customer_rate': returning / unique_customers if unique_customers else 0.0,
+            'standard_error': STANDARD_ERROR,
+        }
+
+    @staticmethod
+    def customer_metrics_for_days(user_id, days):
+        """customer_metrics for the last N days (today included), or None if Redis is unavailable"""
+        today = timezone.localdate()
+        try:
+            return CustomerSketchService.customer_metrics(user_id, today - timedelta(days=days), today)
+        except Exception as e:
+            logger.error(f"Error reading customer sketches: {str(e)}")
+            return None
+
+    @staticmethod
+    def backfill(user_id=None, since=None, batch_size=5000):
+        """Re-add existing transactions to their sketches; adding is idempotent. Returns rows read"""
+        from .models import Transaction
+
+        # Days past retention would expire as soon as they were written
+        oldest = timezone.localdate() - timedelta(days=settings.CUSTOMER_SKETCH_RETENTION_DAYS)
+        since = max(since, oldest) if since is not None else oldest
+
+        transactions = Transaction.objects.filter(created_at__date__gte=since).order_by()
+        if user_id is not None:
+            transactions = transactions.filter(user_id=user_id)
+
+        rows, batch = 0, []
+        for entry in transactions.values_list(
+            'user_id', 'created_at', 'customer_email', 'stripe_payment_method_id'
+        ).iterator(chunk_size=batch_size):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                CustomerSketchService.add_many(batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            CustomerSketchService.add_many(batch)
+            rows += len(batch)
+        return rows
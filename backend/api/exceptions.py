@@ -43,3 +43,15 @@ class SubscriptionRequired(PayBridgeException):
     status_code = status.HTTP_402_PAYMENT_REQUIRED
     default_detail = 'Subscription required for this action'
     default_code = 'subscription_required'
+
+
+class AnalyticsWindowTooLarge(PayBridgeException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Too many transactions in this window for distribution analytics; request fewer days'
+    default_code = 'analytics_window_too_large'
+
+
+class AnalyticsBusy(PayBridgeException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Distribution analytics are busy; retry shortly'
+    default_code = 'analytics_busy'
@@ -0,0 +1,51 @@
+"""
+Offline data export models
+"""
+from django.db import models
+from django.contrib.auth.models import User
+import uuid
+
+
+class DataExportJob(models.Model):
+    """
+    Background export of a user's transactions or API logs over a time range.
+    Files are written to the 'exports' storage under <job id>/ and listed in `manifest`.
+    """
+    DATASET_CHOICES = (
+        ('transactions', 'Transactions'),
+        ('api_logs', 'API Logs'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='data_export_jobs')
+    dataset = models.CharField(max_length=20, choices=DATASET_CHOICES)
+    start = models.DateTimeField()
+    end = models.DateTimeField()  # exclusive
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    row_count = models.BigIntegerField(default=0)
+    file_count = models.IntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+    manifest = models.JSONField(default=dict, blank=True)
+    error_message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'data_export_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.dataset} {self.start:%Y-%m-%d}..{self.end:%Y-%m-%d} ({self.status})"
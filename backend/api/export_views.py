@@ -0,0 +1,110 @@
+"""
+Data export job API
+Merchants request a Parquet export of a transaction or API log range, poll the
+job, then download the manifest and the files it lists.
+"""
+import logging
+from rest_framework import viewsets, mixins, status, filters
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from django.http import FileResponse, HttpResponseRedirect
+from django.urls import reverse
+from urllib.parse import urlencode
+from .export_models import DataExportJob
+from .serializers import DataExportJobSerializer
+from .parquet_export import MANIFEST_NAME, ParquetExportService, export_storage, parquet_available
+from .tasks import run_data_export
+
+logger = logging.getLogger(__name__)
+
+
+class DataExportJobViewSet(mixins.CreateModelMixin,
+                           mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Background Parquet exports
+    POST /api/v1/data-exports/ {"dataset": "transactions", "start": "...", "end": "..."}
+    """
+    serializer_class = DataExportJobSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['created_at']
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        return DataExportJob.objects.filter(user=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        if not parquet_available():
+            return Response({
+                'error': 'Parquet export is not available on this server'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(user=request.user)
+        
+        run_data_export.delay(str(job.id))
+        
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+    def destroy(self, request, *args, **kwargs):
+        job = self.get_object()
+        # A job stuck in running after its worker died can still be deleted
+        if job.status == 'running' and not ParquetExportService.is_stale(job):
+            return Response({
+                'error': 'Export is still running'
+            }, status=status.HTTP_409_CONFLICT)
+        ParquetExportService.delete_files(job)
+        job.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['get'])
+    def manifest(self, request, pk=None):
+        """Manifest of a completed export, with a download URL per file"""
+        job = self.get_object()
+        if job.status != 'completed':
+            return Response({
+                'error': f"Export is {job.status}"
+            }, status=status.HTTP_409_CONFLICT)
+        
+        download_url = request.build_absolute_uri(reverse('data-export-download', args=[job.id]))
+        manifest = dict(job.manifest)
+        manifest['files'] = [
+            {**entry, 'url': f"{download_url}?{urlencode({'file': entry['path']})}"}
+            for entry in manifest.get('files', [])
+        ]
+        return Response(manifest)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Download one file listed in the manifest
+        GET /api/v1/data-exports/{id}/download/?file=transactions/date=2026-01-31/part-00000.parquet
+        """
+        job = self.get_object()
+        if job.status != 'completed':
+            return Response({
+                'error': f"Export is {job.status}"
+            }, status=status.HTTP_409_CONFLICT)
+        
+        # Only paths listed in the manifest are served
+        relative = request.query_params.get('file', MANIFEST_NAME)
+        name = ParquetExportService.file_name(job, relative)
+        storage = export_storage()
+        if name is None or not storage.exists(name):
+            return Response({
+                'error': 'File not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            storage.path(name)
+        except NotImplementedError:
+            # Remote storage (S3): redirect to a short-lived signed URL instead of proxying the file
+            return HttpResponseRedirect(storage.url(name))
+        
+        filename = f"{job.id}-{relative.replace('/', '_')}"
+        return FileResponse(storage.open(name, 'rb'), as_attachment=True, filename=filename)
@@ -0,0 +1,117 @@
+"""
+Slim read path for high-volume list endpoints
+
+FastSerializer compiles a ModelSerializer once into a list of
+(output name, values() lookup, converter) triples, taking each converter
+from the serializer's own bound field so the output is identical to DRF's.
+Fields whose representation is the database value itself get no converter.
+List views then read plain dicts with values(), only for the listed
+columns, and skip model instantiation and per-row serializer setup.
+
+FastListMixin plugs this into a viewset's list(). Large columns named in
+`fast_list_deferred` are left out unless requested with
+?include=<field>[,<field>...]; `fast_list_includes` are model columns
+outside the serializer that may be requested the same way.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+# DRF fields whose to_representation returns database values unchanged
+_PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.FloatField,
+)
+
+
+def _converter(field):
+    """Per-value converter for a bound serializer field, or None to pass values through"""
+    if isinstance(field, PrimaryKeyRelatedField):
+        # DRF represents these with the pk itself (PKOnlyObject optimization)
+        return None
+    if isinstance(field, serializers.JSONField):
+        return field.to_representation if field.binary else None
+    if isinstance(field, serializers.ChoiceField):
+        return None if all(isinstance(key, str) for key in field.choices) else field.to_representation
+    if isinstance(field, _PASSTHROUGH_FIELDS):
+        return None
+    return field.to_representation
+
+
+class FastSerializer:
+    """Precompiled values() row -> representation for a ModelSerializer"""
+
+    def __init__(self, serializer_class, exclude=(), extra=()):
+        model = serializer_class.Meta.model
+        serializer = serializer_class()
+        self.fields = []
+
+        for name, field in serializer.fields.items():
+            if name in exclude or field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} cannot be serialized from values()")
+            if isinstance(field, PrimaryKeyRelatedField):
+                lookup = model._meta.get_field(field.source).attname
+            else:
+                lookup = '__'.join(field.source_attrs)
+            self.fields.append((name, lookup, _converter(field)))
+
+        for name in extra:
+            self.fields.append((name, name, None))
+
+        self.columns = tuple(dict.fromkeys(lookup for _, lookup, _ in self.fields))
+
+    def to_representation(self, row):
+        data = {}
+        for name, lookup, converter in self.fields:
+            value = row[lookup]
+            data[name] = converter(value) if converter is not None and value is not None else value
+        return data
+
+    def many(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+class FastListMixin:
+    """list() over values() rows serialized by a FastSerializer"""
+    include_query_param = 'include'
+    fast_list_deferred = ()
+    fast_list_includes = ()
+
+    _fast_serializers = {}
+
+    def get_list_includes(self, request):
+        requested = request.query_params.get(self.include_query_param, '')
+        allowed = set(self.fast_list_deferred) | set(self.fast_list_includes)
+        return frozenset(name.strip() for name in requested.split(',') if name.strip() in allowed)
+
+    def get_fast_serializer(self, includes):
+        key = (type(self), includes)
+        fast_serializer = self._fast_serializers.get(key)
+        if fast_serializer is None:
+            fast_serializer = FastSerializer(
+                self.get_serializer_class(),
+                exclude=set(self.fast_list_deferred) - includes,
+                extra=[name for name in self.fast_list_includes if name in includes],
+            )
+            self._fast_serializers[key] = fast_serializer
+        return fast_serializer
+
+    def get_list_columns(self, fast_serializer):
+        """values() columns: the serialized ones plus the pk and any keyset ordering fields"""
+        model = self.get_queryset().model
+        ordering = getattr(self, 'keyset_orderings', ())
+        return tuple(dict.fromkeys((*fast_serializer.columns, model._meta.pk.name, *ordering)))
+
+    def list(self, request, *args, **kwargs):
+        fast_serializer = self.get_fast_serializer(self.get_list_includes(request))
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.values(*self.get_list_columns(fast_serializer))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast_serializer.many(page))
+        return Response(fast_serializer.many(queryset))
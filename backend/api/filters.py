@@ -0,0 +1,38 @@
+"""
+Index-backed transaction search
+
+DRF's SearchFilter ORs an icontains per field for every term, which scans a
+merchant's whole history. TransactionSearchFilter takes cheaper paths first:
+- a term that is one of the merchant's references returns that transaction
+  (unique index lookup)
+- terms shorter than a trigram match references and emails by prefix
+- longer terms match anywhere, as before
+Prefix and substring matches are case-insensitive and served on Postgres by
+the pg_trgm GIN indexes on UPPER(reference) and UPPER(customer_email)
+(migration 0020).
+"""
+from django.db.models import Q
+from rest_framework import filters
+
+# pg_trgm needs a full trigram to use its index for '%term%'; shorter terms
+# are matched as 'term%', whose padded leading trigrams it can use
+MIN_TRIGRAM_TERM = 3
+
+
+class TransactionSearchFilter(filters.SearchFilter):
+    """?search= over reference and customer_email"""
+
+    def term_filter(self, queryset, term):
+        if queryset.filter(reference=term).exists():
+            return Q(reference=term)
+        if len(term) < MIN_TRIGRAM_TERM:
+            return Q(reference__istartswith=term) | Q(customer_email__istartswith=term)
+        return Q(reference__icontains=term) | Q(customer_email__icontains=term)
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        for term in terms:
+            queryset = queryset.filter(self.term_filter(queryset, term))
+        return queryset
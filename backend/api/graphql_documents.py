@@ -0,0 +1,207 @@
+"""
+Persisted queries and parsed-document cache for the GraphQL endpoint
+
+Clients may send the Apollo automatic persisted query extension
+({"persistedQuery": {"version": 1, "sha256Hash": ...}}) instead of the query
+text. Query texts sent by authenticated clients are registered in the shared
+cache by hash once they have parsed and validated, and each process keeps an LRU of parsed and validated documents, so a repeated
+dashboard query skips parsing and validation entirely. Validation includes
+depth and cost limits, which are therefore also computed once per document.
+"""
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from graphql import GraphQLError, parse, specified_rules, validate
+from graphql.language import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, InlineFragmentNode, IntValueNode,
+    OperationDefinitionNode, VariableNode,
+)
+from graphql.type import get_named_type, is_interface_type, is_object_type
+from graphql.validation import ValidationRule
+from graphene.validation import depth_limit_validator
+from .local_cache import LocalCache
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def _apq_key(sha256_hash):
+    return f"graphql_apq:{sha256_hash}"
+
+
+def resolve_persisted_query(query, extensions):
+    """
+    (query text, whether to register it) for a request, looking up persisted
+    query hashes. Registration waits until the text has validated.
+    """
+    persisted = (extensions or {}).get('persistedQuery') if isinstance(extensions, dict) else None
+    if not persisted:
+        return query, False
+
+    if persisted.get('version') != 1:
+        raise GraphQLError('Unsupported persisted query version', extensions={'code': 'PERSISTED_QUERY_NOT_SUPPORTED'})
+    sha256_hash = persisted.get('sha256Hash')
+    if not sha256_hash:
+        raise GraphQLError('Persisted query hash is missing', extensions={'code': 'BAD_REQUEST'})
+
+    if query:
+        if query_hash(query) != sha256_hash:
+            raise GraphQLError('Provided sha256Hash does not match query', extensions={'code': 'BAD_REQUEST'})
+        return query, True
+
+    query = document_cache.get_query(sha256_hash) or cache.get(_apq_key(sha256_hash))
+    if not query:
+        raise GraphQLError('PersistedQueryNotFound', extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})
+    return query, False
+
+
+def register_persisted_query(query):
+    """Store a validated query text under its hash for every process"""
+    cache.set(_apq_key(query_hash(query)), query, getattr(settings, 'GRAPHQL_APQ_TTL', 86400))
+
+
+def _page_size(field_node, named_type, variables):
+    """
+    How many times a field's selection is resolved (page size for connections).
+    `variables` is None while a document is validated, before variable values
+    are known; a variable `first` then counts as the default page size and is
+    costed again with its value at execution.
+    """
+    for argument in field_node.arguments:
+        if argument.name.value == 'first':
+            value = argument.value
+            if isinstance(value, VariableNode):
+                value = (variables or {}).get(value.name.value)
+                if value is None:
+                    return DEFAULT_PAGE_SIZE
+            elif isinstance(value, IntValueNode):
+                value = value.value
+            try:
+                return max(0, min(int(value), MAX_PAGE_SIZE))
+            except (TypeError, ValueError):
+                return DEFAULT_PAGE_SIZE
+    if named_type.name.endswith('Connection'):
+        return DEFAULT_PAGE_SIZE
+    return 1
+
+
+def _selection_cost(selection_set, parent_type, schema, fragments, visited, variables=None):
+    cost = 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = selection.name.value
+            if name.startswith('__') or parent_type is None:
+                continue
+            field = parent_type.fields.get(name)
+            if field is None:
+                continue
+            named_type = get_named_type(field.type)
+            child_cost = 0
+            if selection.selection_set and (is_object_type(named_type) or is_interface_type(named_type)):
+                child_cost = _selection_cost(selection.selection_set, named_type, schema, fragments, visited, variables)
+            cost += 1 + _page_size(selection, named_type, variables) * child_cost
+        elif isinstance(selection, InlineFragmentNode):
+            fragment_type = parent_type
+            if selection.type_condition is not None:
+                fragment_type = schema.get_type(selection.type_condition.name.value)
+            cost += _selection_cost(selection.selection_set, fragment_type, schema, fragments, visited, variables)
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            fragment = fragments.get(name)
+            if fragment is None or name in visited:
+                continue
+            fragment_type = schema.get_type(fragment.type_condition.name.value)
+            cost += _selection_cost(fragment.selection_set, fragment_type, schema, fragments, visited | {name}, variables)
+    return cost
+
+
+def _fragments(document):
+    return {
+        definition.name.value: definition
+        for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)
+    }
+
+
+def _cost_error(node, cost, max_cost):
+    name = node.name.value if node.name else 'anonymous'
+    return GraphQLError(f"'{name}' has an estimated cost of {cost}, above the maximum of {max_cost}.", node)
+
+
+def query_cost_limit_rule(max_cost):
+    """
+    Reject operations whose estimated cost exceeds `max_cost`. Each field costs 1;
+    a field's selection is multiplied by its page size (`first`, or the default
+    page size for connections), so wide pages of nested objects add up.
+    """
+    class QueryCostLimitRule(ValidationRule):
+        def enter_operation_definition(self, node: OperationDefinitionNode, *args):
+            schema = self.context.schema
+            cost = _selection_cost(
+                node.selection_set, schema.get_root_type(node.operation), schema,
+                _fragments(self.context.document), frozenset(),
+            )
+            if cost > max_cost:
+                self.report_error(_cost_error(node, cost, max_cost))
+
+    return QueryCostLimitRule
+
+
+class DocumentCache:
+    """LRU of parsed, validated GraphQL documents keyed by query hash"""
+
+    def __init__(self):
+        self.maxsize = getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 500)
+        self.max_cost = getattr(settings, 'GRAPHQL_MAX_COST', 5000)
+        self.rules = tuple(specified_rules) + (
+            depth_limit_validator(max_depth=getattr(settings, 'GRAPHQL_MAX_DEPTH', 10)),
+            query_cost_limit_rule(self.max_cost),
+        )
+        self._documents = LocalCache(self.maxsize)
+
+    def get_query(self, sha256_hash):
+        entry = self._documents.get(sha256_hash)
+        return entry[0] if entry else None
+
+    def get(self, schema, query):
+        """(document, errors) for a query; only documents that validate are cached"""
+        sha256_hash = query_hash(query)
+        entry = self._documents.get(sha256_hash)
+        if entry is not None:
+            return entry[1], []
+
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return None, [e]
+        errors = validate(schema, document, self.rules)
+        if errors:
+            return None, errors
+
+        self._documents.set(sha256_hash, (query, document))
+        return document, []
+
+    def check_cost(self, schema, document, operation, variables):
+        """
+        Cost error for an operation given its variable values, or None. Only
+        operations with variables can cost more than they did at validation.
+        """
+        if operation is None or not operation.variable_definitions:
+            return None
+        values = {}
+        for definition in operation.variable_definitions:
+            if isinstance(definition.default_value, IntValueNode):
+                values[definition.variable.name.value] = definition.default_value.value
+        values.update(variables or {})
+        cost = _selection_cost(
+            operation.selection_set, schema.get_root_type(operation.operation), schema,
+            _fragments(document), frozenset(), values,
+        )
+        return _cost_error(operation, cost, self.max_cost) if cost > self.max_cost else None
+
+
+document_cache = DocumentCache()
@@ -0,0 +1,132 @@
+"""
+Per-request GraphQL data loading helpers
+
+ModelLoader batches foreign key lookups: keys announced with want() (or any
+key missed by load()) are fetched together in one query the first time a
+resolver needs one of them, and every loaded row is memoized for the rest of
+the request. Loaders live on the request, so nothing is shared across users.
+queryset_for_selection() derives only()/select_related() from the fields a
+query actually selects.
+"""
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+from django.contrib.auth.models import User
+from django.core.exceptions import FieldDoesNotExist
+
+USER_LOADER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name')
+
+
+class ModelLoader:
+    """Batched, memoized primary key lookups for one model"""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._cache = {}
+        self._pending = set()
+
+    def prime(self, instance):
+        self._cache[instance.pk] = instance
+
+    def want(self, keys):
+        """Announce keys that are about to be loaded so they share one query"""
+        self._pending.update(key for key in keys if key is not None and key not in self._cache)
+
+    def load(self, key):
+        if key is None:
+            return None
+        if key not in self._cache:
+            self._pending.add(key)
+            pending, self._pending = self._pending, set()
+            found = self.queryset.in_bulk(list(pending))
+            for pending_key in pending:
+                self._cache[pending_key] = found.get(pending_key)
+        return self._cache[key]
+
+
+class RequestLoaders:
+    """Loaders for one GraphQL request"""
+
+    def __init__(self, user):
+        self.users = ModelLoader(User.objects.only(*USER_LOADER_FIELDS))
+        # Merchants only ever see their own rows, so the owner is usually already known
+        if user is not None and user.is_authenticated:
+            self.users.prime(user)
+
+
+def get_loaders(info):
+    """The request's loaders, created on first use"""
+    context = info.context
+    loaders = getattr(context, '_graphql_loaders', None)
+    if loaders is None:
+        loaders = RequestLoaders(getattr(context, 'user', None))
+        context._graphql_loaders = loaders
+    return loaders
+
+
+def _collect_selections(selection_set, fragments, into):
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = to_snake_case(selection.name.value)
+            into[name] = selection.selection_set
+        elif isinstance(selection, InlineFragmentNode):
+            _collect_selections(selection.selection_set, fragments, into)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = fragments.get(selection.name.value)
+            if fragment is not None:
+                _collect_selections(fragment.selection_set, fragments, into)
+    return into
+
+
+def selected_fields(info, path=()):
+    """
+    snake_case name -> nested selection set (or None) for the current field,
+    or for the objects under `path` (e.g. ('edges', 'node') for a connection)
+    """
+    selection_sets = [node.selection_set for node in info.field_nodes if node.selection_set is not None]
+    for name in path:
+        nested = []
+        for selection_set in selection_sets:
+            child = _collect_selections(selection_set, info.fragments, {}).get(name)
+            if child is not None:
+                nested.append(child)
+        selection_sets = nested
+
+    selections = {}
+    for selection_set in selection_sets:
+        _collect_selections(selection_set, info.fragments, selections)
+    return selections
+
+
+def queryset_for_selection(queryset, info, select_related=(), path=(), always=()):
+    """
+    Restrict `queryset` to the columns the query selects (plus `always`).
+    Forward relations named in `select_related` are joined when selected;
+    other relations only load their key column and are left to a ModelLoader.
+    """
+    model = queryset.model
+    selections = selected_fields(info, path)
+    only, joins = {model._meta.pk.name, *always}, []
+
+    for name, nested in selections.items():
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if not field.concrete:
+            continue
+        if field.is_relation and name in select_related and nested is not None:
+            joins.append(name)
+            related_pk = field.related_model._meta.pk.name
+            only.add(f"{name}__{related_pk}")
+            for nested_name in _collect_selections(nested, info.fragments, {}):
+                try:
+                    if field.related_model._meta.get_field(nested_name).concrete:
+                        only.add(f"{name}__{nested_name}")
+                except FieldDoesNotExist:
+                    continue
+        else:
+            only.add(name)
+
+    if joins:
+        queryset = queryset.select_related(*joins)
+    return queryset.only(*only)
@@ -1,9 +1,13 @@
-from graphene_django.views import GraphQLView
+import json
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast
+from django.http import HttpResponseNotAllowed
 from django.contrib.auth.models import AnonymousUser
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .principal_cache import CachedJWTAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from .graphql_documents import document_cache, register_persisted_query, resolve_persisted_query
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -12,7 +16,7 @@ class AuthenticatedGraphQLView(GraphQLView):
     
     def dispatch(self, request, *args, **kwargs):
         # Try to authenticate using JWT
-        jwt_auth = JWTAuthentication()
+        jwt_auth = CachedJWTAuthentication()
         
         try:
             # Get the authorization header
@@ -35,3 +39,62 @@ class AuthenticatedGraphQLView(GraphQLView):
             request.user = AnonymousUser()
         
         return super().dispatch(request, *args, **kwargs)
+    
+    def get_extensions(self, request, data):
+        """Request extensions (persisted query hash) from the body or query string"""
+        extensions = request.GET.get('extensions') or (data.get('extensions') if isinstance(data, dict) else None)
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                extensions = None
+        return extensions
+    
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        """Execute from the parsed-document cache, resolving persisted query hashes first"""
+        try:
+            query, register = resolve_persisted_query(query, self.get_extensions(request, data))
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+        
+        if not query:
+            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+        
+        document, errors = document_cache.get(self.schema.graphql_schema, query)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+        
+        # Only validated documents from signed-in clients go into the shared cache
+        if register and request.user.is_authenticated:
+            register_persisted_query(query)
+        
+        operation_ast = get_operation_ast(document, operation_name)
+        if (
+            request.method.lower() == 'get'
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'], f"Can only perform a {operation_ast.operation.value} operation from a POST request."
+            ))
+        
+        # Variable page sizes were costed at the default page size during validation
+        cost_error = document_cache.check_cost(self.schema.graphql_schema, document, operation_ast, variables)
+        if cost_error:
+            return ExecutionResult(data=None, errors=[cost_error])
+        
+        try:
+            return execute(
+                self.schema.graphql_schema,
+                document,
+                root_value=self.get_root_value(request),
+                context_value=self.get_context(request),
+                variable_values=variables,
+                operation_name=operation_name,
+                middleware=self.get_middleware(request),
+                execution_context_class=self.execution_context_class,
+            )
+        except Exception as e:
+            return ExecutionResult(errors=[e])
@@ -0,0 +1,104 @@
+"""
+CIDR-aware IP matching
+Whitelists are compiled into one binary prefix trie per address family, so a
+lookup walks at most prefix-length bits regardless of how many entries there are.
+"""
+import ipaddress
+import logging
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Trie node layout: [zero child, one child, terminal]
+_ZERO, _ONE, _TERMINAL = 0, 1, 2
+
+
+class IPWhitelist:
+    """Compiled set of IP addresses and networks (IPv4 and IPv6)"""
+
+    def __init__(self, entries=()):
+        self._roots = {4: [None, None, False], 6: [None, None, False]}
+        self._size = 0
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        try:
+            network = ipaddress.ip_network(str(entry).strip(), strict=False)
+        except ValueError:
+            logger.warning(f"Ignoring invalid IP whitelist entry: {entry}")
+            return
+        node = self._roots[network.version]
+        address = int(network.network_address)
+        width = network.max_prefixlen
+        for depth in range(network.prefixlen):
+            bit = (address >> (width - 1 - depth)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, False]
+            node = node[bit]
+        node[_TERMINAL] = True
+        self._size += 1
+
+    def __contains__(self, ip):
+        try:
+            address = ipaddress.ip_address(str(ip).strip())
+        except ValueError:
+            return False
+        # ::ffff:a.b.c.d should match IPv4 entries
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        node = self._roots[address.version]
+        value = int(address)
+        width = address.max_prefixlen
+        for depth in range(width):
+            if node[_TERMINAL]:
+                return True
+            node = node[(value >> (width - 1 - depth)) & 1]
+            if node is None:
+                return False
+        return node[_TERMINAL]
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __len__(self):
+        return self._size
+
+
+_trusted_proxies = None
+
+
+def _is_ip(value):
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+def get_trusted_proxies():
+    global _trusted_proxies
+    if _trusted_proxies is None:
+        _trusted_proxies = IPWhitelist(getattr(settings, 'TRUSTED_PROXIES', []))
+    return _trusted_proxies
+
+
+def get_client_ip(request):
+    """
+    Client address, honouring X-Forwarded-For only when the request came
+    through a trusted proxy. The header is read right to left, skipping our
+    own proxies, so a client cannot spoof its address by prepending entries.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR')
+    trusted = get_trusted_proxies()
+    if not remote_addr or remote_addr not in trusted:
+        return remote_addr
+
+    forwarded = [
+        address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+        if _is_ip(address.strip())
+    ]
+    for address in reversed(forwarded):
+        if address not in trusted:
+            return address
+    return forwarded[0] if forwarded else remote_addr
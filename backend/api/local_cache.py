@@ -0,0 +1,72 @@
+"""
+In-process caches in front of Redis and the database
+
+LocalCache is a thread-safe LRU whose entries expire a fixed time after they
+are set. Fills that race with an invalidation pass the `generation` they read
+before loading, and set() drops them if anything was invalidated since.
+instance_from_values rebuilds model instances from cached field values.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Fields loaded onto cached User instances; anything else is deferred
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def instance_from_values(model, data):
+    """Instance with only `data` loaded; from_db wants values in concrete field order"""
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in data]
+    return model.from_db('default', field_names, [data[name] for name in field_names])
+
+
+class LocalCache:
+    """LRU of up to `maxsize` entries, each kept for `ttl` seconds (None: until evicted)"""
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every pop/clear; a fill that started before one is not kept
+        self._invalidations = 0
+
+    @property
+    def generation(self):
+        return self._invalidations
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return default
+            if item[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Store `value` unless `generation` is given and an invalidation has happened since"""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            if generation is not None and generation != self._invalidations:
+                return
+            self._entries[key] = (time.monotonic() + ttl if ttl is not None else float('inf'), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._invalidations += 1
+            item = self._entries.pop(key, None)
+        return item[1] if item is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
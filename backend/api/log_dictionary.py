@@ -0,0 +1,47 @@
+"""
+Interned strings for API logs
+Route templates and user agents are stored once in lookup tables; APILog rows
+reference them by id. Ids are cached in-process so writes rarely need a lookup.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InternCache:
+    """Maps strings to lookup-table ids, creating rows the first time a value is seen"""
+
+    def __init__(self, model_name, field, max_entries=10000):
+        self.model_name = model_name
+        self.field = field
+        self.max_entries = max_entries
+        self._ids = {}
+
+    @property
+    def model(self):
+        from django.apps import apps
+        return apps.get_model('api', self.model_name)
+
+    def get_ids(self, values):
+        """Return {value: id} for `values`, interning any new ones"""
+        missing = {value for value in values if value not in self._ids}
+        if missing:
+            lookup = f'{self.field}__in'
+            found = dict(self.model.objects.filter(**{lookup: missing}).values_list(self.field, 'id'))
+            new = missing - found.keys()
+            if new:
+                # Another worker may intern the same value concurrently
+                self.model.objects.bulk_create(
+                    [self.model(**{self.field: value}) for value in new],
+                    ignore_conflicts=True
+                )
+                found.update(self.model.objects.filter(**{lookup: new}).values_list(self.field, 'id'))
+            # User agents are client-controlled, so keep the cache bounded
+            if len(self._ids) + len(found) > self.max_entries:
+                self._ids.clear()
+            self._ids.update(found)
+        return {value: self._ids.get(value) for value in values}
+
+
+route_ids = InternCache('APIRoute', 'template', max_entries=2000)
+user_agent_ids = InternCache('UserAgent', 'user_agent')
@@ -0,0 +1,133 @@
+"""
+Partition maintenance for the range-partitioned log tables
+Future partitions are created ahead of time and expired ones are detached and
+dropped, which replaces large retention DELETEs on Postgres.
+"""
+import logging
+import re
+from datetime import timedelta, timezone as dt_timezone
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# table -> partition period (see migration 0014)
+PARTITION_INTERVALS = {
+    'api_logs': 'day',
+    'audit_logs': 'week',
+}
+
+_BOUND_RE = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+def is_partitioned(table):
+    """True when `table` is a partitioned Postgres table"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace",
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    """Return [(name, lower, upper)]; bounds are None for MINVALUE/MAXVALUE/DEFAULT"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [table]
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or '')
+        if match is None:
+            partitions.append((name, None, None))
+            continue
+        lower, upper = match.groups()
+        partitions.append((
+            name,
+            parse_datetime(lower) if lower else None,
+            parse_datetime(upper) if upper else None,
+        ))
+    return partitions
+
+
+def period_start(moment, interval):
+    start = moment.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == 'week':
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def period_length(interval):
+    return timedelta(weeks=1) if interval == 'week' else timedelta(days=1)
+
+
+def ensure_partitions(table, ahead=7):
+    """
+    Create partitions for the current period and `ahead` periods after it.
+    Rows that already landed in the default partition for a new range are
+    moved into it, since Postgres refuses to add a partition otherwise.
+    """
+    interval = PARTITION_INTERVALS[table]
+    step = period_length(interval)
+    covered = [(lower, upper) for _, lower, upper in list_partitions(table) if upper is not None]
+    quote = connection.ops.quote_name
+    created = []
+
+    start = period_start(timezone.now(), interval)
+    for _ in range(ahead + 1):
+        end = start + step
+        overlaps = any((lower is None or lower < end) and start < upper for lower, upper in covered)
+        if not overlaps:
+            name = f"{table}_p{start:%Y%m%d}"
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+                cursor.execute(
+                    f"WITH moved AS (DELETE FROM {quote(table + '_default')} "
+                    f"WHERE created_at >= %s AND created_at < %s RETURNING *) "
+                    f"INSERT INTO {quote(name)} SELECT * FROM moved",
+                    [start, end]
+                )
+                cursor.execute(
+                    f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)",
+                    [start, end]
+                )
+            created.append(name)
+        start = end
+
+    if created:
+        logger.info(f"Created partitions for {table}: {', '.join(created)}")
+    return created
+
+
+def drop_expired_partitions(table, cutoff):
+    """
+    Detach and drop partitions whose whole range is older than `cutoff`. The
+    legacy partition (MINVALUE up to the conversion) goes once its upper bound
+    passes the cutoff; the default partition is never dropped.
+    """
+    quote = connection.ops.quote_name
+    dropped = []
+    for name, _, upper in list_partitions(table):
+        if upper is None or upper > cutoff:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            cursor.execute(f"DROP TABLE {quote(name)}")
+        dropped.append(name)
+
+    if dropped:
+        logger.info(f"Dropped expired partitions for {table}: {', '.join(dropped)}")
+    return dropped
@@ -0,0 +1,85 @@
+"""
+Sampling policy for stored API request logs
+
+Successful requests are kept 1-in-N and stored with sample_weight=N, so
+summing weights gives unbiased totals. Errors and slow requests are always
+kept. N comes from the merchant's plan tier or a per-merchant override, and is
+raised automatically for merchants whose traffic exceeds the per-process row
+budget. Usage rollups still see every request.
+"""
+import logging
+import math
+import random
+import time
+from django.conf import settings
+from .local_cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+PLAN_TIER_CACHE_TTL = 300  # seconds
+_LOCAL_CACHE_MAX_ENTRIES = 10000
+
+# Cached for users without a subscription, whose tier is None
+_NO_TIER = object()
+
+
+class LogSamplingPolicy:
+    """Decides the stored weight of each API request log (0 = not stored)"""
+
+    def __init__(self):
+        self.tier_rates = getattr(settings, 'API_LOG_SAMPLE_RATES', {})
+        self.overrides = {str(key): value for key, value in getattr(settings, 'API_LOG_SAMPLE_OVERRIDES', {}).items()}
+        self.slow_request_ms = getattr(settings, 'API_LOG_SLOW_REQUEST_MS', 1000)
+        self.target_rows_per_minute = getattr(settings, 'API_LOG_TARGET_ROWS_PER_MINUTE', 600)
+        self.max_rate = getattr(settings, 'API_LOG_MAX_SAMPLE_RATE', 1000)
+        # user_id -> plan tier
+        self._tiers = LocalCache(_LOCAL_CACHE_MAX_ENTRIES, PLAN_TIER_CACHE_TTL)
+        # user_id -> [minute, requests seen this minute]
+        self._traffic = {}
+
+    def get_plan_tier(self, user):
+        # JWT principals arrive with the tier already resolved
+        if hasattr(user, 'plan_tier'):
+            return user.plan_tier
+        tier = self._tiers.get(user.id)
+        if tier is not None:
+            return None if tier is _NO_TIER else tier
+        try:
+            tier = user.billing_subscription.plan.tier
+        except Exception:
+            tier = None
+        self._tiers.set(user.id, _NO_TIER if tier is None else tier)
+        return tier
+
+    def _observe(self, user_id):
+        """Count the request and return this process's request rate for the user"""
+        minute = int(time.time() // 60)
+        traffic = self._traffic.get(user_id)
+        if traffic is None or traffic[0] != minute:
+            if len(self._traffic) >= _LOCAL_CACHE_MAX_ENTRIES:
+                self._traffic.clear()
+            traffic = self._traffic[user_id] = [minute, 0]
+        traffic[1] += 1
+        return traffic[1]
+
+    def sample_rate(self, user):
+        """N in 1-in-N for the user's successful requests"""
+        rate = self.overrides.get(str(user.id))
+        if rate is None:
+            rate = self.tier_rates.get(self.get_plan_tier(user), 1)
+        seen = self._observe(user.id)
+        if self.target_rows_per_minute and seen > self.target_rows_per_minute:
+            rate = max(rate, math.ceil(seen / self.target_rows_per_minute))
+        return max(1, min(rate, self.max_rate))
+
+    def sample_weight(self, user, status_code, response_time):
+        """Weight to store the log with, or 0 to skip storing it"""
+        rate = self.sample_rate(user)
+        if status_code >= 400 or response_time >= self.slow_request_ms:
+            return 1
+        if rate == 1 or random.random() * rate < 1:
+            return rate
+        return 0
+
+
+log_sampling_policy = LogSamplingPolicy()
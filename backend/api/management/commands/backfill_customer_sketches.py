@@ -0,0 +1,28 @@
+"""
+Load existing transactions into the unique customer/card sketches
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from api.customer_sketches import CustomerSketchService
+
+
+class Command(BaseCommand):
+    help = 'Backfill HyperLogLog customer and card sketches, optionally for one user and/or from a start date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only backfill this user id')
+        parser.add_argument('--since', help='Only backfill days on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid --since date: {options['since']}")
+
+        rows = CustomerSketchService.backfill(
+            user_id=options['user'], since=since, batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Added {rows} transactions to customer sketches"))
@@ -0,0 +1,151 @@
+"""
+Time the vectorized distribution analytics on a synthetic or real merchant window
+"""
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from api.models import Transaction
+from api.vector_analytics import (
+    TransactionFrame, compute_distribution, STATUSES, PROVIDERS, CURRENCIES, ROW_BYTES
+)
+
+INSERT_BATCH = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark distribution analytics; synthetic frame by default, a real user with --user, '
+        'or synthetic rows loaded back from the transactions table with --table'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000000, help='Synthetic transactions to generate')
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--user', type=int, help='Load this user\'s transactions from the database instead')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--table', action='store_true',
+            help='Insert the synthetic rows for a throwaway user, time loading them, then delete them',
+        )
+
+    def handle(self, *args, **options):
+        since = int((timezone.now() - timedelta(days=options['days'])).timestamp())
+
+        if options['user'] is not None and options['table']:
+            raise CommandError('--user and --table are mutually exclusive')
+
+        if options['user'] is not None:
+            frame = self.timed_load(options['user'], since)
+        elif options['table']:
+            synthetic = self.synthetic_frame(options['rows'], since, options['seed'])
+            user = User.objects.create_user(f'benchmark-{uuid.uuid4().hex[:12]}')
+            try:
+                started = time.perf_counter()
+                self.insert_rows(user, synthetic)
+                self.stdout.write(f"Inserted {len(synthetic)} rows in {time.perf_counter() - started:.2f}s")
+                del synthetic
+                frame = self.timed_load(user.id, since)
+            finally:
+                self.delete_rows(user)
+        else:
+            frame = self.synthetic_frame(options['rows'], since, options['seed'])
+            self.stdout.write(f"Generated {len(frame)} synthetic rows")
+
+        self.stdout.write(
+            f"Frame size: {frame.nbytes / 1024 / 1024:.1f} MiB "
+            f"({ROW_BYTES} bytes/row; 10M rows = {10000000 * ROW_BYTES / 1024 / 1024:.0f} MiB)"
+        )
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            compute_distribution(frame)
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(self.style.SUCCESS(
+            f"compute_distribution over {options['repeat']} runs: "
+            f"min {min(timings) * 1000:.1f} ms, median {float(np.median(timings)) * 1000:.1f} ms"
+        ))
+
+    def timed_load(self, user_id, since):
+        """TransactionFrame.load() with its wall time and peak traced allocation"""
+        tracemalloc.start()
+        try:
+            started = time.perf_counter()
+            frame = TransactionFrame.load(user_id, since)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.stdout.write(
+            f"Loaded {len(frame)} rows in {elapsed:.2f}s, peak {peak / 1024 / 1024:.1f} MiB "
+            f"for a {frame.nbytes / 1024 / 1024:.1f} MiB frame"
+        )
+        return frame
+
+    def insert_rows(self, user, frame):
+        """
+        Write a synthetic frame as transactions. Raw inserts keep the frame's
+        created_at (auto_now_add would overwrite it) and skip the stats signals,
+        which delete_rows skips too.
+        """
+        fields = Transaction._meta.concrete_fields
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(Transaction._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        for start in range(0, len(frame), INSERT_BATCH):
+            end = min(start + INSERT_BATCH, len(frame))
+            batch = []
+            for amount, created, status, provider, currency in zip(
+                frame.amount[start:end].tolist(), frame.created[start:end].tolist(),
+                frame.status[start:end].tolist(), frame.provider[start:end].tolist(),
+                frame.currency[start:end].tolist(),
+            ):
+                created_at = datetime.fromtimestamp(created, tz=dt_timezone.utc)
+                row = Transaction(
+                    user=user,
+                    provider=PROVIDERS[provider],
+                    amount=Decimal(amount) / 100,
+                    currency=CURRENCIES[currency],
+                    status=STATUSES[status],
+                    reference=f'bench_{uuid.uuid4().hex}',
+                    customer_email='benchmark@example.com',
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                batch.append([field.get_db_prep_save(getattr(row, field.attname), connection) for field in fields])
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+
+    def delete_rows(self, user):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(Transaction._meta.db_table)} WHERE user_id = %s',
+                [user.id],
+            )
+            User.objects.filter(pk=user.pk).delete()
+
+    def synthetic_frame(self, rows, since, seed):
+        """Log-normal amounts, uniform timestamps, mostly completed, skewed provider/currency mix"""
+        rng = np.random.default_rng(seed)
+        now = int(timezone.now().timestamp())
+        status_weights = np.array([0.05, 0.85, 0.07, 0.02, 0.01])[:len(STATUSES)]
+        provider_weights = np.linspace(len(PROVIDERS), 1, len(PROVIDERS))
+        currency_weights = np.linspace(len(CURRENCIES), 1, len(CURRENCIES))
+        return TransactionFrame(
+            since,
+            np.maximum(rng.lognormal(mean=9, sigma=1.5, size=rows).astype(np.int64), 1),
+            np.sort(rng.integers(since, now, size=rows, dtype=np.int64)),
+            rng.choice(len(STATUSES), size=rows, p=status_weights / status_weights.sum()).astype(np.uint8),
+            rng.choice(len(PROVIDERS), size=rows, p=provider_weights / provider_weights.sum()).astype(np.uint8),
+            rng.choice(len(CURRENCIES), size=rows, p=currency_weights / currency_weights.sum()).astype(np.uint8),
+        )
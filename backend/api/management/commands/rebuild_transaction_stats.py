@@ -0,0 +1,25 @@
+"""
+Recompute TransactionDailyStats from the transactions table
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from api.transaction_stats import TransactionStatsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily transaction stats, optionally for one user and/or from a start date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only rebuild stats for this user id')
+        parser.add_argument('--since', help='Only rebuild days on or after this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid --since date: {options['since']}")
+
+        rows = TransactionStatsService.rebuild(user_id=options['user'], since=since)
+        self.stdout.write(self.style.SUCCESS(f"Corrected {rows} transaction stats rows"))
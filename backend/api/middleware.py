@@ -1,9 +1,15 @@
 import logging
+import math
 import time
 from django.utils.deprecation import MiddlewareMixin
-from django.core.cache import cache
 from django.conf import settings
-from .models import AuditLog, APILog
+from django.utils import timezone
+from .models import AuditLog
+from .rate_limiting import RouteTrie, rate_limiter
+from .api_log_writer import api_log_writer
+from .usage_rollups import route_template
+from .log_sampling import log_sampling_policy
+from .ip_whitelist import get_client_ip
 import json
 
 logger = logging.getLogger(__name__)
@@ -22,8 +28,7 @@ class ErrorHandlingMiddleware(MiddlewareMixin):
             )
     
     def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        return x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
+        return get_client_ip(request)
 
 
 class PerformanceMonitoringMiddleware(MiddlewareMixin):
@@ -43,26 +48,48 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
             # Log API metrics for authenticated users
             if request.user and request.user.is_authenticated and '/api/' in request.path:
                 try:
-                    response_size = len(response.content) if hasattr(response, 'content') else 0
-                    
-                    APILog.objects.create(
-                        user=request.user,
-                        endpoint=request.path,
+                    api_key = getattr(request, 'api_key', None)
+                    api_log_writer.enqueue(
+                        user_id=request.user.id,
+                        api_key_id=api_key.id if api_key is not None else None,
+                        route=route_template(request),
                         method=request.method,
                         status_code=response.status_code,
                         response_time=elapsed,
-                        response_size=response_size,
+                        request_size=self.get_request_size(request),
+                        response_size=self.get_response_size(response),
                         ip_address=self.get_client_ip(request),
                         user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
+                        created_at=timezone.now(),
+                        sample_weight=log_sampling_policy.sample_weight(
+                            request.user, response.status_code, elapsed
+                        ),
                     )
                 except Exception as e:
                     logger.error(f"Error logging API metrics: {str(e)}")
         
         return response
     
+    def get_request_size(self, request):
+        try:
+            return int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return 0
+    
+    def get_response_size(self, response):
+        """Prefer Content-Length; never materialize a streaming body"""
+        content_length = response.get('Content-Length')
+        if content_length:
+            try:
+                return int(content_length)
+            except ValueError:
+                pass
+        if getattr(response, 'streaming', False):
+            return 0
+        return len(response.content) if hasattr(response, 'content') else 0
+    
     def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        return x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
+        return get_client_ip(request)
 
 
 class RateLimitMiddleware(MiddlewareMixin):
@@ -76,48 +103,47 @@ class RateLimitMiddleware(MiddlewareMixin):
         '/api/v1/api-keys/': {'requests': 50, 'window': 3600},
     }
     
+    route_trie = RouteTrie(RATE_LIMITS)
+    limiter = rate_limiter
+    
     def process_request(self, request):
         if not request.user or not request.user.is_authenticated:
             return None
         
-        # Check rate limits
-        user_id = request.user.id
-        client_ip = self.get_client_ip(request)
-        endpoint = request.path
-        
-        # Find matching rate limit config
-        limit_config = None
-        for path_pattern, config in self.RATE_LIMITS.items():
-            if endpoint.startswith(path_pattern):
-                limit_config = config
-                break
-        
-        if not limit_config:
+        # Longest matching route template; concrete ids share one key
+        match = self.route_trie.match(request.path)
+        if match is None:
             return None
         
-        # Create cache key
-        cache_key = f"rate_limit:{user_id}:{client_ip}:{endpoint}"
-        current_count = cache.get(cache_key, 0)
+        limit_route, limit_config = match
+        user_id = request.user.id
         
-        if current_count >= limit_config['requests']:
-            logger.warning(f"Rate limit exceeded for user {user_id} on {endpoint}")
-            return self.get_rate_limit_response()
+        try:
+            result = self.limiter.acquire(
+                f"{user_id}:{limit_route}",
+                limit_config['requests'],
+                limit_config['window'],
+            )
+        except Exception as e:
+            # Fail open so a Redis outage does not take the API down
+            logger.error(f"Rate limiter unavailable: {str(e)}")
+            return None
         
-        # Increment counter
-        cache.set(cache_key, current_count + 1, limit_config['window'])
+        if not result.granted:
+            logger.warning(f"Rate limit exceeded for user {user_id} on {limit_route}")
+            return self.get_rate_limit_response(result.retry_after_ms)
         
         return None
     
-    def get_rate_limit_response(self):
+    def get_rate_limit_response(self, retry_after_ms=None):
         from django.http import JsonResponse
-        return JsonResponse(
+        response = JsonResponse(
             {'error': 'Rate limit exceeded. Please try again later.'},
             status=429
         )
-    
-    def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        return x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
+        if retry_after_ms:
+            response['Retry-After'] = str(math.ceil(retry_after_ms / 1000))
+        return response
 
 
 class ConnectionPoolMiddleware(MiddlewareMixin):
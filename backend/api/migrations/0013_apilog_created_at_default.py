@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_delete_billingplan_remove_webhook_user_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apilog',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Convert api_logs and audit_logs to range partitioning on created_at
+#
+# The existing table is kept as-is and attached as the partition covering
+# everything before the current period, so no rows are copied. New rows land
+# in per-period partitions which api.log_partitioning pre-creates and drops
+# once they pass retention. Postgres only; other backends keep plain tables.
+
+from django.db import migrations
+
+
+PARTITIONED_TABLES = (
+    ('api_logs', 'day', 7),
+    ('audit_logs', 'week', 4),
+)
+
+CONVERT_SQL = r"""
+DO $$
+DECLARE
+    idx record;
+    con record;
+    period_start timestamptz;
+    boundary timestamptz := date_trunc('{interval}', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + interval '1 {interval}';
+BEGIN
+    ALTER TABLE {table} RENAME TO {table}_legacy;
+    ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey TO {table}_legacy_pkey;
+
+    CREATE TABLE {table} (
+        LIKE {table}_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE
+    ) PARTITION BY RANGE (created_at);
+
+    -- The partition key has to be part of the primary key
+    ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at);
+
+    -- Move index and foreign key names over to the parent so Django's state
+    -- keeps matching the database
+    FOR idx IN
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = '{table}_legacy'
+          AND indexname <> '{table}_legacy_pkey'
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.indexname, left(idx.indexname, 56) || '_legacy');
+        EXECUTE regexp_replace(idx.indexdef, ' ON (ONLY )?(\S+\.)?{table}_legacy ', ' ON \2{table} ');
+    END LOOP;
+
+    FOR con IN
+        SELECT conname, pg_get_constraintdef(oid) AS condef FROM pg_constraint
+        WHERE conrelid = '{table}_legacy'::regclass AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE {table}_legacy RENAME CONSTRAINT %I TO %I', con.conname, left(con.conname, 56) || '_legacy');
+        EXECUTE format('ALTER TABLE {table} ADD CONSTRAINT %I %s', con.conname, con.condef);
+    END LOOP;
+
+    -- A matching CHECK lets ATTACH skip the validation scan
+    EXECUTE format('ALTER TABLE {table}_legacy ADD CONSTRAINT {table}_legacy_bound CHECK (created_at < %L)', boundary);
+    EXECUTE format('ALTER TABLE {table} ATTACH PARTITION {table}_legacy FOR VALUES FROM (MINVALUE) TO (%L)', boundary);
+    ALTER TABLE {table}_legacy DROP CONSTRAINT {table}_legacy_bound;
+
+    FOR i IN 0..{premake} LOOP
+        period_start := boundary + i * interval '1 {interval}';
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+            '{table}_p' || to_char(period_start AT TIME ZONE 'UTC', 'YYYYMMDD'),
+            period_start,
+            period_start + interval '1 {interval}'
+        );
+    END LOOP;
+
+    -- Catches rows outside the pre-created range until maintenance moves them
+    CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;
+END $$;
+"""
+
+
+def partition_log_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, interval, premake in PARTITIONED_TABLES:
+        # No params, so the %I/%L placeholders reach PL/pgSQL untouched
+        schema_editor.execute(CONVERT_SQL.format(table=table, interval=interval, premake=premake), None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_apilog_created_at_default'),
+    ]
+
+    operations = [
+        # No reverse: the partitioned tables keep the columns and index names of
+        # the plain ones, so earlier migrations and models still work against
+        # them, and un-partitioning would copy every log row
+        migrations.RunPython(partition_log_tables, migrations.RunPython.noop, elidable=False),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:37
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_partition_log_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('route', models.CharField(max_length=255)),
+                ('method', models.CharField(max_length=10)),
+                ('status_class', models.PositiveSmallIntegerField()),
+                ('request_count', models.BigIntegerField(default=0)),
+                ('request_bytes', models.BigIntegerField(default=0)),
+                ('response_bytes', models.BigIntegerField(default=0)),
+                ('response_time_sum', models.FloatField(default=0)),
+                ('response_time_max', models.FloatField(default=0)),
+                ('latency_le_50', models.BigIntegerField(default=0)),
+                ('latency_le_100', models.BigIntegerField(default=0)),
+                ('latency_le_250', models.BigIntegerField(default=0)),
+                ('latency_le_500', models.BigIntegerField(default=0)),
+                ('latency_le_1000', models.BigIntegerField(default=0)),
+                ('latency_le_2500', models.BigIntegerField(default=0)),
+                ('latency_gt_2500', models.BigIntegerField(default=0)),
+                ('api_key', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='usage_rollups', to='api.apikey')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_usage_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'api_usage_rollups',
+                'indexes': [models.Index(fields=['user', 'bucket_start'], name='api_usage_user_bucket_idx'), models.Index(fields=['granularity', 'bucket_start'], name='api_usage_gran_bucket_idx')],
+                'constraints': [models.UniqueConstraint(models.F('user'), django.db.models.functions.comparison.Coalesce(models.F('api_key'), models.Value(uuid.UUID('00000000-0000-0000-0000-000000000000')), output_field=models.UUIDField()), models.F('route'), models.F('method'), models.F('status_class'), models.F('granularity'), models.F('bucket_start'), name='api_usage_rollup_bucket_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,405 @@
+# Replace APILog's repeated endpoint and user agent strings with references
+# to interned api_routes / user_agents rows. The backfill is set-based: one
+# INSERT ... SELECT and one joined UPDATE per lookup table.
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+# (path regex, route template) for every api/ URL pattern when this migration
+# was written, in resolution order, as resolve() and route_template() saw them.
+# Frozen so the backfill does not depend on the live URLconf. api_logs only
+# holds paths under /api/; anything else is backfilled as <unmatched>.
+ROUTE_PATTERNS = (
+    (r'^api/docs/\Z', r'/api/docs/'),
+    (r'^api/redoc/\Z', r'/api/redoc/'),
+    (r'^api/schema/\Z', r'/api/schema/'),
+    (r'^api/v1/graphql/\Z', r'/api/v1/graphql/'),
+    (r'^api/v1/auth/register/\Z', r'/api/v1/auth/register/'),
+    (r'^api/v1/auth/token/\Z', r'/api/v1/auth/token/'),
+    (r'^api/v1/auth/token/refresh/\Z', r'/api/v1/auth/token/refresh/'),
+    (r'^api/v1/health/\Z', r'/api/v1/health/'),
+    (r'^api/v1/profile/$', r'/api/v1/profile/'),
+    (r'^api/v1/profile\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/profile\.<format>/?'),
+    (r'^api/v1/profile/me/$', r'/api/v1/profile/me/'),
+    (r'^api/v1/profile/me\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/profile/me\.<format>/?'),
+    (r'^api/v1/profile/(?P<pk>[^/.]+)/$', r'/api/v1/profile/<pk>/'),
+    (r'^api/v1/profile/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/profile/<pk>\.<format>/?'),
+    (r'^api/v1/api-keys/$', r'/api/v1/api-keys/'),
+    (r'^api/v1/api-keys\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/api-keys\.<format>/?'),
+    (r'^api/v1/api-keys/activity/$', r'/api/v1/api-keys/activity/'),
+    (r'^api/v1/api-keys/activity\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/api-keys/activity\.<format>/?'),
+    (r'^api/v1/api-keys/(?P<pk>[^/.]+)/$', r'/api/v1/api-keys/<pk>/'),
+    (r'^api/v1/api-keys/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/api-keys/<pk>\.<format>/?'),
+    (r'^api/v1/api-keys/(?P<pk>[^/.]+)/revoke/$', r'/api/v1/api-keys/<pk>/revoke/'),
+    (r'^api/v1/api-keys/(?P<pk>[^/.]+)/revoke\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/api-keys/<pk>/revoke\.<format>/?'),
+    (r'^api/v1/payment-providers/$', r'/api/v1/payment-providers/'),
+    (r'^api/v1/payment-providers\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/payment-providers\.<format>/?'),
+    (r'^api/v1/payment-providers/(?P<pk>[^/.]+)/$', r'/api/v1/payment-providers/<pk>/'),
+    (r'^api/v1/payment-providers/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/payment-providers/<pk>\.<format>/?'),
+    (r'^api/v1/transactions/$', r'/api/v1/transactions/'),
+    (r'^api/v1/transactions\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/transactions\.<format>/?'),
+    (r'^api/v1/transactions/initiate_payment/$', r'/api/v1/transactions/initiate_payment/'),
+    (r'^api/v1/transactions/initiate_payment\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/transactions/initiate_payment\.<format>/?'),
+    (r'^api/v1/transactions/pay/$', r'/api/v1/transactions/pay/'),
+    (r'^api/v1/transactions/pay\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/transactions/pay\.<format>/?'),
+    (r'^api/v1/transactions/(?P<pk>[^/.]+)/$', r'/api/v1/transactions/<pk>/'),
+    (r'^api/v1/transactions/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/transactions/<pk>\.<format>/?'),
+    (r'^api/v1/transactions/(?P<pk>[^/.]+)/verify_payment/$', r'/api/v1/transactions/<pk>/verify_payment/'),
+    (r'^api/v1/transactions/(?P<pk>[^/.]+)/verify_payment\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/transactions/<pk>/verify_payment\.<format>/?'),
+    (r'^api/v1/transactions/(?P<pk>[^/.]+)/verify/$', r'/api/v1/transactions/<pk>/verify/'),
+    (r'^api/v1/transactions/(?P<pk>[^/.]+)/verify\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/transactions/<pk>/verify\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/$', r'/api/v1/webhook-subscriptions/'),
+    (r'^api/v1/webhook-subscriptions\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/available_events/$', r'/api/v1/webhook-subscriptions/available_events/'),
+    (r'^api/v1/webhook-subscriptions/available_events\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions/available_events\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/dashboard/$', r'/api/v1/webhook-subscriptions/dashboard/'),
+    (r'^api/v1/webhook-subscriptions/dashboard\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions/dashboard\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/$', r'/api/v1/webhook-subscriptions/<pk>/'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions/<pk>\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/delivery_logs/$', r'/api/v1/webhook-subscriptions/<pk>/delivery_logs/'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/delivery_logs\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions/<pk>/delivery_logs\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/metrics/$', r'/api/v1/webhook-subscriptions/<pk>/metrics/'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/metrics\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions/<pk>/metrics\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/rotate_secret/$', r'/api/v1/webhook-subscriptions/<pk>/rotate_secret/'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/rotate_secret\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions/<pk>/rotate_secret\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/test/$', r'/api/v1/webhook-subscriptions/<pk>/test/'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/test\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions/<pk>/test\.<format>/?'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/toggle/$', r'/api/v1/webhook-subscriptions/<pk>/toggle/'),
+    (r'^api/v1/webhook-subscriptions/(?P<pk>[^/.]+)/toggle\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-subscriptions/<pk>/toggle\.<format>/?'),
+    (r'^api/v1/webhook-events/$', r'/api/v1/webhook-events/'),
+    (r'^api/v1/webhook-events\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-events\.<format>/?'),
+    (r'^api/v1/webhook-events/(?P<pk>[^/.]+)/$', r'/api/v1/webhook-events/<pk>/'),
+    (r'^api/v1/webhook-events/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-events/<pk>\.<format>/?'),
+    (r'^api/v1/webhook-events/(?P<pk>[^/.]+)/replay/$', r'/api/v1/webhook-events/<pk>/replay/'),
+    (r'^api/v1/webhook-events/(?P<pk>[^/.]+)/replay\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-events/<pk>/replay\.<format>/?'),
+    (r'^api/v1/webhook-deliveries/$', r'/api/v1/webhook-deliveries/'),
+    (r'^api/v1/webhook-deliveries\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-deliveries\.<format>/?'),
+    (r'^api/v1/webhook-deliveries/dead_letter_queue/$', r'/api/v1/webhook-deliveries/dead_letter_queue/'),
+    (r'^api/v1/webhook-deliveries/dead_letter_queue\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-deliveries/dead_letter_queue\.<format>/?'),
+    (r'^api/v1/webhook-deliveries/(?P<pk>[^/.]+)/$', r'/api/v1/webhook-deliveries/<pk>/'),
+    (r'^api/v1/webhook-deliveries/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-deliveries/<pk>\.<format>/?'),
+    (r'^api/v1/webhook-deliveries/(?P<pk>[^/.]+)/retry/$', r'/api/v1/webhook-deliveries/<pk>/retry/'),
+    (r'^api/v1/webhook-deliveries/(?P<pk>[^/.]+)/retry\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/webhook-deliveries/<pk>/retry\.<format>/?'),
+    (r'^api/v1/settings/business-profile/$', r'/api/v1/settings/business-profile/'),
+    (r'^api/v1/settings/business-profile\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/business-profile\.<format>/?'),
+    (r'^api/v1/settings/business-profile/current/$', r'/api/v1/settings/business-profile/current/'),
+    (r'^api/v1/settings/business-profile/current\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/business-profile/current\.<format>/?'),
+    (r'^api/v1/settings/business-profile/(?P<pk>[^/.]+)/$', r'/api/v1/settings/business-profile/<pk>/'),
+    (r'^api/v1/settings/business-profile/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/business-profile/<pk>\.<format>/?'),
+    (r'^api/v1/settings/providers/$', r'/api/v1/settings/providers/'),
+    (r'^api/v1/settings/providers\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/providers\.<format>/?'),
+    (r'^api/v1/settings/providers/primary/$', r'/api/v1/settings/providers/primary/'),
+    (r'^api/v1/settings/providers/primary\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/providers/primary\.<format>/?'),
+    (r'^api/v1/settings/providers/(?P<pk>[^/.]+)/$', r'/api/v1/settings/providers/<pk>/'),
+    (r'^api/v1/settings/providers/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/providers/<pk>\.<format>/?'),
+    (r'^api/v1/settings/providers/(?P<pk>[^/.]+)/set_primary/$', r'/api/v1/settings/providers/<pk>/set_primary/'),
+    (r'^api/v1/settings/providers/(?P<pk>[^/.]+)/set_primary\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/providers/<pk>/set_primary\.<format>/?'),
+    (r'^api/v1/settings/providers/(?P<pk>[^/.]+)/toggle_mode/$', r'/api/v1/settings/providers/<pk>/toggle_mode/'),
+    (r'^api/v1/settings/providers/(?P<pk>[^/.]+)/toggle_mode\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/providers/<pk>/toggle_mode\.<format>/?'),
+    (r'^api/v1/settings/providers/(?P<pk>[^/.]+)/validate/$', r'/api/v1/settings/providers/<pk>/validate/'),
+    (r'^api/v1/settings/providers/(?P<pk>[^/.]+)/validate\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settings/providers/<pk>/validate\.<format>/?'),
+    (r'^api/v1/kyc/verification_status/$', r'/api/v1/kyc/verification_status/'),
+    (r'^api/v1/kyc/verification_status\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/kyc/verification_status\.<format>/?'),
+    (r'^api/v1/kyc/verify_account/$', r'/api/v1/kyc/verify_account/'),
+    (r'^api/v1/kyc/verify_account\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/kyc/verify_account\.<format>/?'),
+    (r'^api/v1/kyc/verify_bvn/$', r'/api/v1/kyc/verify_bvn/'),
+    (r'^api/v1/kyc/verify_bvn\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/kyc/verify_bvn\.<format>/?'),
+    (r'^api/v1/analytics/dashboard/$', r'/api/v1/analytics/dashboard/'),
+    (r'^api/v1/analytics/dashboard\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/analytics/dashboard\.<format>/?'),
+    (r'^api/v1/analytics/revenue/$', r'/api/v1/analytics/revenue/'),
+    (r'^api/v1/analytics/revenue\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/analytics/revenue\.<format>/?'),
+    (r'^api/v1/analytics/transactions/$', r'/api/v1/analytics/transactions/'),
+    (r'^api/v1/analytics/transactions\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/analytics/transactions\.<format>/?'),
+    (r'^api/v1/analytics/usage/$', r'/api/v1/analytics/usage/'),
+    (r'^api/v1/analytics/usage\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/analytics/usage\.<format>/?'),
+    (r'^api/v1/billing/generate_invoice/$', r'/api/v1/billing/generate_invoice/'),
+    (r'^api/v1/billing/generate_invoice\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/billing/generate_invoice\.<format>/?'),
+    (r'^api/v1/billing/invoices/$', r'/api/v1/billing/invoices/'),
+    (r'^api/v1/billing/invoices\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/billing/invoices\.<format>/?'),
+    (r'^api/v1/billing/usage_metrics/$', r'/api/v1/billing/usage_metrics/'),
+    (r'^api/v1/billing/usage_metrics\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/billing/usage_metrics\.<format>/?'),
+    (r'^api/v1/audit-logs/$', r'/api/v1/audit-logs/'),
+    (r'^api/v1/audit-logs\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/audit-logs\.<format>/?'),
+    (r'^api/v1/audit-logs/(?P<pk>[^/.]+)/$', r'/api/v1/audit-logs/<pk>/'),
+    (r'^api/v1/audit-logs/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/audit-logs/<pk>\.<format>/?'),
+    (r'^api/v1/settlements/balance/$', r'/api/v1/settlements/balance/'),
+    (r'^api/v1/settlements/balance\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settlements/balance\.<format>/?'),
+    (r'^api/v1/settlements/history/$', r'/api/v1/settlements/history/'),
+    (r'^api/v1/settlements/history\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settlements/history\.<format>/?'),
+    (r'^api/v1/settlements/withdraw/$', r'/api/v1/settlements/withdraw/'),
+    (r'^api/v1/settlements/withdraw\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/settlements/withdraw\.<format>/?'),
+    (r'^api/v1/system-analytics/$', r'/api/v1/system-analytics/'),
+    (r'^api/v1/system-analytics\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/system-analytics\.<format>/?'),
+    (r'^api/v1/system-analytics/performance/$', r'/api/v1/system-analytics/performance/'),
+    (r'^api/v1/system-analytics/performance\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/system-analytics/performance\.<format>/?'),
+    (r'^api/v1/system-analytics/system-health/$', r'/api/v1/system-analytics/system-health/'),
+    (r'^api/v1/system-analytics/system-health\.(?P<format>[a-z0-9]+)/?$', r'/api/v1/system-analytics/system-health\.<format>/?'),
+    (r'^api/v1/\Z', r'/api/v1/'),
+    (r'^api/v1/(?P<format>\.[a-z0-9]+/?)\Z', r'/api/v1/<drf_format_suffix:format>'),
+    (r'^api/v1/auth/login/\Z', r'/api/v1/auth/login/'),
+    (r'^api/v1/auth/register/\Z', r'/api/v1/auth/register/'),
+    (r'^api/v1/auth/token/refresh/\Z', r'/api/v1/auth/token/refresh/'),
+    (r'^api/v1/auth/password/reset/\Z', r'/api/v1/auth/password/reset/'),
+    (r'^api/v1/auth/password/reset/confirm/\Z', r'/api/v1/auth/password/reset/confirm/'),
+    (r'^api/v1/billing/plan/\Z', r'/api/v1/billing/plan/'),
+    (r'^api/v1/billing/subscribe/\Z', r'/api/v1/billing/subscribe/'),
+    (r'^api/v1/billing/cancel/\Z', r'/api/v1/billing/cancel/'),
+    (r'^api/v1/billing/usage/\Z', r'/api/v1/billing/usage/'),
+    (r'^api/v1/billing/payments/\Z', r'/api/v1/billing/payments/'),
+    (r'^api/v1/webhooks/paystack/\Z', r'/api/v1/webhooks/paystack/'),
+    (r'^api/v1/webhooks/flutterwave/\Z', r'/api/v1/webhooks/flutterwave/'),
+    (r'^api/v1/webhooks/stripe/\Z', r'/api/v1/webhooks/stripe/'),
+    (r'^api/v1/webhooks/mono/\Z', r'/api/v1/webhooks/mono/'),
+    (r'^api/health/\Z', r'/api/health/'),
+    (r'^api/profile/$', r'/api/profile/'),
+    (r'^api/profile\.(?P<format>[a-z0-9]+)/?$', r'/api/profile\.<format>/?'),
+    (r'^api/profile/me/$', r'/api/profile/me/'),
+    (r'^api/profile/me\.(?P<format>[a-z0-9]+)/?$', r'/api/profile/me\.<format>/?'),
+    (r'^api/profile/(?P<pk>[^/.]+)/$', r'/api/profile/<pk>/'),
+    (r'^api/profile/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/profile/<pk>\.<format>/?'),
+    (r'^api/api-keys/$', r'/api/api-keys/'),
+    (r'^api/api-keys\.(?P<format>[a-z0-9]+)/?$', r'/api/api-keys\.<format>/?'),
+    (r'^api/api-keys/activity/$', r'/api/api-keys/activity/'),
+    (r'^api/api-keys/activity\.(?P<format>[a-z0-9]+)/?$', r'/api/api-keys/activity\.<format>/?'),
+    (r'^api/api-keys/(?P<pk>[^/.]+)/$', r'/api/api-keys/<pk>/'),
+    (r'^api/api-keys/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/api-keys/<pk>\.<format>/?'),
+    (r'^api/api-keys/(?P<pk>[^/.]+)/revoke/$', r'/api/api-keys/<pk>/revoke/'),
+    (r'^api/api-keys/(?P<pk>[^/.]+)/revoke\.(?P<format>[a-z0-9]+)/?$', r'/api/api-keys/<pk>/revoke\.<format>/?'),
+    (r'^api/payment-providers/$', r'/api/payment-providers/'),
+    (r'^api/payment-providers\.(?P<format>[a-z0-9]+)/?$', r'/api/payment-providers\.<format>/?'),
+    (r'^api/payment-providers/(?P<pk>[^/.]+)/$', r'/api/payment-providers/<pk>/'),
+    (r'^api/payment-providers/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/payment-providers/<pk>\.<format>/?'),
+    (r'^api/transactions/$', r'/api/transactions/'),
+    (r'^api/transactions\.(?P<format>[a-z0-9]+)/?$', r'/api/transactions\.<format>/?'),
+    (r'^api/transactions/initiate_payment/$', r'/api/transactions/initiate_payment/'),
+    (r'^api/transactions/initiate_payment\.(?P<format>[a-z0-9]+)/?$', r'/api/transactions/initiate_payment\.<format>/?'),
+    (r'^api/transactions/pay/$', r'/api/transactions/pay/'),
+    (r'^api/transactions/pay\.(?P<format>[a-z0-9]+)/?$', r'/api/transactions/pay\.<format>/?'),
+    (r'^api/transactions/(?P<pk>[^/.]+)/$', r'/api/transactions/<pk>/'),
+    (r'^api/transactions/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/transactions/<pk>\.<format>/?'),
+    (r'^api/transactions/(?P<pk>[^/.]+)/verify_payment/$', r'/api/transactions/<pk>/verify_payment/'),
+    (r'^api/transactions/(?P<pk>[^/.]+)/verify_payment\.(?P<format>[a-z0-9]+)/?$', r'/api/transactions/<pk>/verify_payment\.<format>/?'),
+    (r'^api/transactions/(?P<pk>[^/.]+)/verify/$', r'/api/transactions/<pk>/verify/'),
+    (r'^api/transactions/(?P<pk>[^/.]+)/verify\.(?P<format>[a-z0-9]+)/?$', r'/api/transactions/<pk>/verify\.<format>/?'),
+    (r'^api/webhook-subscriptions/$', r'/api/webhook-subscriptions/'),
+    (r'^api/webhook-subscriptions\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions\.<format>/?'),
+    (r'^api/webhook-subscriptions/available_events/$', r'/api/webhook-subscriptions/available_events/'),
+    (r'^api/webhook-subscriptions/available_events\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions/available_events\.<format>/?'),
+    (r'^api/webhook-subscriptions/dashboard/$', r'/api/webhook-subscriptions/dashboard/'),
+    (r'^api/webhook-subscriptions/dashboard\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions/dashboard\.<format>/?'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/$', r'/api/webhook-subscriptions/<pk>/'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions/<pk>\.<format>/?'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/delivery_logs/$', r'/api/webhook-subscriptions/<pk>/delivery_logs/'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/delivery_logs\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions/<pk>/delivery_logs\.<format>/?'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/metrics/$', r'/api/webhook-subscriptions/<pk>/metrics/'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/metrics\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions/<pk>/metrics\.<format>/?'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/rotate_secret/$', r'/api/webhook-subscriptions/<pk>/rotate_secret/'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/rotate_secret\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions/<pk>/rotate_secret\.<format>/?'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/test/$', r'/api/webhook-subscriptions/<pk>/test/'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/test\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions/<pk>/test\.<format>/?'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/toggle/$', r'/api/webhook-subscriptions/<pk>/toggle/'),
+    (r'^api/webhook-subscriptions/(?P<pk>[^/.]+)/toggle\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-subscriptions/<pk>/toggle\.<format>/?'),
+    (r'^api/webhook-events/$', r'/api/webhook-events/'),
+    (r'^api/webhook-events\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-events\.<format>/?'),
+    (r'^api/webhook-events/(?P<pk>[^/.]+)/$', r'/api/webhook-events/<pk>/'),
+    (r'^api/webhook-events/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-events/<pk>\.<format>/?'),
+    (r'^api/webhook-events/(?P<pk>[^/.]+)/replay/$', r'/api/webhook-events/<pk>/replay/'),
+    (r'^api/webhook-events/(?P<pk>[^/.]+)/replay\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-events/<pk>/replay\.<format>/?'),
+    (r'^api/webhook-deliveries/$', r'/api/webhook-deliveries/'),
+    (r'^api/webhook-deliveries\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-deliveries\.<format>/?'),
+    (r'^api/webhook-deliveries/dead_letter_queue/$', r'/api/webhook-deliveries/dead_letter_queue/'),
+    (r'^api/webhook-deliveries/dead_letter_queue\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-deliveries/dead_letter_queue\.<format>/?'),
+    (r'^api/webhook-deliveries/(?P<pk>[^/.]+)/$', r'/api/webhook-deliveries/<pk>/'),
+    (r'^api/webhook-deliveries/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-deliveries/<pk>\.<format>/?'),
+    (r'^api/webhook-deliveries/(?P<pk>[^/.]+)/retry/$', r'/api/webhook-deliveries/<pk>/retry/'),
+    (r'^api/webhook-deliveries/(?P<pk>[^/.]+)/retry\.(?P<format>[a-z0-9]+)/?$', r'/api/webhook-deliveries/<pk>/retry\.<format>/?'),
+    (r'^api/settings/business-profile/$', r'/api/settings/business-profile/'),
+    (r'^api/settings/business-profile\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/business-profile\.<format>/?'),
+    (r'^api/settings/business-profile/current/$', r'/api/settings/business-profile/current/'),
+    (r'^api/settings/business-profile/current\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/business-profile/current\.<format>/?'),
+    (r'^api/settings/business-profile/(?P<pk>[^/.]+)/$', r'/api/settings/business-profile/<pk>/'),
+    (r'^api/settings/business-profile/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/business-profile/<pk>\.<format>/?'),
+    (r'^api/settings/providers/$', r'/api/settings/providers/'),
+    (r'^api/settings/providers\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/providers\.<format>/?'),
+    (r'^api/settings/providers/primary/$', r'/api/settings/providers/primary/'),
+    (r'^api/settings/providers/primary\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/providers/primary\.<format>/?'),
+    (r'^api/settings/providers/(?P<pk>[^/.]+)/$', r'/api/settings/providers/<pk>/'),
+    (r'^api/settings/providers/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/providers/<pk>\.<format>/?'),
+    (r'^api/settings/providers/(?P<pk>[^/.]+)/set_primary/$', r'/api/settings/providers/<pk>/set_primary/'),
+    (r'^api/settings/providers/(?P<pk>[^/.]+)/set_primary\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/providers/<pk>/set_primary\.<format>/?'),
+    (r'^api/settings/providers/(?P<pk>[^/.]+)/toggle_mode/$', r'/api/settings/providers/<pk>/toggle_mode/'),
+    (r'^api/settings/providers/(?P<pk>[^/.]+)/toggle_mode\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/providers/<pk>/toggle_mode\.<format>/?'),
+    (r'^api/settings/providers/(?P<pk>[^/.]+)/validate/$', r'/api/settings/providers/<pk>/validate/'),
+    (r'^api/settings/providers/(?P<pk>[^/.]+)/validate\.(?P<format>[a-z0-9]+)/?$', r'/api/settings/providers/<pk>/validate\.<format>/?'),
+    (r'^api/kyc/verification_status/$', r'/api/kyc/verification_status/'),
+    (r'^api/kyc/verification_status\.(?P<format>[a-z0-9]+)/?$', r'/api/kyc/verification_status\.<format>/?'),
+    (r'^api/kyc/verify_account/$', r'/api/kyc/verify_account/'),
+    (r'^api/kyc/verify_account\.(?P<format>[a-z0-9]+)/?$', r'/api/kyc/verify_account\.<format>/?'),
+    (r'^api/kyc/verify_bvn/$', r'/api/kyc/verify_bvn/'),
+    (r'^api/kyc/verify_bvn\.(?P<format>[a-z0-9]+)/?$', r'/api/kyc/verify_bvn\.<format>/?'),
+    (r'^api/analytics/dashboard/$', r'/api/analytics/dashboard/'),
+    (r'^api/analytics/dashboard\.(?P<format>[a-z0-9]+)/?$', r'/api/analytics/dashboard\.<format>/?'),
+    (r'^api/analytics/revenue/$', r'/api/analytics/revenue/'),
+    (r'^api/analytics/revenue\.(?P<format>[a-z0-9]+)/?$', r'/api/analytics/revenue\.<format>/?'),
+    (r'^api/analytics/transactions/$', r'/api/analytics/transactions/'),
+    (r'^api/analytics/transactions\.(?P<format>[a-z0-9]+)/?$', r'/api/analytics/transactions\.<format>/?'),
+    (r'^api/analytics/usage/$', r'/api/analytics/usage/'),
+    (r'^api/analytics/usage\.(?P<format>[a-z0-9]+)/?$', r'/api/analytics/usage\.<format>/?'),
+    (r'^api/billing/generate_invoice/$', r'/api/billing/generate_invoice/'),
+    (r'^api/billing/generate_invoice\.(?P<format>[a-z0-9]+)/?$', r'/api/billing/generate_invoice\.<format>/?'),
+    (r'^api/billing/invoices/$', r'/api/billing/invoices/'),
+    (r'^api/billing/invoices\.(?P<format>[a-z0-9]+)/?$', r'/api/billing/invoices\.<format>/?'),
+    (r'^api/billing/usage_metrics/$', r'/api/billing/usage_metrics/'),
+    (r'^api/billing/usage_metrics\.(?P<format>[a-z0-9]+)/?$', r'/api/billing/usage_metrics\.<format>/?'),
+    (r'^api/audit-logs/$', r'/api/audit-logs/'),
+    (r'^api/audit-logs\.(?P<format>[a-z0-9]+)/?$', r'/api/audit-logs\.<format>/?'),
+    (r'^api/audit-logs/(?P<pk>[^/.]+)/$', r'/api/audit-logs/<pk>/'),
+    (r'^api/audit-logs/(?P<pk>[^/.]+)\.(?P<format>[a-z0-9]+)/?$', r'/api/audit-logs/<pk>\.<format>/?'),
+    (r'^api/settlements/balance/$', r'/api/settlements/balance/'),
+    (r'^api/settlements/balance\.(?P<format>[a-z0-9]+)/?$', r'/api/settlements/balance\.<format>/?'),
+    (r'^api/settlements/history/$', r'/api/settlements/history/'),
+    (r'^api/settlements/history\.(?P<format>[a-z0-9]+)/?$', r'/api/settlements/history\.<format>/?'),
+    (r'^api/settlements/withdraw/$', r'/api/settlements/withdraw/'),
+    (r'^api/settlements/withdraw\.(?P<format>[a-z0-9]+)/?$', r'/api/settlements/withdraw\.<format>/?'),
+    (r'^api/system-analytics/$', r'/api/system-analytics/'),
+    (r'^api/system-analytics\.(?P<format>[a-z0-9]+)/?$', r'/api/system-analytics\.<format>/?'),
+    (r'^api/system-analytics/performance/$', r'/api/system-analytics/performance/'),
+    (r'^api/system-analytics/performance\.(?P<format>[a-z0-9]+)/?$', r'/api/system-analytics/performance\.<format>/?'),
+    (r'^api/system-analytics/system-health/$', r'/api/system-analytics/system-health/'),
+    (r'^api/system-analytics/system-health\.(?P<format>[a-z0-9]+)/?$', r'/api/system-analytics/system-health\.<format>/?'),
+    (r'^api/\Z', r'/api/'),
+    (r'^api/(?P<format>\.[a-z0-9]+/?)\Z', r'/api/<drf_format_suffix:format>'),
+    (r'^api/auth/login/\Z', r'/api/auth/login/'),
+    (r'^api/auth/register/\Z', r'/api/auth/register/'),
+    (r'^api/auth/token/refresh/\Z', r'/api/auth/token/refresh/'),
+    (r'^api/auth/password/reset/\Z', r'/api/auth/password/reset/'),
+    (r'^api/auth/password/reset/confirm/\Z', r'/api/auth/password/reset/confirm/'),
+    (r'^api/billing/plan/\Z', r'/api/billing/plan/'),
+    (r'^api/billing/subscribe/\Z', r'/api/billing/subscribe/'),
+    (r'^api/billing/cancel/\Z', r'/api/billing/cancel/'),
+    (r'^api/billing/usage/\Z', r'/api/billing/usage/'),
+    (r'^api/billing/payments/\Z', r'/api/billing/payments/'),
+    (r'^api/webhooks/paystack/\Z', r'/api/webhooks/paystack/'),
+    (r'^api/webhooks/flutterwave/\Z', r'/api/webhooks/flutterwave/'),
+    (r'^api/webhooks/stripe/\Z', r'/api/webhooks/stripe/'),
+    (r'^api/webhooks/mono/\Z', r'/api/webhooks/mono/'),
+)
+
+
+def backfill_routes(apps, schema_editor):
+    """Map each distinct endpoint once, then set route_id with one joined UPDATE"""
+    APILog = apps.get_model('api', 'APILog')
+    patterns = [(re.compile(regex), template) for regex, template in ROUTE_PATTERNS]
+
+    def template_for_path(path):
+        if path.startswith('/'):
+            for pattern, template in patterns:
+                if pattern.match(path[1:]):
+                    return template
+        return UNMATCHED_ROUTE
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE api_log_endpoint_routes '
+            '(endpoint varchar(255) PRIMARY KEY, template varchar(255) NOT NULL)'
+        )
+        endpoints = APILog.objects.order_by().values_list('endpoint', flat=True).distinct()
+        batch = []
+        for endpoint in endpoints.iterator(chunk_size=5000):
+            batch.append((endpoint, template_for_path(endpoint)))
+            if len(batch) >= 5000:
+                cursor.executemany('INSERT INTO api_log_endpoint_routes VALUES (%s, %s)', batch)
+                batch = []
+        if batch:
+            cursor.executemany('INSERT INTO api_log_endpoint_routes VALUES (%s, %s)', batch)
+
+        cursor.execute(
+            'INSERT INTO api_routes (template) '
+            'SELECT DISTINCT template FROM api_log_endpoint_routes '
+            'WHERE template NOT IN (SELECT template FROM api_routes)'
+        )
+        cursor.execute(
+            'UPDATE api_logs SET route_id = api_routes.id '
+            'FROM api_log_endpoint_routes JOIN api_routes ON api_routes.template = api_log_endpoint_routes.template '
+            'WHERE api_logs.endpoint = api_log_endpoint_routes.endpoint AND api_logs.route_id IS NULL'
+        )
+        cursor.execute('DROP TABLE api_log_endpoint_routes')
+
+
+def backfill_user_agents(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO user_agents (user_agent) '
+            'SELECT DISTINCT SUBSTR(user_agent, 1, 500) FROM api_logs '
+            "WHERE user_agent <> '' AND SUBSTR(user_agent, 1, 500) NOT IN (SELECT user_agent FROM user_agents)"
+        )
+        cursor.execute(
+            'UPDATE api_logs SET user_agent_ref_id = user_agents.id '
+            'FROM user_agents '
+            "WHERE user_agents.user_agent = SUBSTR(api_logs.user_agent, 1, 500) "
+            "AND api_logs.user_agent <> '' AND api_logs.user_agent_ref_id IS NULL"
+        )
+
+
+class Migration(migrations.Migration):
+
+    # Each step commits on its own, so ALTER TABLE locks on api_logs are not
+    # held through the backfill; the backfill steps are safe to re-run
+    atomic = False
+
+    dependencies = [
+        ('api', '0015_api_usage_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIRoute',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('template', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'db_table': 'api_routes',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('user_agent', models.CharField(max_length=500, unique=True)),
+            ],
+            options={
+                'db_table': 'user_agents',
+            },
+        ),
+        migrations.AddField(
+            model_name='apilog',
+            name='route',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='api.apiroute'),
+        ),
+        migrations.AddField(
+            model_name='apilog',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='api.useragent'),
+        ),
+        migrations.RunPython(backfill_routes, elidable=True),
+        migrations.RunPython(backfill_user_agents, elidable=True),
+        migrations.RemoveField(
+            model_name='apilog',
+            name='endpoint',
+        ),
+        migrations.RemoveField(
+            model_name='apilog',
+            name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='apilog',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_api_log_dictionaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apilog',
+            name='sample_weight',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
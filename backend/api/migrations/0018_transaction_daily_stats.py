@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_transaction_stats(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    TransactionDailyStats = apps.get_model('api', 'TransactionDailyStats')
+
+    aggregated = Transaction.objects.annotate(
+        date=TruncDate('created_at')
+    ).values(
+        'user_id', 'date', 'provider', 'currency', 'status'
+    ).annotate(
+        count=Count('id'),
+        amount_sum=Sum('amount'),
+        fee_sum=Sum('fee'),
+    ).order_by()
+    TransactionDailyStats.objects.bulk_create(
+        (TransactionDailyStats(**item) for item in aggregated.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_apilog_sample_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('provider', models.CharField(max_length=20)),
+                ('currency', models.CharField(max_length=3)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+                ('amount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('fee_sum', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'transaction_daily_stats',
+                'constraints': [models.UniqueConstraint(fields=('user', 'date', 'provider', 'currency', 'status'), name='transaction_daily_stats_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_transaction_stats, migrations.RunPython.noop, elidable=True),
+    ]
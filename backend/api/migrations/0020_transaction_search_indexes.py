@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:11
+#
+# Indexes behind TransactionViewSet's keyset pagination and search. The
+# trigram indexes are on UPPER(col::text) because that is what Django
+# generates for icontains/istartswith on Postgres. On Postgres every index
+# is built CONCURRENTLY so transactions stay writable, hence atomic = False.
+# Other backends get the plain (user, amount, id) index and no trigram ones.
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+AMOUNT_INDEX = models.Index(fields=['user', 'amount', 'id'], name='transactions_user_amount_idx')
+
+TRIGRAM_INDEXES = (
+    ('transactions_reference_trgm', 'reference'),
+    ('transactions_customer_email_trgm', 'customer_email'),
+)
+
+
+def create_amount_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.add_index(apps.get_model('api', 'Transaction'), AMOUNT_INDEX)
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {AMOUNT_INDEX.name} '
+        f'ON transactions (user_id, amount, id)'
+    )
+
+
+def drop_amount_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.remove_index(apps.get_model('api', 'Transaction'), AMOUNT_INDEX)
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {AMOUNT_INDEX.name}')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON transactions USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0019_data_export_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The plain AddIndex would hold a SHARE lock on transactions for the whole build
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='transaction', index=AMOUNT_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_amount_index, drop_amount_index),
+            ],
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 import uuid
@@ -169,10 +170,24 @@ class Transaction(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', 'amount', 'id'], name='transactions_user_amount_idx'),
             models.Index(fields=['status', '-created_at']),
             models.Index(fields=['reference']),
             models.Index(fields=['idempotency_key']),
         ]
+        # Postgres also has pg_trgm GIN indexes for search, created in migration 0020
+    
+    def save(self, *args, **kwargs):
+        # Daily stats move with the row, in the same database transaction
+        from .transaction_stats import TransactionStatsService, TRACKED_FIELDS
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {self._meta.get_field(name).attname for name in update_fields} & set(TRACKED_FIELDS):
+            return super().save(*args, **kwargs)
+        
+        with db_transaction.atomic():
+            previous = None if self._state.adding else TransactionStatsService.locked_values(self.pk)
+            super().save(*args, **kwargs)
+            TransactionStatsService.record_change(previous, TransactionStatsService.tracked_values(self))
     
     def calculate_fee(self):
         from decimal import Decimal
@@ -253,20 +268,47 @@ class KYCVerification(models.Model):
         return f"{self.user.email} - {self.verification_type}"
 
 
+class APIRoute(models.Model):
+    """Interned route template referenced by API logs"""
+    id = models.SmallAutoField(primary_key=True)
+    template = models.CharField(max_length=255, unique=True)
+    
+    class Meta:
+        db_table = 'api_routes'
+    
+    def __str__(self):
+        return self.template
+
+
+class UserAgent(models.Model):
+    """Interned User-Agent string referenced by API logs"""
+    id = models.AutoField(primary_key=True)
+    user_agent = models.CharField(max_length=500, unique=True)
+    
+    class Meta:
+        db_table = 'user_agents'
+    
+    def __str__(self):
+        return self.user_agent
+
+
 class APILog(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_logs')
     api_key = models.ForeignKey(APIKey, on_delete=models.SET_NULL, null=True, related_name='logs')
-    endpoint = models.CharField(max_length=255)
+    route = models.ForeignKey(APIRoute, on_delete=models.PROTECT, null=True, related_name='logs')
     method = models.CharField(max_length=10)
     status_code = models.IntegerField()
     response_time = models.FloatField()  # milliseconds
     request_size = models.BigIntegerField(default=0)  # bytes
     response_size = models.BigIntegerField(default=0)  # bytes
     ip_address = models.GenericIPAddressField()
-    user_agent = models.TextField(blank=True)
+    user_agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, null=True, blank=True, related_name='logs')
     error_message = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Requests this row stands for when logs are sampled; sum it, don't count rows
+    sample_weight = models.PositiveIntegerField(default=1)
+    # Set by the request, not the insert, since rows are written in batches
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
     
     class Meta:
         db_table = 'api_logs'
@@ -277,7 +319,7 @@ class APILog(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.user.email} - {self.endpoint}"
+        return f"{self.user.email} - {self.method} {self.route}"
 
 
 
@@ -373,3 +415,9 @@ class Settlement(models.Model):
 
 # Import settings models so Django recognizes them
 from .settings_models import BusinessProfile, PaymentProviderConfig
+
+# Import analytics models so Django recognizes them
+from .analytics_models import APIUsageRollup, TransactionDailyStats
+
+# Import export models so Django recognizes them
+from .export_models import DataExportJob
@@ -0,0 +1,198 @@
+"""
+Keyset (cursor) pagination
+
+Cursors are opaque base64 encodings of the last row's sort key. A page is one
+index range scan that starts after the cursor, so deep pages cost the same as
+the first; one extra row is fetched to answer hasNextPage without a COUNT.
+GraphQL connections page on (created_at, id); KeysetPagination does the same
+for REST list views on (<ordering field>, id) for each ordering a view allows.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from graphql import GraphQLError
+from graphene.relay import PageInfo
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(instance):
+    raw = f"{instance.created_at.isoformat()}|{instance.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, pk) from a cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(created_at), pk
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_page(queryset, first=None, after=None):
+    """Newest-first page of `queryset` after `after`; returns (rows, has_next_page)"""
+    limit = DEFAULT_PAGE_SIZE if first is None else first
+    if limit < 0:
+        raise ValueError("first must be non-negative")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    if after:
+        created_at, pk = decode_cursor(after)
+        try:
+            pk = queryset.model._meta.pk.to_python(pk)
+        except ValidationError as e:
+            raise ValueError(f"Invalid cursor: {after}") from e
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    rows = list(queryset.order_by('-created_at', '-pk')[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def connection_from_queryset(connection_type, queryset, first=None, after=None):
+    """Build a Relay connection for one keyset page"""
+    try:
+        rows, has_next_page = keyset_page(queryset, first=first, after=after)
+    except ValueError as e:
+        raise GraphQLError(str(e))
+
+    edge_type = connection_type.Edge
+    edges = [edge_type(node=row, cursor=encode_cursor(row)) for row in rows]
+    return connection_type(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_next_page,
+            has_previous_page=bool(after),
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
+
+
+def keyset_filter(queryset, field, value, pk, descending):
+    """Rows strictly after (value, pk) in (field, pk) order"""
+    if descending:
+        # The redundant bound lets the database start the index scan at the cursor
+        return queryset.filter(**{f"{field}__lte": value}).filter(
+            Q(**{f"{field}__lt": value}) | Q(**{field: value, 'pk__lt': pk})
+        )
+    return queryset.filter(**{f"{field}__gte": value}).filter(
+        Q(**{f"{field}__gt": value}) | Q(**{field: value, 'pk__gt': pk})
+    )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination for REST list views, ordered by one of the view's
+    `keyset_orderings` fields (?ordering=amount or -amount) with the primary
+    key as tie-breaker. Each ordering needs an index on (user, field, id).
+    Responses have the same next/previous/results shape as CursorPagination.
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size_query_param = 'page_size'
+    default_ordering = '-created_at'
+
+    def get_ordering(self, request, view):
+        """(field, descending) from ?ordering=, limited to the view's keyset orderings"""
+        default = getattr(view, 'keyset_default_ordering', self.default_ordering)
+        ordering = request.query_params.get(self.ordering_query_param, default)
+        if ordering.lstrip('-') not in getattr(view, 'keyset_orderings', (default.lstrip('-'),)):
+            ordering = default
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, api_settings.PAGE_SIZE or DEFAULT_PAGE_SIZE))
+        except ValueError:
+            page_size = api_settings.PAGE_SIZE or DEFAULT_PAGE_SIZE
+        return max(1, min(page_size, MAX_PAGE_SIZE))
+
+    def encode(self, row, reverse):
+        # Rows are model instances, or dicts from values() (see FastListMixin)
+        if isinstance(row, dict):
+            value, pk = row[self.field.attname], row[self.pk_name]
+        else:
+            value, pk = self.field.value_from_object(row), row.pk
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        raw = json.dumps({'v': value, 'p': str(pk), 'r': int(reverse)})
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode(self, cursor, model):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            return (
+                self.field.to_python(position['v']),
+                model._meta.pk.to_python(position['p']),
+                bool(position.get('r')),
+            )
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError, binascii.Error, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        field_name, descending = self.get_ordering(request, view)
+        self.field = queryset.model._meta.get_field(field_name)
+        self.pk_name = queryset.model._meta.pk.name
+        page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        reverse = False
+        if cursor:
+            value, pk, reverse = self.decode(cursor, queryset.model)
+            # "previous" cursors scan backwards from the first row of the later page
+            queryset = keyset_filter(queryset, field_name, value, pk, descending != reverse)
+
+        scan_descending = descending != reverse
+        order = (f"-{field_name}", '-pk') if scan_descending else (field_name, 'pk')
+        rows = list(queryset.order_by(*order)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = True if reverse else has_more
+        self.has_previous = has_more if reverse else bool(cursor)
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode(self.page[-1], False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode(self.page[0], True))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,322 @@
+"""
+Columnar (Parquet) export of transactions and API logs for offline analytics
+
+Rows are read in created_at order through a server-side cursor and written as
+Arrow record batches, so memory is bounded by the batch size rather than the
+export range. Files are partitioned Hive-style by UTC day
+(<dataset>/date=YYYY-MM-DD/part-NNNNN.parquet); money columns are written as
+Parquet DECIMAL with the model's precision and scale, never as floats.
+A manifest.json next to the files lists every file with its row count, size
+and SHA-256.
+
+Files are written to a local temporary directory one at a time and uploaded
+to the 'exports' storage (STORAGES['exports']) under <job id>/ as each one is
+closed, because the worker that writes them and the web process that serves
+them do not share a filesystem in production.
+
+pyarrow is imported lazily so only the workers that run exports need it.
+"""
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import tempfile
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.utils import timezone
+from .models import Transaction, APILog
+from .export_models import DataExportJob
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+EXPORT_STORAGE_ALIAS = 'exports'
+
+# dataset -> (model, [(column, values_list lookup, arrow type spec)])
+# Type specs are resolved against pyarrow when an export runs
+DATASETS = {
+    'transactions': (Transaction, [
+        ('id', 'id', 'uuid'),
+        ('reference', 'reference', 'string'),
+        ('provider', 'provider', 'string'),
+        ('amount', 'amount', 'decimal'),
+        ('currency', 'currency', 'string'),
+        ('status', 'status', 'string'),
+        ('fee', 'fee', 'decimal'),
+        ('net_amount', 'net_amount', 'decimal'),
+        ('customer_email', 'customer_email', 'string'),
+        ('description', 'description', 'string'),
+        ('api_key_id', 'api_key_id', 'uuid'),
+        ('settlement_id', 'settlement_id', 'uuid'),
+        ('created_at', 'created_at', 'timestamp'),
+        ('updated_at', 'updated_at', 'timestamp'),
+    ]),
+    'api_logs': (APILog, [
+        ('id', 'id', 'uuid'),
+        ('api_key_id', 'api_key_id', 'uuid'),
+        ('route', 'route__template', 'string'),
+        ('method', 'method', 'string'),
+        ('status_code', 'status_code', 'int32'),
+        ('response_time_ms', 'response_time', 'float64'),
+        ('request_size', 'request_size', 'int64'),
+        ('response_size', 'response_size', 'int64'),
+        ('ip_address', 'ip_address', 'string'),
+        ('user_agent', 'user_agent__user_agent', 'string'),
+        ('error_message', 'error_message', 'string'),
+        ('sample_weight', 'sample_weight', 'int32'),
+        ('created_at', 'created_at', 'timestamp'),
+    ]),
+}
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def export_storage():
+    return storages[EXPORT_STORAGE_ALIAS]
+
+
+def storage_name(job, relative):
+    """Storage name of a file in a job's export"""
+    return f"{job.id}/{relative}"
+
+
+def _delete_tree(storage, path):
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for name in files:
+        storage.delete(f"{path}/{name}")
+    for directory in directories:
+        _delete_tree(storage, f"{path}/{directory}")
+    # Removes the now empty directory on filesystem storage; a no-op on object stores
+    storage.delete(path)
+
+
+def _arrow_type(pa, model, lookup, spec):
+    if spec == 'decimal':
+        field = model._meta.get_field(lookup)
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if spec == 'timestamp':
+        return pa.timestamp('us', tz='UTC')
+    if spec == 'uuid':
+        return pa.string()
+    return getattr(pa, spec)()
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _PartitionWriter:
+    """Writes record batches into one Parquet file per day (more when a day is large)"""
+
+    def __init__(self, pq, schema, root, dataset, rows_per_file, upload):
+        self.pq = pq
+        self.schema = schema
+        self.root = root
+        self.upload = upload
+        self.dataset = dataset
+        self.rows_per_file = rows_per_file
+        self.files = []
+        self._writer = None
+        self._partition = None
+        self._part = 0
+        self._rows = 0
+
+    def write(self, partition, batch):
+        if partition != self._partition:
+            self._close()
+            self._partition, self._part = partition, 0
+        elif self._rows >= self.rows_per_file:
+            self._close()
+            self._part += 1
+
+        if self._writer is None:
+            relative = os.path.join(self.dataset, f"date={partition}", f"part-{self._part:05d}.parquet")
+            path = os.path.join(self.root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._writer = self.pq.ParquetWriter(path, self.schema, compression='zstd')
+            self.files.append({'path': relative, 'partition': {'date': partition}, 'rows': 0})
+            self._rows = 0
+
+        self._writer.write_batch(batch)
+        self._rows += batch.num_rows
+        self.files[-1]['rows'] += batch.num_rows
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            entry = self.files[-1]
+            path = os.path.join(self.root, entry['path'])
+            entry['bytes'] = os.path.getsize(path)
+            entry['sha256'] = _sha256(path)
+            # Only one finished file is kept on local disk at a time
+            self.upload(entry['path'], path)
+            os.remove(path)
+
+    def close(self):
+        self._close()
+
+
+class ParquetExportService:
+    """Runs DataExportJobs"""
+
+    @staticmethod
+    def run(job):
+        """Write the job's files and manifest; marks the job completed or failed"""
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.error_message = ''
+        job.save(update_fields=['status', 'started_at', 'error_message'])
+
+        try:
+            # A retried job starts from scratch
+            ParquetExportService.delete_files(job)
+            with tempfile.TemporaryDirectory(prefix='paybridge-export-') as root:
+                manifest = ParquetExportService.write(job, root)
+        except Exception as e:
+            logger.error(f"Error running data export {job.id}: {str(e)}")
+            ParquetExportService.delete_files(job)
+            job.status = 'failed'
+            job.error_message = str(e)
+            job.completed_at = timezone.now()
+            job.save(update_fields=['status', 'error_message', 'completed_at'])
+            return job
+
+        job.status = 'completed'
+        job.manifest = manifest
+        job.row_count = manifest['total_rows']
+        job.file_count = len(manifest['files'])
+        job.total_bytes = manifest['total_bytes']
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'manifest', 'row_count', 'file_count', 'total_bytes', 'completed_at'])
+        return job
+
+    @staticmethod
+    def write(job, root):
+        """
+        Write partitioned Parquet files for the job, staging each in the local
+        directory `root` before uploading it, and return the manifest
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('Parquet export requires pyarrow, which is not installed')
+
+        storage = export_storage()
+        model, columns = DATASETS[job.dataset]
+        batch_size = getattr(settings, 'DATA_EXPORT_BATCH_SIZE', 10000)
+        schema = pa.schema([
+            (name, _arrow_type(pa, model, lookup, spec)) for name, lookup, spec in columns
+        ])
+        uuid_columns = [index for index, (_, _, spec) in enumerate(columns) if spec == 'uuid']
+        created_index = [name for name, _, _ in columns].index('created_at')
+
+        queryset = model.objects.filter(
+            user_id=job.user_id,
+            created_at__gte=job.start,
+            created_at__lt=job.end,
+        ).order_by('created_at', 'pk').values_list(*[lookup for _, lookup, _ in columns])
+
+        def upload(relative, path):
+            with open(path, 'rb') as f:
+                storage.save(storage_name(job, relative), File(f))
+
+        writer = _PartitionWriter(
+            pq, schema, root, job.dataset, getattr(settings, 'DATA_EXPORT_ROWS_PER_FILE', 1000000), upload
+        )
+
+        def flush(partition, rows):
+            for index in uuid_columns:
+                for row in rows:
+                    if row[index] is not None:
+                        row[index] = str(row[index])
+            arrays = [
+                pa.array([row[index] for row in rows], type=schema.field(index).type)
+                for index in range(len(columns))
+            ]
+            writer.write(partition, pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+        total_rows = 0
+        try:
+            rows, partition = [], None
+            for row in queryset.iterator(chunk_size=batch_size):
+                row_partition = row[created_index].astimezone(dt_timezone.utc).date().isoformat()
+                if rows and (row_partition != partition or len(rows) >= batch_size):
+                    flush(partition, rows)
+                    rows = []
+                partition = row_partition
+                rows.append(list(row))
+                total_rows += 1
+            if rows:
+                flush(partition, rows)
+        finally:
+            writer.close()
+
+        manifest = {
+            'job_id': str(job.id),
+            'dataset': job.dataset,
+            'format': 'parquet',
+            'start': job.start.isoformat(),
+            'end': job.end.isoformat(),
+            'partitioning': {'flavor': 'hive', 'columns': ['date']},
+            'schema': [{'name': field.name, 'type': str(field.type)} for field in schema],
+            'files': writer.files,
+            'total_rows': total_rows,
+            'total_bytes': sum(entry['bytes'] for entry in writer.files),
+            'generated_at': timezone.now().isoformat(),
+        }
+        storage.save(storage_name(job, MANIFEST_NAME), ContentFile(json.dumps(manifest, indent=2).encode()))
+        return manifest
+
+    @staticmethod
+    def file_name(job, relative):
+        """Storage name of a file listed in the job's manifest, or None"""
+        listed = {entry['path'] for entry in (job.manifest or {}).get('files', [])}
+        if relative == MANIFEST_NAME and job.manifest:
+            return storage_name(job, MANIFEST_NAME)
+        if relative not in listed:
+            return None
+        return storage_name(job, relative)
+
+    @staticmethod
+    def delete_files(job):
+        _delete_tree(export_storage(), str(job.id))
+
+    @staticmethod
+    def stale_before():
+        """Jobs still running that started before this have lost their worker"""
+        return timezone.now() - timedelta(seconds=settings.DATA_EXPORT_STALE_AFTER)
+
+    @staticmethod
+    def is_stale(job):
+        return job.status == 'running' and job.started_at is not None and job.started_at < ParquetExportService.stale_before()
+
+    @staticmethod
+    def fail_stale_jobs():
+        """Mark jobs whose worker died mid-export as failed and delete their partial files"""
+        failed = 0
+        for job in DataExportJob.objects.filter(status='running', started_at__lt=ParquetExportService.stale_before()).iterator():
+            try:
+                ParquetExportService.delete_files(job)
+                job.status = 'failed'
+                job.error_message = 'Export worker stopped before the export finished'
+                job.completed_at = timezone.now()
+                job.save(update_fields=['status', 'error_message', 'completed_at'])
+                failed += 1
+            except Exception as e:
+                logger.error(f"Error failing stale data export {job.id}: {str(e)}")
+        return failed
@@ -0,0 +1,122 @@
+"""
+Cached principals for JWT-authenticated requests
+
+user id -> account fields and plan tier, held briefly in-process in front of
+the shared Django cache (Redis). REST, GraphQL and socket connections resolve
+the user from here instead of querying auth_user on every request. Saving a
+user, profile or billing subscription drops the shared entry; the short local
+TTL bounds how long other processes can serve a stale copy.
+
+Shared entries carry the user's generation token, read before the database
+load. Invalidation replaces the token, so a principal loaded before a
+deactivation or plan change and written after it is never served.
+"""
+import logging
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .local_cache import USER_FIELDS, LocalCache, instance_from_values
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_key(user_id):
+    return f"jwt_principal:{user_id}"
+
+
+def _generation_key(user_id):
+    return f"jwt_principal_gen:{user_id}"
+
+
+class PrincipalCache:
+    """Resolves users by id with a small local TTL cache and a shared cache"""
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'JWT_PRINCIPAL_CACHE_TTL', 60)
+        self.local_ttl = getattr(settings, 'JWT_PRINCIPAL_CACHE_LOCAL_TTL', 5)
+        self.local_maxsize = getattr(settings, 'JWT_PRINCIPAL_CACHE_LOCAL_MAXSIZE', 10000)
+        self._local = LocalCache(self.local_maxsize, self.local_ttl)
+
+    def get(self, user_id):
+        """Return a User with only the principal fields loaded, or raise User.DoesNotExist"""
+        user_id = int(user_id)
+        principal = self._local.get(user_id)
+        if principal is None:
+            generation = self._local.generation
+            principal = self._shared_get(user_id)
+            self._local.set(user_id, principal, generation=generation)
+        user = instance_from_values(User, principal['user'])
+        user.plan_tier = principal['plan_tier']
+        return user
+
+    def _shared_get(self, user_id):
+        """Shared cache entry for the user, loaded from the database on a miss"""
+        entry_key, generation_key = _cache_key(user_id), _generation_key(user_id)
+        values = cache.get_many([entry_key, generation_key])
+        principal, generation = values.get(entry_key), values.get(generation_key)
+        if principal is not None and generation is not None and principal.get('generation') == generation:
+            return principal
+
+        if generation is None:
+            cache.add(generation_key, uuid.uuid4().hex, self.ttl * 2)
+            generation = cache.get(generation_key)
+        principal = self._load(user_id)
+        principal['generation'] = generation
+        cache.set(entry_key, principal, self.ttl)
+        return principal
+
+    def invalidate(self, user_id):
+        if not user_id:
+            return
+        self._local.pop(int(user_id))
+        try:
+            # Outlives any entry written with the old token by a load that raced with this
+            cache.set(_generation_key(user_id), uuid.uuid4().hex, self.ttl * 2)
+            cache.delete(_cache_key(user_id))
+        except Exception as e:
+            logger.error(f"Error invalidating principal cache: {str(e)}")
+
+    def _load(self, user_id):
+        from .billing_models import BillingSubscription
+
+        user = User.objects.only(*USER_FIELDS).get(id=user_id)
+        plan_tier = BillingSubscription.objects.filter(user_id=user_id).values_list('plan__tier', flat=True).first()
+        return {
+            'user': {field: getattr(user, field) for field in USER_FIELDS},
+            'plan_tier': plan_tier,
+        }
+
+
+principal_cache = PrincipalCache()
+
+
+def get_user_for_token(validated_token):
+    """Resolve the token's user through the principal cache"""
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('Token contained no recognizable user identification')
+
+    try:
+        user = principal_cache.get(user_id)
+    except (User.DoesNotExist, ValueError, TypeError):
+        raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user through the principal cache"""
+
+    def get_user(self, validated_token):
+        # Revocation checks compare against the password hash, which is not cached
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        return get_user_for_token(validated_token)
@@ -0,0 +1,310 @@
+"""
+Redis-backed rate limiting
+
+Limits are enforced with GCRA (generic cell rate algorithm) in a single Lua
+call, so the check-and-increment is atomic and costs one round trip. Each
+limited (user, route) pair stores one integer - its theoretical arrival time -
+which expires as soon as the client is back to a full burst, keeping Redis
+memory bounded.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = 'paybridge:ratelimit'
+
+# KEYS[1] = limiter key
+# ARGV[1] = emission interval in ms (window / limit)
+# ARGV[2] = burst offset in ms (window)
+# ARGV[3] = tokens requested
+# ARGV[4] = unspent tokens handed back first (optional)
+# Returns {granted, remaining, retry_after_ms}. Grants as many of the requested
+# tokens as are available, so callers asking for one token get all-or-nothing.
+GCRA_SCRIPT = """
+-- Effects replication is the default from Redis 5; older servers need it
+-- enabled explicitly because the script writes after reading TIME
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local emission_interval = tonumber(ARGV[1])
+local burst_offset = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local refund = tonumber(ARGV[4] or 0)
+
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+if refund > 0 then
+    tat = math.max(now, tat - refund * emission_interval)
+end
+
+local available = math.floor((now + burst_offset - tat) / emission_interval)
+local granted = math.max(0, math.min(requested, available))
+
+local new_tat = math.ceil(tat + granted * emission_interval)
+if granted > 0 or refund > 0 then
+    if new_tat > now then
+        redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', new_tat - now)
+    else
+        redis.call('DEL', KEYS[1])
+    end
+end
+if granted == 0 and requested > 0 then
+    return {0, 0, math.ceil(tat + emission_interval - burst_offset - now)}
+end
+return {granted, available - granted, 0}
+"""
+
+RateLimitResult = namedtuple('RateLimitResult', ['granted', 'remaining', 'retry_after_ms'])
+
+
+class GCRARateLimiter:
+    """Atomic GCRA rate limiter, one Redis round trip per call"""
+
+    def __init__(self, key_prefix=RATE_LIMIT_KEY_PREFIX, connection_alias='default'):
+        self.key_prefix = key_prefix
+        self.connection_alias = connection_alias
+        self._script = None
+
+    def get_script(self):
+        if self._script is None:
+            redis_client = get_redis_connection(self.connection_alias)
+            self._script = redis_client.register_script(GCRA_SCRIPT)
+        return self._script
+
+    def acquire(self, key, limit, window, tokens=1, refund=0):
+        """
+        Take up to `tokens` tokens for `key` from a bucket allowing `limit`
+        requests per `window` seconds, after returning `refund` unspent ones.
+        """
+        granted, remaining, retry_after_ms = self.get_script()(
+            keys=[f"{self.key_prefix}:{key}"],
+            args=self._args(limit, window, tokens, refund),
+        )
+        return RateLimitResult(int(granted), int(remaining), int(retry_after_ms))
+
+    def refund_many(self, refunds):
+        """Return unspent tokens for several keys in one pipelined round trip; refunds are (key, limit, window, tokens)"""
+        if not refunds:
+            return
+        script = self.get_script()
+        pipeline = get_redis_connection(self.connection_alias).pipeline(transaction=False)
+        for key, limit, window, tokens in refunds:
+            script(keys=[f"{self.key_prefix}:{key}"], args=self._args(limit, window, 0, tokens), client=pipeline)
+        pipeline.execute()
+
+    @staticmethod
+    def _args(limit, window, tokens, refund):
+        window_ms = window * 1000
+        return [window_ms / limit, window_ms, tokens, refund]
+
+
+class _RouteNode:
+    __slots__ = ('children', 'wildcard', 'rule')
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard = None
+        self.rule = None
+
+
+class RouteTrie:
+    """
+    Prefix trie over path segments.
+
+    Route templates look like '/api/v1/transactions/' or
+    '/api/v1/transactions/<id>/verify/'; '<...>' segments match any single
+    segment. `match` returns the longest matching (template, rule) so every
+    concrete path under a template shares one limiter key.
+    """
+
+    def __init__(self, rules=None):
+        self.root = _RouteNode()
+        for template, rule in (rules or {}).items():
+            self.insert(template, rule)
+
+    @staticmethod
+    def split(path):
+        return [segment for segment in path.split('/') if segment]
+
+    def insert(self, template, rule):
+        node = self.root
+        for segment in self.split(template):
+            if segment.startswith('<') and segment.endswith('>'):
+                if node.wildcard is None:
+                    node.wildcard = _RouteNode()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(segment, _RouteNode())
+        node.rule = (template, rule)
+
+    def match(self, path):
+        return self._match(self.root, self.split(path), 0)
+
+    def _match(self, node, segments, index):
+        best = node.rule
+        if index < len(segments):
+            # Literal segments take precedence over placeholders
+            for child in (node.children.get(segments[index]), node.wildcard):
+                if child is not None:
+                    found = self._match(child, segments, index + 1)
+                    if found is not None:
+                        return found
+        return best
+
+
+class _Lease:
+    __slots__ = ('tokens', 'size', 'limit', 'window', 'expires_at', 'denied_until')
+
+    def __init__(self, size, limit, window):
+        self.tokens = 0
+        self.size = size
+        self.limit = limit
+        self.window = window
+        self.expires_at = 0.0
+        self.denied_until = 0.0
+
+
+class LeasedRateLimiter:
+    """
+    In-process token bucket in front of a central limiter.
+
+    Tokens are leased from Redis in batches and spent locally, so a hot
+    (user, route) pair only pays a round trip once per lease. Leased tokens
+    are already debited centrally, so the global limit is never exceeded;
+    the error is bounded by tokens sitting unspent in leases, which expire
+    after `lease_ttl` seconds. Unspent tokens are handed back to Redis with
+    the key's next lease request, or in one pipeline when idle leases are
+    evicted. Lease size adapts per key: it doubles when a lease is used up
+    before expiring and halves when tokens are left over.
+    """
+
+    MAX_LEASES = 10000
+
+    def __init__(self, central=None, min_lease=None, max_lease=None,
+                 max_lease_fraction=None, lease_ttl=None):
+        self.central = central or GCRARateLimiter()
+        self.min_lease = min_lease or getattr(settings, 'RATE_LIMIT_LEASE_MIN', 1)
+        self.max_lease = max_lease or getattr(settings, 'RATE_LIMIT_LEASE_MAX', 50)
+        self.max_lease_fraction = max_lease_fraction or getattr(settings, 'RATE_LIMIT_LEASE_MAX_FRACTION', 0.02)
+        self.lease_ttl = lease_ttl or getattr(settings, 'RATE_LIMIT_LEASE_TTL', 1.0)
+        self._leases = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'local_grants': 0,
+            'local_denials': 0,
+            'remote_calls': 0,
+            'tokens_leased': 0,
+            'tokens_refunded': 0,
+        }
+
+    def lease_cap(self, limit):
+        """Largest lease for a limit; low limits always go to Redis"""
+        return max(self.min_lease, min(self.max_lease, int(limit * self.max_lease_fraction)))
+
+    def acquire(self, key, limit, window):
+        now = time.monotonic()
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None:
+                if now < lease.denied_until:
+                    self._stats['local_denials'] += 1
+                    return RateLimitResult(0, 0, int((lease.denied_until - now) * 1000))
+                if lease.tokens > 0 and now < lease.expires_at:
+                    lease.tokens -= 1
+                    self._stats['local_grants'] += 1
+                    return RateLimitResult(1, lease.tokens, 0)
+                size, refund = self._next_size(lease, now, limit)
+            else:
+                size, refund = self.min_lease, 0
+
+        # The Redis call happens outside the lock; a concurrent refill for the
+        # same key just leases a little early, it never over-admits.
+        result = self.central.acquire(key, limit, window, tokens=size, refund=refund)
+
+        evicted = []
+        with self._lock:
+            self._stats['remote_calls'] += 1
+            self._stats['tokens_refunded'] += refund
+            lease = self._leases.get(key)
+            if lease is None:
+                if len(self._leases) >= self.MAX_LEASES:
+                    evicted = self._evict(now)
+                lease = self._leases[key] = _Lease(size, limit, window)
+            lease.size = size
+            lease.limit = limit
+            lease.window = window
+            if not result.granted:
+                lease.tokens = 0
+                lease.denied_until = now + result.retry_after_ms / 1000
+            else:
+                self._stats['tokens_leased'] += result.granted
+                lease.tokens += result.granted - 1
+                lease.expires_at = now + self.lease_ttl
+                lease.denied_until = 0.0
+                result = RateLimitResult(1, result.remaining + lease.tokens, 0)
+        self._refund(evicted)
+        return result
+
+    def _next_size(self, lease, now, limit):
+        """Size of the next lease and the unspent tokens to hand back with it"""
+        cap = self.lease_cap(limit)
+        if lease.tokens > 0:
+            # Lease expired with tokens left: the key is cooler than we leased for
+            refund, lease.tokens = lease.tokens, 0
+            return max(self.min_lease, min(cap, lease.size // 2)), refund
+        if now < lease.expires_at:
+            return min(cap, lease.size * 2), 0
+        return min(cap, lease.size), 0
+
+    def _evict(self, now):
+        """Drop expired leases (all of them if none have expired); returns the refunds owed"""
+        expired = [
+            key for key, lease in self._leases.items()
+            if lease.expires_at <= now and lease.denied_until <= now
+        ]
+        if not expired:
+            expired = list(self._leases)
+        evicted = [(key, self._leases.pop(key)) for key in expired]
+        return [(key, lease.limit, lease.window, lease.tokens) for key, lease in evicted if lease.tokens > 0]
+
+    def _refund(self, refunds):
+        if not refunds:
+            return
+        try:
+            self.central.refund_many(refunds)
+        except Exception as e:
+            # The tokens stay debited until the key's bucket drains
+            logger.error(f"Failed to refund unspent rate limit tokens: {str(e)}")
+            return
+        with self._lock:
+            self._stats['tokens_refunded'] += sum(tokens for _, _, _, tokens in refunds)
+
+    def metrics(self):
+        """Snapshot of leasing parameters and counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['active_leases'] = len(self._leases)
+            stats['tokens_outstanding'] = sum(lease.tokens for lease in self._leases.values())
+        served = stats['local_grants'] + stats['local_denials']
+        total = served + stats['remote_calls']
+        stats['local_hit_ratio'] = round(served / total, 4) if total else 0.0
+        stats['config'] = {
+            'min_lease': self.min_lease,
+            'max_lease': self.max_lease,
+            'max_lease_fraction': self.max_lease_fraction,
+            'lease_ttl': self.lease_ttl,
+        }
+        return stats
+
+
+rate_limiter = LeasedRateLimiter()
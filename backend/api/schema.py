@@ -1,14 +1,21 @@
 import graphene
 from graphene_django import DjangoObjectType
-from django.db.models import Q, Sum, Count
-from decimal import Decimal
-from datetime import datetime, timedelta
 from .models import (
     Transaction, PaymentProvider, APIKey,
     AuditLog, KYCVerification, APILog, Invoice
 )
 from .webhook_models import WebhookSubscription
 from .billing_models import BillingSubscription
+from .analytics_engine import DashboardAnalytics
+from .graphql_loaders import USER_LOADER_FIELDS, get_loaders, queryset_for_selection
+from .pagination import connection_from_queryset
+from django.contrib.auth.models import User
+
+
+class UserType(DjangoObjectType):
+    class Meta:
+        model = User
+        fields = list(USER_LOADER_FIELDS)
 
 
 class TransactionType(DjangoObjectType):
@@ -19,6 +26,9 @@ class TransactionType(DjangoObjectType):
             'status', 'reference', 'customer_email', 'description',
             'fee', 'net_amount', 'created_at', 'updated_at'
         ]
+    
+    def resolve_user(self, info):
+        return get_loaders(info).users.load(self.user_id)
 
 
 class PaymentProviderType(DjangoObjectType):
@@ -51,6 +61,42 @@ class InvoiceType(DjangoObjectType):
         fields = ['id', 'invoice_number', 'status', 'amount', 'total', 'due_date']
 
 
+class TransactionConnection(graphene.relay.Connection):
+    class Meta:
+        node = TransactionType
+
+
+class PaymentProviderConnection(graphene.relay.Connection):
+    class Meta:
+        node = PaymentProviderType
+
+
+class APIKeyConnection(graphene.relay.Connection):
+    class Meta:
+        node = APIKeyType
+
+
+class WebhookConnection(graphene.relay.Connection):
+    class Meta:
+        node = WebhookType
+
+
+class InvoiceConnection(graphene.relay.Connection):
+    class Meta:
+        node = InvoiceType
+
+
+# Keyset-paginated list fields take first/after; cursors encode (created_at, id)
+PAGE_ARGS = {'first': graphene.Int(), 'after': graphene.String()}
+NODE_PATH = ('edges', 'node')
+
+
+def paginate(connection_type, queryset, info, first=None, after=None):
+    """One keyset page of the merchant's rows, loading only the selected columns"""
+    queryset = queryset_for_selection(queryset, info, path=NODE_PATH, always=('created_at',))
+    return connection_from_queryset(connection_type, queryset, first=first, after=after)
+
+
 class AnalyticsType(graphene.ObjectType):
     """Real-time analytics data aggregation"""
     total_transactions = graphene.Int()
@@ -61,66 +107,37 @@ class AnalyticsType(graphene.ObjectType):
     transactions_by_status = graphene.JSONString()
     daily_volume = graphene.List(graphene.JSONString)
     
+    # Resolved against a DashboardAnalytics root, which computes each
+    # query group once however many fields are selected
     def resolve_total_transactions(self, info, **kwargs):
-        user = info.context.user
-        return Transaction.objects.filter(user=user).count()
+        return self.summary['total_transactions']
     
     def resolve_total_volume(self, info, **kwargs):
-        user = info.context.user
-        result = Transaction.objects.filter(
-            user=user, status='completed'
-        ).aggregate(total=Sum('amount'))
-        return result['total'] or Decimal('0')
+        return self.summary['total_volume']
     
     def resolve_success_rate(self, info, **kwargs):
-        user = info.context.user
-        total = Transaction.objects.filter(user=user).count()
-        if total == 0:
-            return 0.0
-        successful = Transaction.objects.filter(
-            user=user, status='completed'
-        ).count()
-        return (successful / total) * 100
+        return self.summary['success_rate']
     
     def resolve_average_transaction_size(self, info, **kwargs):
-        user = info.context.user
-        result = Transaction.objects.filter(
-            user=user, status='completed'
-        ).aggregate(avg=Sum('amount') / Count('id'))
-        return result['avg'] or Decimal('0')
+        return self.summary['average_transaction_size']
     
     def resolve_transactions_by_provider(self, info, **kwargs):
-        user = info.context.user
-        providers = Transaction.objects.filter(user=user).values('provider').annotate(
-            count=Count('id'),
-            volume=Sum('amount')
-        )
-        return {p['provider']: {'count': p['count'], 'volume': str(p['volume'])} for p in providers}
+        return {
+            provider: {'count': data['count'], 'volume': str(data['volume'])}
+            for provider, data in self.breakdowns['by_provider'].items()
+        }
     
     def resolve_transactions_by_status(self, info, **kwargs):
-        user = info.context.user
-        statuses = Transaction.objects.filter(user=user).values('status').annotate(
-            count=Count('id')
-        )
-        return {s['status']: s['count'] for s in statuses}
+        return self.breakdowns['by_status']
     
     def resolve_daily_volume(self, info, **kwargs):
-        user = info.context.user
-        last_30_days = Transaction.objects.filter(
-            user=user,
-            created_at__gte=datetime.now() - timedelta(days=30)
-        ).values('created_at__date').annotate(
-            volume=Sum('amount'),
-            count=Count('id')
-        ).order_by('created_at__date')
-        
         return [
             {
-                'date': str(d['created_at__date']),
+                'date': str(d['date']),
                 'volume': str(d['volume']),
                 'count': d['count']
             }
-            for d in last_30_days
+            for d in self.breakdowns['daily_volume']
         ]
 
 
@@ -128,24 +145,25 @@ class Query(graphene.ObjectType):
     """GraphQL Query root for multi-provider unified access"""
     
     # Transactions
-    transactions = graphene.List(
-        TransactionType,
+    transactions = graphene.Field(
+        TransactionConnection,
         status=graphene.String(),
         provider=graphene.String(),
-        currency=graphene.String()
+        currency=graphene.String(),
+        **PAGE_ARGS
     )
     transaction = graphene.Field(TransactionType, reference=graphene.String())
     
     # Payment Providers
-    payment_providers = graphene.List(PaymentProviderType)
+    payment_providers = graphene.Field(PaymentProviderConnection, **PAGE_ARGS)
     payment_provider = graphene.Field(PaymentProviderType, provider=graphene.String())
     
     # API Keys
-    api_keys = graphene.List(APIKeyType)
+    api_keys = graphene.Field(APIKeyConnection, **PAGE_ARGS)
     api_key = graphene.Field(APIKeyType, id=graphene.String())
     
     # Webhooks
-    webhooks = graphene.List(WebhookType)
+    webhooks = graphene.Field(WebhookConnection, **PAGE_ARGS)
     webhook = graphene.Field(WebhookType, id=graphene.String())
     
     # Subscription
@@ -155,13 +173,13 @@ class Query(graphene.ObjectType):
     analytics = graphene.Field(AnalyticsType)
     
     # Invoices
-    invoices = graphene.List(InvoiceType)
+    invoices = graphene.Field(InvoiceConnection, **PAGE_ARGS)
     invoice = graphene.Field(InvoiceType, id=graphene.String())
     
-    def resolve_transactions(self, info, status=None, provider=None, currency=None, **kwargs):
+    def resolve_transactions(self, info, status=None, provider=None, currency=None, first=None, after=None, **kwargs):
         user = info.context.user
         if not user.is_authenticated:
-            return Transaction.objects.none()
+            return None
         
         queryset = Transaction.objects.filter(user=user)
         
@@ -173,7 +191,9 @@ class Query(graphene.ObjectType):
         if currency:
             queryset = queryset.filter(currency=currency)
         
-        return queryset.order_by('-created_at')[:20]  # Limit to 20 results
+        connection = paginate(TransactionConnection, queryset, info, first, after)
+        get_loaders(info).users.want(edge.node.user_id for edge in connection.edges)
+        return connection
     
     def resolve_transaction(self, info, reference):
         user = info.context.user
@@ -182,11 +202,11 @@ class Query(graphene.ObjectType):
         except Transaction.DoesNotExist:
             return None
     
-    def resolve_payment_providers(self, info):
+    def resolve_payment_providers(self, info, first=None, after=None):
         user = info.context.user
         if not user.is_authenticated:
-            return []
-        return PaymentProvider.objects.filter(user=user)
+            return None
+        return paginate(PaymentProviderConnection, PaymentProvider.objects.filter(user=user), info, first, after)
     
     def resolve_payment_provider(self, info, provider):
         user = info.context.user
@@ -195,11 +215,11 @@ class Query(graphene.ObjectType):
         except PaymentProvider.DoesNotExist:
             return None
     
-    def resolve_api_keys(self, info):
+    def resolve_api_keys(self, info, first=None, after=None):
         user = info.context.user
         if not user.is_authenticated:
-            return []
-        return APIKey.objects.filter(user=user)
+            return None
+        return paginate(APIKeyConnection, APIKey.objects.filter(user=user), info, first, after)
     
     def resolve_api_key(self, info, id):
         user = info.context.user
@@ -208,11 +228,11 @@ class Query(graphene.ObjectType):
         except APIKey.DoesNotExist:
             return None
     
-    def resolve_webhooks(self, info):
+    def resolve_webhooks(self, info, first=None, after=None):
         user = info.context.user
         if not user.is_authenticated:
-            return []
-        return WebhookSubscription.objects.filter(user=user)
+            return None
+        return paginate(WebhookConnection, WebhookSubscription.objects.filter(user=user), info, first, after)
     
     def resolve_webhook(self, info, id):
         user = info.context.user
@@ -224,18 +244,21 @@ class Query(graphene.ObjectType):
     def resolve_subscription(self, info):
         user = info.context.user
         try:
-            return BillingSubscription.objects.get(user=user)
+            return queryset_for_selection(BillingSubscription.objects.filter(user=user), info).get()
         except BillingSubscription.DoesNotExist:
             return None
     
     def resolve_analytics(self, info):
-        return AnalyticsType()
+        user = info.context.user
+        if not user.is_authenticated:
+            return None
+        return DashboardAnalytics(user)
     
-    def resolve_invoices(self, info):
+    def resolve_invoices(self, info, first=None, after=None):
         user = info.context.user
         if not user.is_authenticated:
-            return []
-        return Invoice.objects.filter(user=user)
+            return None
+        return paginate(InvoiceConnection, Invoice.objects.filter(user=user), info, first, after)
     
     def resolve_invoice(self, info, id):
         user = info.context.user
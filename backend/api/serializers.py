@@ -4,8 +4,9 @@ from django.contrib.auth.password_validation import validate_password
 from .models import (
     UserProfile, APIKey, PaymentProvider, Transaction, 
     AuditLog, KYCVerification,
-    Invoice, UsageMetric, CURRENCY_CHOICES
+    Invoice, UsageMetric, DataExportJob, CURRENCY_CHOICES
 )
+from django.conf import settings
 import phonenumbers
 
 
@@ -193,3 +194,23 @@ class UsageMetricSerializer(serializers.ModelSerializer):
 
 
 # WebhookEventSerializer moved to webhook_serializers.py
+
+
+class DataExportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DataExportJob
+        fields = [
+            'id', 'dataset', 'start', 'end', 'status', 'row_count', 'file_count',
+            'total_bytes', 'error_message', 'created_at', 'started_at', 'completed_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'row_count', 'file_count', 'total_bytes', 'error_message',
+            'created_at', 'started_at', 'completed_at'
+        ]
+    
+    def validate(self, data):
+        if data['start'] >= data['end']:
+            raise serializers.ValidationError({'end': 'end must be after start'})
+        if (data['end'] - data['start']).days > settings.DATA_EXPORT_MAX_DAYS:
+            raise serializers.ValidationError({'end': f"An export can cover at most {settings.DATA_EXPORT_MAX_DAYS} days"})
+        return data
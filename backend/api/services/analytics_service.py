@@ -81,7 +81,7 @@ class AnalyticsService:
             avg_response_time=Avg('response_time')
         )
         
-        by_endpoint = logs.values('endpoint').annotate(
+        by_endpoint = logs.values('route__template').annotate(
             count=Count('id'),
             avg_time=Avg('response_time'),
             error_count=Count('id', filter=Q(status_code__gte=400))
@@ -1,7 +1,15 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile, AuditLog
+from .models import UserProfile, AuditLog, APIKey, Transaction
+from .api_key_cache import api_key_cache
+from .principal_cache import principal_cache
+from .transaction_stats import TransactionStatsService
+from .analytics_cache import analytics_cache
+from .customer_sketches import CustomerSketchService
+from .billing_models import BillingSubscription
 from django.utils import timezone
 from datetime import timedelta
 import logging
@@ -31,3 +39,77 @@ def save_user_profile(sender, instance, **kwargs):
     """Save user profile"""
     if hasattr(instance, 'profile'):
         instance.profile.save()
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    """Drop cached authentication data when a key changes or is revoked"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_used'}:
+        return
+    key_hash = instance.key_hash
+    transaction.on_commit(lambda: api_key_cache.invalidate(key_hash))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_api_keys(sender, instance, created, **kwargs):
+    """Cached keys carry a copy of the owner's account fields"""
+    update_fields = kwargs.get('update_fields')
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    key_hashes = list(APIKey.objects.filter(user=instance).values_list('key_hash', flat=True))
+    
+    def invalidate():
+        for key_hash in key_hashes:
+            api_key_cache.invalidate(key_hash)
+    
+    if key_hashes:
+        transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    """Cached JWT principals carry account fields"""
+    update_fields = kwargs.get('update_fields')
+    if kwargs.get('created') or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    user_id = instance.id
+    transaction.on_commit(lambda: principal_cache.invalidate(user_id))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=BillingSubscription)
+@receiver(post_delete, sender=BillingSubscription)
+def invalidate_owner_principal(sender, instance, **kwargs):
+    """Profile and subscription changes can change the cached plan tier"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: principal_cache.invalidate(user_id))
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_transaction_stats(sender, instance, **kwargs):
+    """Take a deleted transaction out of its daily stats row"""
+    # Deleting the merchant (one user or a queryset of them) cascades to their stats rows as well
+    origin = kwargs.get('origin')
+    if isinstance(origin, User) or (isinstance(origin, QuerySet) and issubclass(origin.model, User)):
+        return
+    TransactionStatsService.record_change(old=TransactionStatsService.tracked_values(instance))
+
+
+@receiver(post_save, sender=Transaction)
+def record_transaction_customer(sender, instance, created, **kwargs):
+    """Add a new transaction's customer and card to the day's unique-count sketches"""
+    if not created:
+        return
+    transaction.on_commit(lambda: CustomerSketchService.record_transaction(instance))
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_transaction_analytics(sender, instance, **kwargs):
+    """New transactions and status changes invalidate the merchant's cached analytics"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: analytics_cache.bump(user_id))
@@ -7,8 +7,8 @@ import os
 from urllib.parse import quote_plus
 from django.conf import settings
 from rest_framework_simplejwt.tokens import AccessToken
-from django.contrib.auth.models import User
 from channels.db import database_sync_to_async
+from .principal_cache import get_user_for_token
 
 logger = logging.getLogger(__name__)
 
@@ -55,9 +55,7 @@ except Exception as e:
 def get_user_from_token(token):
     """Validate JWT token and get user"""
     try:
-        access_token = AccessToken(token)
-        user_id = access_token['user_id']
-        return User.objects.get(id=user_id)
+        return get_user_for_token(AccessToken(token))
     except Exception as e:
         logger.error(f"Token validation failed: {str(e)}")
         return None
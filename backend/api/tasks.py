@@ -3,6 +3,7 @@ import logging
 import requests
 import hmac
 import hashlib
+from django.conf import settings
 from django.utils import timezone
 from django.db.models import Sum
 from django.core.cache import cache
@@ -123,23 +124,120 @@ def check_overdue_invoices():
 
 @shared_task
 def cleanup_old_logs():
-    """Clean up old API logs (keep only 90 days)"""
+    """Apply retention to API and audit logs"""
+    from django.conf import settings
+    from .models import AuditLog
+    from .log_partitioning import is_partitioned, drop_expired_partitions
+    
+    retention = (
+        (APILog, settings.API_LOG_RETENTION_DAYS),
+        (AuditLog, settings.AUDIT_LOG_RETENTION_DAYS),
+    )
+    
+    for model, retention_days in retention:
+        table = model._meta.db_table
+        try:
+            cutoff_date = timezone.now() - timedelta(days=retention_days)
+            
+            # Whole partitions go in O(1), including the pre-partitioning legacy
+            # one once all of it is past retention; plain tables elsewhere
+            # still need the DELETE
+            if is_partitioned(table):
+                dropped = drop_expired_partitions(table, cutoff_date)
+                logger.info(f"Dropped {len(dropped)} expired partitions from {table}")
+                continue
+            
+            deleted_count, _ = model.objects.filter(
+                created_at__lt=cutoff_date
+            ).delete()
+            
+            logger.info(f"Deleted {deleted_count} old rows from {table}")
+            
+        except Exception as e:
+            logger.error(f"Error cleaning up {table}: {str(e)}")
+
+
+@shared_task
+def maintain_log_partitions():
+    """Pre-create upcoming log partitions"""
+    from django.conf import settings
+    from .log_partitioning import PARTITION_INTERVALS, is_partitioned, ensure_partitions
+    
+    for table in PARTITION_INTERVALS:
+        try:
+            if is_partitioned(table):
+                ensure_partitions(table, ahead=settings.LOG_PARTITION_PREMAKE)
+        except Exception as e:
+            logger.error(f"Error creating partitions for {table}: {str(e)}")
+
+
+@shared_task
+def compact_usage_rollups():
+    """Compact minute usage rollups into hours and hours into days"""
+    from .usage_rollups import UsageRollupService
+    
     try:
-        cutoff_date = timezone.now() - timedelta(days=90)
-        
-        deleted_count, _ = APILog.objects.filter(
-            created_at__lt=cutoff_date
-        ).delete()
-        
-        logger.info(f"Deleted {deleted_count} old API logs")
-        
+        UsageRollupService.compact_all()
+    except Exception as e:
+        logger.error(f"Error compacting usage rollups: {str(e)}")
+
+
+# The soft limit fails the job cleanly; the hard limit stops a hung worker, after
+# which the job counts as stale (DATA_EXPORT_STALE_AFTER) and can be cleaned up
+@shared_task(soft_time_limit=settings.DATA_EXPORT_TIME_LIMIT, time_limit=settings.DATA_EXPORT_TIME_LIMIT + 300)
+def run_data_export(job_id):
+    """Write a DataExportJob's Parquet files and manifest"""
+    from .export_models import DataExportJob
+    from .parquet_export import ParquetExportService
+    
+    try:
+        job = DataExportJob.objects.get(id=job_id)
+    except DataExportJob.DoesNotExist:
+        logger.warning(f"Data export job {job_id} not found")
+        return
+    
+    if job.status not in ('pending', 'failed'):
+        logger.info(f"Data export job {job_id} already {job.status}")
+        return
+    
+    ParquetExportService.run(job)
+
+
+@shared_task
+def cleanup_data_exports():
+    """Fail exports whose worker died, and delete export jobs and their files once past retention"""
+    from .export_models import DataExportJob
+    from .parquet_export import ParquetExportService
+    
+    failed = ParquetExportService.fail_stale_jobs()
+    if failed:
+        logger.warning(f"Failed {failed} stale data exports")
+    
+    cutoff_date = timezone.now() - timedelta(days=settings.DATA_EXPORT_RETENTION_DAYS)
+    for job in DataExportJob.objects.filter(created_at__lt=cutoff_date).exclude(status='running').iterator():
+        try:
+            ParquetExportService.delete_files(job)
+            job.delete()
+        except Exception as e:
+            logger.error(f"Error deleting data export {job.id}: {str(e)}")
+
+
+@shared_task
+def flush_api_key_last_used():
+    """Write coalesced API key last_used timestamps"""
+    from .api_key_activity import flush_last_used
+    
+    try:
+        flushed = flush_last_used()
+        if flushed:
+            logger.debug(f"Flushed last_used for {flushed} API keys")
     except Exception as e:
-        logger.error(f"Error cleaning up logs: {str(e)}")
+        logger.error(f"Error flushing API key last_used: {str(e)}")
 
 
 @shared_task
 def update_api_key_last_used(api_key_id):
-    """Update API key last_used timestamp asynchronously"""
+    """Update API key last_used timestamp (superseded by flush_api_key_last_used; kept for queued messages)"""
     from .models import APIKey
     from channels.layers import get_channel_layer
     from asgiref.sync import async_to_sync
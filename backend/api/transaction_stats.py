@@ -0,0 +1,194 @@
+"""
+TransactionDailyStats maintenance
+Transaction.save() and post_delete apply +1/-1 deltas to the affected daily
+rows inside the same database transaction, so analytics read a few hundred
+pre-aggregated rows instead of scanning every transaction. rebuild() repairs
+drift by applying corrections as deltas of the same kind.
+"""
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .analytics_models import TransactionDailyStats
+
+logger = logging.getLogger(__name__)
+
+# Transaction fields that place a row in a stats bucket or are summed into it
+TRACKED_FIELDS = ('user_id', 'created_at', 'provider', 'currency', 'status', 'amount', 'fee')
+KEY_FIELDS = ('user_id', 'date', 'provider', 'currency', 'status')
+SUM_FIELDS = ('count', 'amount_sum', 'fee_sum')
+CENT = Decimal('0.01')
+
+
+def _bucket(values):
+    """(stats key, counters) for one transaction's tracked values"""
+    key = (
+        values['user_id'],
+        timezone.localdate(values['created_at']),
+        values['provider'],
+        values['currency'],
+        values['status'],
+    )
+    return key, (1, _to_cents(values['amount']), _to_cents(values['fee']))
+
+
+def _to_cents(value):
+    """Round unsaved values the way the numeric(15, 2) columns store them"""
+    return Decimal(value or 0).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class TransactionStatsService:
+    """Keeps TransactionDailyStats in step with Transaction"""
+
+    @staticmethod
+    def tracked_values(instance):
+        return {name: getattr(instance, name) for name in TRACKED_FIELDS}
+
+    @staticmethod
+    def locked_values(pk):
+        """Current tracked values of a stored transaction, locking its row"""
+        from .models import Transaction
+        return Transaction.objects.select_for_update().filter(pk=pk).values(*TRACKED_FIELDS).first()
+
+    @staticmethod
+    def record_change(old=None, new=None):
+        """Move a transaction between buckets; either side may be None (create/delete)"""
+        deltas = {}
+        for values, sign in ((old, -1), (new, 1)):
+            if values is None:
+                continue
+            key, counters = _bucket(values)
+            current = deltas.get(key, (0, Decimal('0'), Decimal('0')))
+            deltas[key] = tuple(total + sign * value for total, value in zip(current, counters))
+        TransactionStatsService.apply({key: delta for key, delta in deltas.items() if any(delta)})
+
+    @staticmethod
+    def apply(deltas):
+        """Add counter deltas into stats rows, creating rows as needed"""
+        if not deltas:
+            return
+        if connection.vendor == 'postgresql':
+            TransactionStatsService._apply_postgres(deltas)
+        else:
+            TransactionStatsService._apply_generic(deltas)
+
+    @staticmethod
+    def _apply_postgres(deltas, chunk_size=1000):
+        columns = KEY_FIELDS + SUM_FIELDS
+        updates = [f"{name} = transaction_daily_stats.{name} + EXCLUDED.{name}" for name in SUM_FIELDS]
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        items = list(deltas.items())
+
+        with connection.cursor() as cursor:
+            for offset in range(0, len(items), chunk_size):
+                chunk = items[offset:offset + chunk_size]
+                params = []
+                for key, counters in chunk:
+                    params.extend(key)
+                    params.extend(counters)
+                cursor.execute(
+                    f"INSERT INTO transaction_daily_stats ({', '.join(columns)}) "
+                    f"VALUES {', '.join([row_sql] * len(chunk))} "
+                    f"ON CONFLICT (user_id, date, provider, currency, status) "
+                    f"DO UPDATE SET {', '.join(updates)}",
+                    params
+                )
+
+    @staticmethod
+    def _apply_generic(deltas):
+        with transaction.atomic():
+            for key, counters in deltas.items():
+                lookup = dict(zip(KEY_FIELDS, key))
+                row = TransactionDailyStats.objects.select_for_update().filter(**lookup).first()
+                if row is None:
+                    TransactionDailyStats.objects.create(**lookup, **dict(zip(SUM_FIELDS, counters)))
+                    continue
+                for name, value in zip(SUM_FIELDS, counters):
+                    setattr(row, name, getattr(row, name) + value)
+                row.save()
+
+    @staticmethod
+    def _drift(user_ids, since=None):
+        """stats key -> counters the stored rows are missing for these users, read from one snapshot"""
+        from .models import Transaction
+
+        transactions = Transaction.objects.filter(user_id__in=user_ids)
+        stats = TransactionDailyStats.objects.filter(user_id__in=user_ids)
+        if since is not None:
+            transactions = transactions.filter(created_at__date__gte=since)
+            stats = stats.filter(date__gte=since)
+
+        aggregated = transactions.annotate(
+            date=TruncDate('created_at')
+        ).values(
+            *KEY_FIELDS
+        ).annotate(
+            count=Count('id'),
+            amount_sum=Sum('amount'),
+            fee_sum=Sum('fee'),
+        ).order_by()
+
+        # Both reads must see the same committed transactions; the isolation level
+        # can only be set by the statement that starts the transaction
+        snapshot = connection.vendor == 'postgresql' and not connection.in_atomic_block
+        with transaction.atomic():
+            if snapshot:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            expected = {
+                tuple(item[name] for name in KEY_FIELDS): tuple(item[name] or 0 for name in SUM_FIELDS)
+                for item in aggregated
+            }
+            stored = {
+                tuple(item[:len(KEY_FIELDS)]): tuple(item[len(KEY_FIELDS):])
+                for item in stats.values_list(*KEY_FIELDS, *SUM_FIELDS)
+            }
+
+        deltas = {}
+        for key in expected.keys() | stored.keys():
+            delta = tuple(
+                want - have
+                for want, have in zip(expected.get(key, (0, 0, 0)), stored.get(key, (0, 0, 0)))
+            )
+            if any(delta):
+                deltas[key] = delta
+        return deltas
+
+    @staticmethod
+    def rebuild(user_id=None, since=None, users_per_batch=100):
+        """
+        Reconcile stats rows with transactions, a batch of users at a time;
+        returns the number of rows corrected.
+
+        Each batch compares the transaction aggregate with the stored rows as of
+        one snapshot and applies the difference as ordinary deltas. Deltas from
+        payments committed in the meantime add on top, so no table lock is
+        needed and payments are never blocked by a rebuild.
+        """
+        from django.contrib.auth.models import User
+
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if user_id is not None:
+            users = users.filter(id=user_id)
+
+        corrected, batch = 0, []
+        for uid in users.iterator(chunk_size=users_per_batch):
+            batch.append(uid)
+            if len(batch) >= users_per_batch:
+                corrected += TransactionStatsService._reconcile(batch, since)
+                batch = []
+        if batch:
+            corrected += TransactionStatsService._reconcile(batch, since)
+        return corrected
+
+    @staticmethod
+    def _reconcile(user_ids, since):
+        deltas = TransactionStatsService._drift(user_ids, since)
+        TransactionStatsService.apply(deltas)
+        # Buckets whose transactions are all gone
+        TransactionDailyStats.objects.filter(
+            user_id__in=[key[0] for key in deltas], count=0, amount_sum=0, fee_sum=0
+        ).delete()
+        return len(deltas)
@@ -6,7 +6,7 @@ from .views import (
     TransactionViewSet,
     KYCViewSet, AnalyticsViewSet, BillingViewSet, AuditLogViewSet,
     LoginView, RegisterView, PasswordResetRequestView, PasswordResetConfirmView,
-    HealthCheckView
+    HealthCheckView, HealthInternalsView
 )
 from .settlement_views import SettlementViewSet
 from .analytics_views import AnalyticsViewSet as SystemAnalyticsViewSet
@@ -20,6 +20,7 @@ from .webhook_management_views import (
 from .webhook_receiver import (
     webhook_paystack, webhook_flutterwave, webhook_stripe, webhook_mono
 )
+from .export_views import DataExportJobViewSet
 from .settings_views import (
     BusinessProfileViewSet, PaymentProviderConfigViewSet
 )
@@ -40,6 +41,7 @@ router.register(r'billing', BillingViewSet, basename='billing')
 router.register(r'audit-logs', AuditLogViewSet, basename='audit-log')
 router.register(r'settlements', SettlementViewSet, basename='settlement')
 router.register(r'system-analytics', SystemAnalyticsViewSet, basename='system-analytics')
+router.register(r'data-exports', DataExportJobViewSet, basename='data-export')
 
 # Authentication URLs
 auth_patterns = [
@@ -69,6 +71,7 @@ webhook_patterns = [
 
 urlpatterns = [
     path('health/', HealthCheckView.as_view(), name='health_check'),
+    path('health/internals/', HealthInternalsView.as_view(), name='health_internals'),
     path('', include(router.urls)),
     path('', include(auth_patterns)),
     path('', include(billing_patterns)),
@@ -0,0 +1,212 @@
+"""
+API usage rollup maintenance
+Log batches are folded into per-minute APIUsageRollup rows, which are later
+compacted into hour and day buckets so dashboards read a bounded number of rows.
+"""
+import logging
+import re
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models.functions import TruncHour, TruncDay
+from django.utils import timezone
+from .analytics_models import APIUsageRollup, LATENCY_BUCKETS, LATENCY_FIELDS, NO_API_KEY
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+# Columns of a rollup bucket and the counters summed into it
+KEY_FIELDS = ('user_id', 'api_key_id', 'route', 'method', 'status_class', 'granularity', 'bucket_start')
+SUM_FIELDS = ('request_count', 'request_bytes', 'response_bytes', 'response_time_sum') + LATENCY_FIELDS
+MAX_FIELDS = ('response_time_max',)
+
+_NAMED_GROUP_RE = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
+
+def route_template(request):
+    """URL route template for a request, e.g. /api/v1/transactions/<pk>/verify/"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.route:
+        return UNMATCHED_ROUTE
+    # DRF routers register regex patterns; reduce them to <name> placeholders
+    route = _NAMED_GROUP_RE.sub(r'<\1>', match.route).replace('^', '').replace('$', '')
+    return ('/' + route.lstrip('/'))[:255]
+
+
+def latency_field(response_time):
+    for bound, field in zip(LATENCY_BUCKETS, LATENCY_FIELDS):
+        if response_time <= bound:
+            return field
+    return LATENCY_FIELDS[-1]
+
+
+class UsageRollupService:
+    """Incremental maintenance of APIUsageRollup"""
+
+    @staticmethod
+    def aggregate_logs(entries):
+        """Fold API log entries (dicts as queued by the log writer) into minute buckets"""
+        buckets = {}
+        for entry in entries:
+            bucket_start = entry['created_at'].replace(second=0, microsecond=0)
+            key = (
+                entry['user_id'],
+                entry.get('api_key_id'),
+                entry.get('route') or UNMATCHED_ROUTE,
+                entry['method'],
+                entry['status_code'] // 100,
+                'minute',
+                bucket_start,
+            )
+            row = buckets.get(key)
+            if row is None:
+                row = buckets[key] = dict.fromkeys(SUM_FIELDS + MAX_FIELDS, 0)
+            response_time = entry['response_time']
+            row['request_count'] += 1
+            row['request_bytes'] += entry.get('request_size', 0)
+            row['response_bytes'] += entry.get('response_size', 0)
+            row['response_time_sum'] += response_time
+            row['response_time_max'] = max(row['response_time_max'], response_time)
+            row[latency_field(response_time)] += 1
+        return buckets
+
+    @staticmethod
+    def upsert(buckets):
+        """Add counters into rollup rows, creating buckets as needed"""
+        if not buckets:
+            return
+        if connection.vendor == 'postgresql':
+            UsageRollupService._upsert_postgres(buckets)
+        else:
+            UsageRollupService._upsert_generic(buckets)
+
+    @staticmethod
+    def _upsert_postgres(buckets, chunk_size=1000):
+        columns = KEY_FIELDS + SUM_FIELDS + MAX_FIELDS
+        updates = [f"{name} = api_usage_rollups.{name} + EXCLUDED.{name}" for name in SUM_FIELDS]
+        updates += [f"{name} = GREATEST(api_usage_rollups.{name}, EXCLUDED.{name})" for name in MAX_FIELDS]
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        items = list(buckets.items())
+
+        with connection.cursor() as cursor:
+            for offset in range(0, len(items), chunk_size):
+                chunk = items[offset:offset + chunk_size]
+                params = []
+                for key, counters in chunk:
+                    params.extend(key)
+                    params.extend(counters[name] for name in SUM_FIELDS + MAX_FIELDS)
+                cursor.execute(
+                    f"INSERT INTO api_usage_rollups ({', '.join(columns)}) "
+                    f"VALUES {', '.join([row_sql] * len(chunk))} "
+                    # Conflict target must match the api_usage_rollup_bucket_uniq index
+                    f"ON CONFLICT (user_id, (COALESCE(api_key_id, '{NO_API_KEY}'::uuid)), route, method, "
+                    f"status_class, granularity, bucket_start) "
+                    f"DO UPDATE SET {', '.join(updates)}",
+                    params
+                )
+
+    @staticmethod
+    def _upsert_generic(buckets):
+        with transaction.atomic():
+            for key, counters in buckets.items():
+                lookup = dict(zip(KEY_FIELDS, key))
+                row = APIUsageRollup.objects.select_for_update().filter(**lookup).first()
+                if row is None:
+                    APIUsageRollup.objects.create(**lookup, **counters)
+                    continue
+                for name in SUM_FIELDS:
+                    setattr(row, name, getattr(row, name) + counters[name])
+                for name in MAX_FIELDS:
+                    setattr(row, name, max(getattr(row, name), counters[name]))
+                row.save()
+
+    @staticmethod
+    def record_logs(entries):
+        UsageRollupService.upsert(UsageRollupService.aggregate_logs(entries))
+
+    @staticmethod
+    def compact(source, target, cutoff):
+        """
+        Merge `source` granularity rows older than `cutoff` into `target` buckets.
+        Rows are moved, not copied, so summing across granularities stays exact:
+        only the rows that were aggregated are deleted, and log writes into them
+        wait until the move commits and then start a fresh row.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                deleted, buckets = UsageRollupService._take_postgres(source, target, cutoff)
+            else:
+                deleted, buckets = UsageRollupService._take_generic(source, target, cutoff)
+            UsageRollupService.upsert(buckets)
+
+        if deleted:
+            logger.info(f"Compacted {deleted} {source} usage rollups into {len(buckets)} {target} buckets")
+        return deleted
+
+    @staticmethod
+    def _take_postgres(source, target, cutoff):
+        """Delete the source rows and aggregate exactly what was deleted, in one statement"""
+        group_columns = ('user_id', 'api_key_id', 'route', 'method', 'status_class')
+        moved_columns = group_columns + ('bucket_start',) + SUM_FIELDS + MAX_FIELDS
+        tz_name = timezone.get_current_timezone_name()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH moved AS ("
+                f"DELETE FROM api_usage_rollups WHERE granularity = %s AND bucket_start < %s "
+                f"RETURNING {', '.join(moved_columns)}) "
+                f"SELECT {', '.join(group_columns)}, "
+                # Same buckets as TruncHour/TruncDay in the current time zone
+                f"date_trunc(%s, bucket_start AT TIME ZONE %s) AT TIME ZONE %s, COUNT(*), "
+                f"{', '.join(f'SUM({name})' for name in SUM_FIELDS)}, "
+                f"{', '.join(f'MAX({name})' for name in MAX_FIELDS)} "
+                f"FROM moved GROUP BY {', '.join(str(n) for n in range(1, len(group_columns) + 2))}",
+                [source, cutoff, target, tz_name, tz_name]
+            )
+            rows = cursor.fetchall()
+
+        deleted, buckets = 0, {}
+        for row in rows:
+            key = row[:len(group_columns)] + (target, row[len(group_columns)])
+            deleted += row[len(group_columns) + 1]
+            values = row[len(group_columns) + 2:]
+            counters = {name: value or 0 for name, value in zip(SUM_FIELDS + MAX_FIELDS, values)}
+            buckets[key] = counters
+        return deleted, buckets
+
+    @staticmethod
+    def _take_generic(source, target, cutoff, chunk_size=500):
+        """Lock and read the source rows, aggregate them here and delete them by id"""
+        trunc = TruncHour if target == 'hour' else TruncDay
+        rows = APIUsageRollup.objects.select_for_update().filter(
+            granularity=source, bucket_start__lt=cutoff
+        ).annotate(
+            target_bucket=trunc('bucket_start')
+        ).values('id', 'user_id', 'api_key_id', 'route', 'method', 'status_class', 'target_bucket', *SUM_FIELDS, *MAX_FIELDS)
+
+        ids, buckets = [], {}
+        for row in rows:
+            ids.append(row['id'])
+            key = (
+                row['user_id'], row['api_key_id'], row['route'], row['method'],
+                row['status_class'], target, row['target_bucket'],
+            )
+            counters = buckets.get(key)
+            if counters is None:
+                counters = buckets[key] = dict.fromkeys(SUM_FIELDS + MAX_FIELDS, 0)
+            for name in SUM_FIELDS:
+                counters[name] += row[name]
+            for name in MAX_FIELDS:
+                counters[name] = max(counters[name], row[name])
+
+        for offset in range(0, len(ids), chunk_size):
+            APIUsageRollup.objects.filter(id__in=ids[offset:offset + chunk_size]).delete()
+        return len(ids), buckets
+
+    @staticmethod
+    def compact_all():
+        """Minute buckets older than 2 hours become hours; hours older than 2 days become days"""
+        now = timezone.now()
+        hour_cutoff = (now - timedelta(hours=2)).replace(minute=0, second=0, microsecond=0)
+        day_cutoff = (now - timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+        UsageRollupService.compact('minute', 'hour', hour_cutoff)
+        UsageRollupService.compact('hour', 'day', day_cutoff)
@@ -1,11 +1,23 @@
 """
 Real-time Usage Tracking Service with Redis
+
+Counters live in the hash ``usage:{user_id}:{YYYY-MM}``. For high-volume
+merchants the hash is split into K shards (``usage:{user_id}:{YYYY-MM}:{i}``
+for i > 0) so writes spread across Redis Cluster slots. Writes pick a random
+shard and reads sum all shards. K is chosen from the observed write rate and
+only ever grows within a billing period. Writers use a briefly cached K, but
+readers sum every possible shard (up to USAGE_MAX_SHARDS) in one pipeline, so
+a shard added by another process is never missed.
 """
 import logging
+import math
+import random
+import time
 import redis
 from django.conf import settings
 from django.utils import timezone
 from .billing_models import UsageTracking
+from .local_cache import LocalCache
 from .redis_pubsub import publish_event
 
 logger = logging.getLogger(__name__)
@@ -19,6 +31,25 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
+USAGE_KEY_TTL = 60 * 60 * 24 * 35  # 35 days
+USAGE_FIELDS = ('api_calls', 'webhooks', 'analytics')
+
+# Raise the stored shard count only if the new value is larger
+GROW_SHARDS_SCRIPT = redis_client.register_script("""
+local current = tonumber(redis.call('GET', KEYS[1]) or '1')
+local desired = tonumber(ARGV[1])
+if desired > current then
+    redis.call('SET', KEYS[1], desired, 'EX', ARGV[2])
+    return desired
+end
+return current
+""")
+
+# In-process caches keyed by (user_id, period)
+_LOCAL_CACHE_MAX_ENTRIES = 10000
+_shard_count_cache = LocalCache(_LOCAL_CACHE_MAX_ENTRIES, settings.USAGE_SHARD_COUNT_CACHE_TTL)
+_usage_total_cache = LocalCache(_LOCAL_CACHE_MAX_ENTRIES, settings.USAGE_TOTAL_CACHE_TTL)
+
 
 class UsageTrackingService:
     """Service for tracking real-time usage"""
@@ -30,17 +61,129 @@ class UsageTrackingService:
             period = timezone.now().strftime('%Y-%m')
         return f"usage:{user_id}:{period}"
     
+    @staticmethod
+    def get_shard_key(user_id, period, shard):
+        """Get Redis key for one usage shard (shard 0 is the legacy key)"""
+        base_key = UsageTrackingService.get_redis_key(user_id, period)
+        return base_key if shard == 0 else f"{base_key}:{shard}"
+    
+    @staticmethod
+    def get_shard_count(user_id, period):
+        """Get the number of usage shards for a user in a period"""
+        cache_key = (user_id, period)
+        shards = _shard_count_cache.get(cache_key)
+        if shards is None:
+            shards = int(redis_client.get(f"usage_shards:{user_id}:{period}") or 1)
+            _shard_count_cache.set(cache_key, shards)
+        return shards
+    
+    @staticmethod
+    def shards_for_rate(writes_per_second):
+        """Number of shards needed to keep each shard under the target write rate"""
+        needed = math.ceil(writes_per_second / settings.USAGE_SHARD_TARGET_RATE)
+        return max(1, min(settings.USAGE_MAX_SHARDS, needed))
+    
+    @staticmethod
+    def _observe_rate(user_id, period, shards):
+        """
+        Sample the write rate and grow the shard count when needed.
+        Only 1 in USAGE_RATE_SAMPLE_EVERY writes touches the rate key.
+        """
+        sample_every = settings.USAGE_RATE_SAMPLE_EVERY
+        if random.random() >= 1.0 / sample_every:
+            return
+        
+        now = time.time()
+        minute = int(now // 60)
+        rate_key = f"usage_rate:{user_id}:{minute}"
+        
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incr(rate_key)
+        pipe.expire(rate_key, 120)
+        sampled = pipe.execute()[0]
+        
+        # Ignore the first seconds of a minute, the estimate is too noisy
+        elapsed = max(now - minute * 60, 10)
+        desired = UsageTrackingService.shards_for_rate(sampled * sample_every / elapsed)
+        
+        if desired > shards:
+            new_shards = int(GROW_SHARDS_SCRIPT(
+                keys=[f"usage_shards:{user_id}:{period}"],
+                args=[desired, USAGE_KEY_TTL],
+            ))
+            _shard_count_cache.set((user_id, period), new_shards)
+            logger.info(f"Usage counters for user {user_id} split into {new_shards} shards")
+    
+    @staticmethod
+    def _increment(user_id, field):
+        """
+        Increment a usage counter on a random shard.
+        Returns (total, shard_count): the total is exact for unsharded users
+        and read from the cached total otherwise.
+        """
+        period = timezone.now().strftime('%Y-%m')
+        shards = UsageTrackingService.get_shard_count(user_id, period)
+        shard = random.randrange(shards) if shards > 1 else 0
+        redis_key = UsageTrackingService.get_shard_key(user_id, period, shard)
+        
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hincrby(redis_key, field, 1)
+        pipe.expire(redis_key, USAGE_KEY_TTL)
+        shard_count = pipe.execute()[0]
+        
+        UsageTrackingService._observe_rate(user_id, period, shards)
+        
+        if shards == 1:
+            total = shard_count
+            cached = _usage_total_cache.get((user_id, period))
+            if cached is not None:
+                cached[field] = total
+        else:
+            total = UsageTrackingService.get_cached_totals(user_id, period)[field]
+        
+        return total, shard_count
+    
+    @staticmethod
+    def get_usage_totals(user_id, period=None):
+        """Sum usage counters across all shards; shards that were never written cost nothing"""
+        if not period:
+            period = timezone.now().strftime('%Y-%m')
+        # Not the cached K, which lags when another process grows it
+        shards = max(settings.USAGE_MAX_SHARDS, UsageTrackingService.get_shard_count(user_id, period))
+        
+        pipe = redis_client.pipeline(transaction=False)
+        for shard in range(shards):
+            pipe.hgetall(UsageTrackingService.get_shard_key(user_id, period, shard))
+        
+        totals = dict.fromkeys(USAGE_FIELDS, 0)
+        found = False
+        for shard_data in pipe.execute():
+            for field, value in shard_data.items():
+                found = True
+                totals[field] = totals.get(field, 0) + int(value)
+        
+        return totals if found else None
+    
+    @staticmethod
+    def get_cached_totals(user_id, period=None):
+        """
+        Get usage totals from a short-lived in-process cache.
+        Cheap enough for the per-request limit check.
+        """
+        if not period:
+            period = timezone.now().strftime('%Y-%m')
+        cache_key = (user_id, period)
+        totals = _usage_total_cache.get(cache_key)
+        if totals is None:
+            totals = UsageTrackingService.get_usage_totals(user_id, period) or dict.fromkeys(USAGE_FIELDS, 0)
+            _usage_total_cache.set(cache_key, totals)
+        return totals
+    
     @staticmethod
     def increment_api_call(user):
         """Increment API call counter"""
         try:
-            now = timezone.now()
-            period = now.strftime('%Y-%m')
-            redis_key = UsageTrackingService.get_redis_key(user.id, period)
-            
-            # Increment in Redis
-            new_count = redis_client.hincrby(redis_key, 'api_calls', 1)
-            redis_client.expire(redis_key, 60 * 60 * 24 * 35)  # 35 days
+            new_count, shard_count = UsageTrackingService._increment(user.id, 'api_calls')
             
             # Get user's plan limit
             subscription = user.billing_subscription
@@ -59,8 +202,8 @@ class UsageTrackingService:
                 
                 logger.warning(f"User {user.email} reached API limit: {new_count}/{api_limit}")
             
-            # Emit usage update every 10 calls
-            if new_count % 10 == 0:
+            # Emit usage update every 10 calls (per shard, so the overall rate is unchanged)
+            if shard_count % 10 == 0:
                 publish_event('billing_usage', {
                     'type': 'usage:update',
                     'user_id': user.id,
@@ -70,7 +213,7 @@ class UsageTrackingService:
                 })
             
             # Sync to database every 100 calls
-            if new_count % 100 == 0:
+            if shard_count % 100 == 0:
                 UsageTrackingService.sync_to_database(user)
             
             return new_count
@@ -83,13 +226,7 @@ class UsageTrackingService:
     def increment_webhook(user):
         """Increment webhook counter"""
         try:
-            now = timezone.now()
-            period = now.strftime('%Y-%m')
-            redis_key = UsageTrackingService.get_redis_key(user.id, period)
-            
-            # Increment in Redis
-            new_count = redis_client.hincrby(redis_key, 'webhooks', 1)
-            redis_client.expire(redis_key, 60 * 60 * 24 * 35)
+            new_count, _ = UsageTrackingService._increment(user.id, 'webhooks')
             
             # Get user's plan limit
             subscription = user.billing_subscription
@@ -125,13 +262,7 @@ class UsageTrackingService:
     def increment_analytics_request(user):
         """Increment analytics request counter"""
         try:
-            now = timezone.now()
-            period = now.strftime('%Y-%m')
-            redis_key = UsageTrackingService.get_redis_key(user.id, period)
-            
-            # Increment in Redis
-            new_count = redis_client.hincrby(redis_key, 'analytics', 1)
-            redis_client.expire(redis_key, 60 * 60 * 24 * 35)
+            new_count, _ = UsageTrackingService._increment(user.id, 'analytics')
             
             # Emit usage update
             publish_event('billing_usage', {
@@ -152,26 +283,26 @@ class UsageTrackingService:
         try:
             now = timezone.now()
             period = now.strftime('%Y-%m')
-            redis_key = UsageTrackingService.get_redis_key(user.id, period)
             
-            usage_data = redis_client.hgetall(redis_key)
+            usage_data = UsageTrackingService.get_usage_totals(user.id, period)
             
             if not usage_data:
                 # Initialize if not exists
+                redis_key = UsageTrackingService.get_redis_key(user.id, period)
                 redis_client.hset(redis_key, mapping={
                     'api_calls': 0,
                     'webhooks': 0,
                     'analytics': 0,
                 })
-                redis_client.expire(redis_key, 60 * 60 * 24 * 35)
-                usage_data = {'api_calls': '0', 'webhooks': '0', 'analytics': '0'}
+                redis_client.expire(redis_key, USAGE_KEY_TTL)
+                usage_data = dict.fromkeys(USAGE_FIELDS, 0)
             
             subscription = user.billing_subscription
             plan = subscription.plan
             
-            api_calls_used = int(usage_data.get('api_calls', 0))
-            webhooks_used = int(usage_data.get('webhooks', 0))
-            analytics_used = int(usage_data.get('analytics', 0))
+            api_calls_used = usage_data.get('api_calls', 0)
+            webhooks_used = usage_data.get('webhooks', 0)
+            analytics_used = usage_data.get('analytics', 0)
             
             return {
                 'api_calls_used': api_calls_used,
@@ -191,11 +322,8 @@ class UsageTrackingService:
     def check_api_limit(user):
         """Check if user has reached API limit"""
         try:
-            usage = UsageTrackingService.get_current_usage(user)
-            if not usage:
-                return False
-            
-            return usage['api_calls_used'] >= usage['api_calls_limit']
+            used = UsageTrackingService.get_cached_totals(user.id)['api_calls']
+            return used >= user.billing_subscription.plan.api_limit
             
         except Exception as e:
             logger.error(f"Error checking API limit: {str(e)}")
@@ -205,11 +333,8 @@ class UsageTrackingService:
     def check_webhook_limit(user):
         """Check if user has reached webhook limit"""
         try:
-            usage = UsageTrackingService.get_current_usage(user)
-            if not usage:
-                return False
-            
-            return usage['webhooks_used'] >= usage['webhooks_limit']
+            used = UsageTrackingService.get_cached_totals(user.id)['webhooks']
+            return used >= user.billing_subscription.plan.webhook_limit
             
         except Exception as e:
             logger.error(f"Error checking webhook limit: {str(e)}")
@@ -240,9 +365,8 @@ class UsageTrackingService:
         try:
             now = timezone.now()
             period = now.strftime('%Y-%m')
-            redis_key = UsageTrackingService.get_redis_key(user.id, period)
             
-            usage_data = redis_client.hgetall(redis_key)
+            usage_data = UsageTrackingService.get_usage_totals(user.id, period)
             if not usage_data:
                 return
             
@@ -256,9 +380,9 @@ class UsageTrackingService:
             ).first()
             
             if usage_record:
-                usage_record.api_calls_used = int(usage_data.get('api_calls', 0))
-                usage_record.webhooks_used = int(usage_data.get('webhooks', 0))
-                usage_record.analytics_requests = int(usage_data.get('analytics', 0))
+                usage_record.api_calls_used = usage_data.get('api_calls', 0)
+                usage_record.webhooks_used = usage_data.get('webhooks', 0)
+                usage_record.analytics_requests = usage_data.get('analytics', 0)
                 usage_record.save()
                 
                 logger.info(f"Synced usage to database for user {user.email}")
@@ -0,0 +1,387 @@
+"""
+Vectorized transaction distributions (percentiles, histograms, heatmaps)
+
+A merchant's window is read with one values_list stream into compact NumPy
+columns: amounts in int64 minor units, epoch seconds, and uint8 codes for
+status, provider and currency, all computed by the database so the stream
+only carries integers. An hour-of-week code is derived once per load.
+Distributions are then pure array operations: one sort for per-currency
+amount percentiles and histograms, and bincounts for everything else.
+
+Loaded frames are kept per process in an LRU bounded by
+VECTOR_ANALYTICS_MEMORY_BUDGET bytes and reused for VECTOR_ANALYTICS_TTL
+seconds; a request for a shorter window slices a cached longer one. Loads
+reserve their size against the same budget before they start, and only one
+load per merchant runs at a time; concurrent misses wait for it.
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.conf import settings
+from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+from .models import Transaction, PaymentProvider, CURRENCY_CHOICES
+from .exceptions import AnalyticsWindowTooLarge, AnalyticsBusy
+
+logger = logging.getLogger(__name__)
+
+STATUSES = tuple(code for code, _ in Transaction.STATUS_CHOICES)
+PROVIDERS = tuple(code for code, _ in PaymentProvider.PROVIDER_CHOICES)
+CURRENCIES = tuple(code for code, _ in CURRENCY_CHOICES)
+UNKNOWN_CODE = 255
+
+COMPLETED = STATUSES.index('completed')
+PERCENTILES = (50, 75, 90, 95, 99)
+HISTOGRAM_BINS = 20
+
+HOURS_PER_WEEK = 7 * 24
+
+# Completed amounts are sorted as (currency code << 56 | minor units); 15-digit amounts fit in 56 bits
+CURRENCY_SHIFT = 56
+AMOUNT_MASK = (1 << CURRENCY_SHIFT) - 1
+
+# One values_list row, decoded by np.fromiter straight into the frame's column types
+ROW_DTYPE = np.dtype([
+    ('amount', np.int64), ('created', np.int64),
+    ('status', np.uint8), ('provider', np.uint8), ('currency', np.uint8),
+])
+
+# The row columns plus hour of week (uint8)
+ROW_BYTES = ROW_DTYPE.itemsize + 1
+
+
+class EpochSeconds(models.Func):
+    """Whole seconds since the Unix epoch"""
+    output_field = models.BigIntegerField()
+    template = 'UNIX_TIMESTAMP(%(expressions)s)'
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='FLOOR(EXTRACT(EPOCH FROM %(expressions)s))::bigint', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="CAST(strftime('%%%%s', %(expressions)s) AS INTEGER)", **extra_context)
+
+
+def _hour_of_week(created):
+    """Monday-first weekday * 24 + UTC hour (the epoch began on a Thursday)"""
+    days, seconds = np.divmod(created, 86400)
+    return (((days + 3) % 7) * 24 + seconds // 3600).astype(np.uint8)
+
+
+def _code(field, choices):
+    return Case(
+        *[When(**{field: value}, then=Value(index)) for index, value in enumerate(choices)],
+        default=Value(UNKNOWN_CODE),
+        output_field=models.IntegerField(),
+    )
+
+
+class TransactionFrame:
+    """Column arrays for one merchant's transactions since `since` (epoch seconds), oldest first"""
+
+    def __init__(self, since, amount, created, status, provider, currency, hour_of_week=None):
+        self.since = since
+        self.amount = amount
+        self.created = created
+        self.status = status
+        self.provider = provider
+        self.currency = currency
+        if hour_of_week is None:
+            hour_of_week = _hour_of_week(created)
+        self.hour_of_week = hour_of_week
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.amount)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (
+            self.amount, self.created, self.status, self.provider, self.currency, self.hour_of_week,
+        ))
+
+    def since_epoch(self, since):
+        """View of the rows created at or after `since`; shares memory with this frame"""
+        start = int(np.searchsorted(self.created, since, side='left'))
+        return TransactionFrame(
+            since, self.amount[start:], self.created[start:], self.status[start:],
+            self.provider[start:], self.currency[start:], self.hour_of_week[start:],
+        )
+
+    @staticmethod
+    def queryset(user_id, since):
+        since_dt = datetime.fromtimestamp(since, tz=dt_timezone.utc)
+        return Transaction.objects.filter(user_id=user_id, created_at__gte=since_dt)
+
+    @classmethod
+    def load(cls, user_id, since, capacity=None, chunk_size=None):
+        """
+        Stream a merchant's rows created at or after `since` into arrays. Each
+        chunk is decoded straight into preallocated typed columns, so peak memory
+        is the frame itself plus one chunk.
+        """
+        chunk_size = chunk_size or getattr(settings, 'VECTOR_ANALYTICS_CHUNK_SIZE', 50000)
+        queryset = cls.queryset(user_id, since)
+        if capacity is None:
+            capacity = queryset.count()
+
+        columns = {name: np.empty(capacity, dtype=ROW_DTYPE[name]) for name in ROW_DTYPE.names}
+        rows = queryset.order_by('created_at').values_list(
+            Cast(Round(F('amount') * 100), models.BigIntegerField()),
+            EpochSeconds('created_at'),
+            _code('status', STATUSES),
+            _code('provider', PROVIDERS),
+            _code('currency', CURRENCIES),
+        ).iterator(chunk_size=chunk_size)
+
+        size = 0
+        while True:
+            block = np.fromiter(itertools.islice(rows, chunk_size), dtype=ROW_DTYPE)
+            if not len(block):
+                break
+            end = size + len(block)
+            if end > capacity:
+                # Rows created since the count was taken
+                capacity = max(end, capacity + capacity // 8)
+                for column in columns.values():
+                    column.resize(capacity, refcheck=False)
+            for name, column in columns.items():
+                column[size:end] = block[name]
+            size = end
+
+        if size < capacity:
+            for column in columns.values():
+                column.resize(size, refcheck=False)
+
+        hour_of_week = np.empty(size, dtype=np.uint8)
+        for start in range(0, size, chunk_size):
+            hour_of_week[start:start + chunk_size] = _hour_of_week(columns['created'][start:start + chunk_size])
+
+        return cls(
+            since, columns['amount'], columns['created'], columns['status'],
+            columns['provider'], columns['currency'], hour_of_week,
+        )
+
+
+class FrameCache:
+    """Per-process LRU of TransactionFrames bounded by total array bytes"""
+
+    def __init__(self):
+        self.budget = getattr(settings, 'VECTOR_ANALYTICS_MEMORY_BUDGET', 256 * 1024 * 1024)
+        self.ttl = getattr(settings, 'VECTOR_ANALYTICS_TTL', 60)
+        self.load_wait = getattr(settings, 'VECTOR_ANALYTICS_LOAD_WAIT', 30)
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self._reserved = 0
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def get(self, user_id, since):
+        """A fresh cached frame for the user that covers `since`, sliced to it"""
+        with self._lock:
+            frame = self._frames.get(user_id)
+            if frame is None:
+                return None
+            if time.monotonic() - frame.loaded_at > self.ttl:
+                self._evict(user_id)
+                return None
+            if frame.since > since:
+                return None
+            self._frames.move_to_end(user_id)
+        return frame.since_epoch(since)
+
+    def put(self, user_id, frame):
+        nbytes = frame.nbytes
+        with self._lock:
+            if user_id in self._frames:
+                self._evict(user_id)
+            # A frame over the whole budget is used once and not kept
+            if nbytes > self.budget:
+                return
+            self._frames[user_id] = frame
+            self._bytes += nbytes
+            while self._bytes + self._reserved > self.budget and next(iter(self._frames)) != user_id:
+                self._evict(next(iter(self._frames)))
+
+    def get_or_load(self, user_id, since, load):
+        """
+        Cached frame covering `since`, or the frame returned by load(), sliced
+        to it. Only one load per user runs at a time; other requests wait for it
+        and then read the cache.
+        """
+        while True:
+            frame = self.get(user_id, since)
+            if frame is not None:
+                return frame
+            with self._lock:
+                loading = self._loading.get(user_id)
+                if loading is None:
+                    loading = self._loading[user_id] = threading.Event()
+                    break
+            if not loading.wait(self.load_wait):
+                raise AnalyticsBusy()
+
+        try:
+            frame = load()
+            self.put(user_id, frame)
+            return frame.since_epoch(since)
+        finally:
+            with self._lock:
+                del self._loading[user_id]
+            loading.set()
+
+    def reserve(self, nbytes):
+        """
+        Claim budget for a frame about to be loaded, evicting cached frames to
+        make room; waits for other loads to finish if they hold the rest
+        """
+        deadline = time.monotonic() + self.load_wait
+        with self._lock:
+            while True:
+                while self._frames and self._bytes + self._reserved + nbytes > self.budget:
+                    self._evict(next(iter(self._frames)))
+                if self._bytes + self._reserved + nbytes <= self.budget:
+                    self._reserved += nbytes
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise AnalyticsBusy()
+                self._released.wait(remaining)
+
+    def release(self, nbytes):
+        with self._lock:
+            self._reserved -= nbytes
+            self._released.notify_all()
+
+    def _evict(self, user_id):
+        frame = self._frames.pop(user_id)
+        self._bytes -= frame.nbytes
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+
+frame_cache = FrameCache()
+
+
+def _percentile(ordered, q):
+    """Linear-interpolated percentile of a sorted array (numpy's default method)"""
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return float(ordered[lower]) + (float(ordered[upper]) - float(ordered[lower])) * (position - lower)
+
+
+def _amount_stats(ordered):
+    """Summary, percentiles and a log-spaced histogram of sorted minor-unit amounts, in major units"""
+    lowest, highest = int(ordered[0]), int(ordered[-1])
+    if lowest == highest:
+        edges = np.array([lowest, highest])
+    else:
+        edges = np.unique(np.geomspace(max(lowest, 1), highest, HISTOGRAM_BINS + 1).round())
+        edges[0], edges[-1] = min(edges[0], lowest), highest
+    # Bins are half-open except the last, which includes the maximum
+    positions = np.searchsorted(ordered, edges, side='left')
+    positions[-1] = len(ordered)
+    total = int(ordered.sum())
+    return {
+        'count': int(len(ordered)),
+        'total': total / 100,
+        'min': lowest / 100,
+        'max': highest / 100,
+        'mean': total / len(ordered) / 100,
+        'percentiles': {f'p{q}': _percentile(ordered, q) / 100 for q in PERCENTILES},
+        'histogram': {
+            'edges': [float(edge) / 100 for edge in edges],
+            'counts': np.diff(positions).tolist(),
+        },
+    }
+
+
+def compute_distribution(frame, currency=None):
+    """Distribution metrics for a frame; amounts only cover completed transactions"""
+    completed = frame.status == COMPLETED
+
+    # One sort of (currency, amount) keys groups completed amounts by currency, in order
+    keys = (frame.currency[completed].astype(np.int64) << CURRENCY_SHIFT) | frame.amount[completed]
+    keys.sort()
+    bounds = np.searchsorted(keys, np.arange(len(CURRENCIES) + 1, dtype=np.int64) << CURRENCY_SHIFT)
+    amounts = {}
+    for code, name in enumerate(CURRENCIES):
+        if bounds[code] == bounds[code + 1] or (currency and name != currency):
+            continue
+        amounts[name] = _amount_stats(keys[bounds[code]:bounds[code + 1]] & AMOUNT_MASK)
+
+    status_counts = np.bincount(frame.status, minlength=len(STATUSES))
+    provider_counts = np.bincount(frame.provider.astype(np.intp) * 2 + completed, minlength=len(PROVIDERS) * 2).reshape(-1, 2)
+    weekly = np.bincount(frame.hour_of_week.astype(np.intp) * 2 + completed, minlength=HOURS_PER_WEEK * 2).reshape(7, 24, 2)
+    heatmap = weekly.sum(axis=2)
+    hourly = heatmap.sum(axis=0)
+    hourly_completed = weekly[:, :, 1].sum(axis=0)
+
+    return {
+        'transactions': int(len(frame)),
+        'amounts': amounts,
+        'by_status': {status: int(status_counts[code]) for code, status in enumerate(STATUSES) if status_counts[code]},
+        'by_provider': {
+            provider: {
+                'count': int(provider_counts[code].sum()),
+                'success_rate': float(provider_counts[code, 1]) / float(provider_counts[code].sum()),
+            }
+            for code, provider in enumerate(PROVIDERS) if provider_counts[code].any()
+        },
+        'heatmap': {
+            'weekdays': ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'],
+            'counts': heatmap.tolist(),
+        },
+        'hourly_success_rate': [
+            float(done) / float(total) if total else None
+            for done, total in zip(hourly_completed, hourly)
+        ],
+    }
+
+
+class DistributionService:
+    """Percentile and distribution analytics over cached transaction frames"""
+
+    @staticmethod
+    def get_frame(user_id, days):
+        since = int((timezone.now() - timedelta(days=days)).timestamp())
+        return frame_cache.get_or_load(user_id, since, lambda: DistributionService.load_frame(user_id, since))
+
+    @staticmethod
+    def load_frame(user_id, since):
+        """
+        Load the longest window that fits the memory budget, so shorter ones
+        slice the cached frame; the requested window if only that fits
+        """
+        widest = int((timezone.now() - timedelta(days=settings.VECTOR_ANALYTICS_MAX_DAYS)).timestamp())
+        start = min(widest, since)
+        rows = TransactionFrame.queryset(user_id, start).count()
+        if rows * ROW_BYTES > frame_cache.budget and start < since:
+            start = since
+            rows = TransactionFrame.queryset(user_id, start).count()
+        if rows * ROW_BYTES > frame_cache.budget:
+            raise AnalyticsWindowTooLarge()
+
+        nbytes = rows * ROW_BYTES
+        frame_cache.reserve(nbytes)
+        try:
+            return TransactionFrame.load(user_id, start, capacity=rows)
+        finally:
+            frame_cache.release(nbytes)
+
+    @staticmethod
+    def get_distribution(user, days=30, currency=None):
+        frame = DistributionService.get_frame(user.id, days)
+        distribution = compute_distribution(frame, currency)
+        distribution['days'] = days
+        return distribution
@@ -8,8 +8,9 @@ from rest_framework.exceptions import ValidationError as DRFValidationError
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
 import requests
 import hmac
 import hashlib
@@ -27,13 +28,19 @@ from .serializers import (
     AuditLogSerializer, KYCVerificationSerializer, InvoiceSerializer,
     UsageMetricSerializer, RegistrationSerializer
 )
-from .permissions import IsOwner
+from .permissions import IsOwner, IsAdminUser
 from .kyc_service import KYCService
 from .analytics_service import AnalyticsService
+from .analytics_engine import DashboardAnalytics
 from .billing_service import BillingService
 from .payment_service import PaymentService
 from .exceptions import KYCVerificationFailed, InvalidAPIKey
 from .unified_payment_gateway import UnifiedPaymentGateway
+from .transaction_export import EXPORT_FORMATS, stream_export
+from .vector_analytics import DistributionService
+from .pagination import KeysetPagination
+from .fast_serializers import FastListMixin
+from .filters import TransactionSearchFilter
 # process_transaction_webhook moved to webhook_tasks.py
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
@@ -426,16 +433,17 @@ class APIKeyViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def activity(self, request):
         """Get API key usage activity"""
-        from django.db.models import Count
+        from django.db.models import Sum
         from datetime import timedelta
         
         thirty_days_ago = timezone.now() - timedelta(days=30)
         
+        # Logs are sampled, so weights rather than rows give the call count
         activity = APILog.objects.filter(
             user=request.user,
             created_at__gte=thirty_days_ago
         ).values('api_key__id', 'api_key__name').annotate(
-            total_calls=Count('id')
+            total_calls=Sum('sample_weight')
         ).order_by('-total_calls')
         
         return Response(list(activity))
@@ -499,17 +507,45 @@ class PaymentProviderViewSet(viewsets.ModelViewSet):
         return ip
 
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, TransactionSearchFilter]
     filterset_fields = ['status', 'provider', 'currency']
-    ordering_fields = ['created_at', 'amount']
+    # ?ordering= is applied by the paginator; each ordering has a (user, field, id) index
+    pagination_class = KeysetPagination
+    keyset_orderings = ('created_at', 'amount')
     search_fields = ['reference', 'customer_email']
+    # JSON columns the list can add with ?include=metadata,provider_response
+    fast_list_includes = ('metadata', 'provider_response')
     
     def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user).select_related('api_key')
     
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Stream the merchant's transactions as CSV (default) or NDJSON
+        GET /api/v1/transactions/export/?export_format=ndjson&status=completed
+        Accepts the same status/provider/currency and search parameters as the list.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({
+                'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Filters without select_related; the export reads plain columns only
+        queryset = self.filter_queryset(Transaction.objects.filter(user=request.user))
+        
+        response = StreamingHttpResponse(
+            stream_export(queryset, export_format, asynchronous=isinstance(request._request, ASGIRequest)),
+            content_type=EXPORT_FORMATS[export_format]
+        )
+        filename = f"transactions-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
     @action(detail=False, methods=['post'], url_path='pay')
     def unified_payment(self, request):
         """
@@ -767,81 +803,8 @@ class AnalyticsViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
         """Get dashboard analytics - same format as GraphQL"""
-        from django.db.models import Sum, Count, Avg
-        from datetime import datetime, timedelta
-        from decimal import Decimal
-        
-        user = request.user
-        
-        # Total transactions
-        total_transactions = Transaction.objects.filter(user=user).count()
-        
-        # Total volume (completed only)
-        total_volume_result = Transaction.objects.filter(
-            user=user, status='completed'
-        ).aggregate(total=Sum('amount'))
-        total_volume = float(total_volume_result['total'] or Decimal('0'))
-        
-        # Success rate
-        if total_transactions > 0:
-            successful = Transaction.objects.filter(user=user, status='completed').count()
-            success_rate = (successful / total_transactions) * 100
-        else:
-            success_rate = 0.0
-        
-        # Average transaction size
-        avg_result = Transaction.objects.filter(
-            user=user, status='completed'
-        ).aggregate(avg=Avg('amount'))
-        average_transaction_size = float(avg_result['avg'] or Decimal('0'))
-        
-        # Transactions by provider
-        providers = Transaction.objects.filter(user=user).values('provider').annotate(
-            count=Count('id'),
-            volume=Sum('amount')
-        )
-        transactions_by_provider = {
-            p['provider']: {
-                'count': p['count'],
-                'volume': float(p['volume'] or 0)
-            }
-            for p in providers
-        }
-        
-        # Transactions by status
-        statuses = Transaction.objects.filter(user=user).values('status').annotate(
-            count=Count('id')
-        )
-        transactions_by_status = {s['status']: s['count'] for s in statuses}
-        
-        # Daily volume (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        daily_data = Transaction.objects.filter(
-            user=user,
-            created_at__gte=thirty_days_ago
-        ).values('created_at__date').annotate(
-            volume=Sum('amount'),
-            count=Count('id')
-        ).order_by('created_at__date')
-        
-        daily_volume = [
-            {
-                'date': str(d['created_at__date']),
-                'volume': float(d['volume'] or 0),
-                'count': d['count']
-            }
-            for d in daily_data
-        ]
-        
-        return Response({
-            'total_transactions': total_transactions,
-            'total_volume': total_volume,
-            'success_rate': success_rate,
-            'average_transaction_size': average_transaction_size,
-            'transactions_by_provider': transactions_by_provider,
-            'transactions_by_status': transactions_by_status,
-            'daily_volume': daily_volume
-        })
+        # Built from the summary and breakdown entries GraphQL caches too
+        return Response(DashboardAnalytics(request.user).dashboard())
     
     @action(detail=False, methods=['get'])
     def transactions(self, request):
@@ -860,6 +823,21 @@ class AnalyticsViewSet(viewsets.ViewSet):
         days = int(request.query_params.get('days', 30))
         analytics = AnalyticsService.get_revenue_analytics(request.user, days)
         return Response(analytics)
+    
+    @action(detail=False, methods=['get'])
+    def distribution(self, request):
+        """
+        Amount percentiles and histograms, status/provider breakdowns and an hour-of-day heatmap
+        GET /api/v1/analytics/distribution/?days=30&currency=NGN
+        """
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        days = max(1, min(days, settings.VECTOR_ANALYTICS_MAX_DAYS))
+        currency = request.query_params.get('currency')
+        
+        return Response(DistributionService.get_distribution(request.user, days, currency))
 
 
 class BillingViewSet(viewsets.ViewSet):
@@ -891,13 +869,16 @@ class BillingViewSet(viewsets.ViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     """Audit logs - read only"""
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['action']
-    ordering_fields = ['created_at']
+    pagination_class = KeysetPagination
+    keyset_orderings = ('created_at',)
+    # Listed without details unless ?include=details
+    fast_list_deferred = ('details',)
     
     def get_queryset(self):
         return AuditLog.objects.filter(user=self.request.user)
@@ -946,4 +927,19 @@ class HealthCheckView(APIView):
         if health_status['status'] == 'healthy':
             return Response(health_status, status=status.HTTP_200_OK)
         else:
-            return Response(health_status, status=status.HTTP_503_SERVICE_UNAVAILABLE)
\ No newline at end of file
+            return Response(health_status, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class HealthInternalsView(APIView):
+    """In-process counters of the worker that serves the request; staff only"""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        from .rate_limiting import rate_limiter
+        from .api_log_writer import api_log_writer
+        
+        return Response({
+            'timestamp': timezone.now().isoformat(),
+            'rate_limiter': rate_limiter.metrics(),
+            'api_log_writer': api_log_writer.stats(),
+        })
\ No newline at end of file
@@ -7,7 +7,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Avg, Q
+from django.db.models import Count, Avg, Q, Exists, OuterRef
 from django.utils import timezone
 from datetime import timedelta
 from .webhook_models import (
@@ -19,6 +19,8 @@ from .webhook_serializers import (
 )
 from .webhook_tasks import deliver_client_webhook
 from .models import AuditLog
+from .pagination import KeysetPagination
+from .fast_serializers import FastListMixin
 
 logger = logging.getLogger(__name__)
 
@@ -299,18 +301,27 @@ class WebhookSubscriptionViewSet(viewsets.ModelViewSet):
         return ip
 
 
-class WebhookEventViewSet(viewsets.ReadOnlyModelViewSet):
+class WebhookEventViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     View incoming webhook events (for debugging and replay)
     """
     serializer_class = WebhookEventSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_default_ordering = '-received_at'
+    keyset_orderings = ('received_at',)
+    # Listed without the provider payload unless ?include=raw_payload
+    fast_list_deferred = ('raw_payload',)
     
     def get_queryset(self):
         # Only show events that resulted in deliveries to this user's webhooks
+        # (a semi-join, so no DISTINCT over the payload column)
         return WebhookEvent.objects.filter(
-            deliveries__webhook_subscription__user=self.request.user
-        ).distinct().order_by('-received_at')
+            Exists(WebhookDeliveryLog.objects.filter(
+                webhook_event=OuterRef('pk'),
+                webhook_subscription__user=self.request.user,
+            ))
+        ).order_by('-received_at')
     
     @action(detail=True, methods=['post'])
     def replay(self, request, pk=None):
@@ -345,12 +356,16 @@ class WebhookEventViewSet(viewsets.ReadOnlyModelViewSet):
         })
 
 
-class WebhookDeliveryLogViewSet(viewsets.ReadOnlyModelViewSet):
+class WebhookDeliveryLogViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     View webhook delivery logs
     """
     serializer_class = WebhookDeliveryLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_orderings = ('created_at',)
+    # Listed without the endpoint's response unless ?include=response_body
+    fast_list_deferred = ('response_body',)
     
     def get_queryset(self):
         return WebhookDeliveryLog.objects.filter(
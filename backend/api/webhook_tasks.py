@@ -17,6 +17,7 @@ from .webhook_models import (
 from .models import Transaction, AuditLog
 from .billing_models import Payment, BillingSubscription
 from .redis_pubsub import publish_event
+from .analytics_cache import analytics_cache
 
 logger = logging.getLogger(__name__)
 
@@ -381,6 +382,8 @@ def deliver_client_webhook(self, subscription_id, webhook_event_id, event_type,
             'attempt': attempt_number,
             'timestamp': timezone.now().isoformat()
         })
+        # Delivery counts feed the merchant's system health analytics
+        analytics_cache.bump(subscription.user_id)
         
     except (WebhookSubscription.DoesNotExist, WebhookEvent.DoesNotExist) as e:
         logger.error(f"Webhook delivery failed - not found: {str(e)}")
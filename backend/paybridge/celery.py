@@ -28,6 +28,26 @@ app.conf.beat_schedule = {
         'task': 'api.webhook_tasks.calculate_webhook_metrics',
         'schedule': crontab(minute=0),  # Every hour
     },
+    'flush-api-key-last-used': {
+        'task': 'api.tasks.flush_api_key_last_used',
+        'schedule': crontab(minute='*'),  # Every minute
+    },
+    'maintain-log-partitions': {
+        'task': 'api.tasks.maintain_log_partitions',
+        'schedule': crontab(hour='*/6', minute=15),  # Every 6 hours
+    },
+    'compact-usage-rollups': {
+        'task': 'api.tasks.compact_usage_rollups',
+        'schedule': crontab(minute='*/15'),  # Every 15 minutes
+    },
+    'cleanup-old-logs': {
+        'task': 'api.tasks.cleanup_old_logs',
+        'schedule': crontab(hour=3, minute=30),  # Daily
+    },
+    'cleanup-data-exports': {
+        'task': 'api.tasks.cleanup_data_exports',
+        'schedule': crontab(hour=4, minute=0),  # Daily
+    },
 }
 
 @app.task(bind=True)
@@ -205,7 +205,7 @@ SESSION_CACHE_ALIAS = 'default'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.principal_cache.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -326,6 +326,13 @@ GRAPHENE = {
     ),
 }
 
+# GraphQL documents are parsed and validated once per process; clients may send
+# persisted query hashes (Apollo APQ) instead of the query text
+GRAPHQL_DOCUMENT_CACHE_SIZE = 500
+GRAPHQL_APQ_TTL = 86400  # seconds a registered query text stays resolvable by hash
+GRAPHQL_MAX_DEPTH = config('GRAPHQL_MAX_DEPTH', default=10, cast=int)
+GRAPHQL_MAX_COST = config('GRAPHQL_MAX_COST', default=5000, cast=int)
+
 
 # ===========================
 # BILLING & PAYMENT PROVIDERS
@@ -359,6 +366,124 @@ REDIS_DB = config('REDIS_DB', default=0, cast=int)
 REDIS_PASSWORD = config('REDIS_PASSWORD', default=None)
 
 
+# ===========================
+# USAGE TRACKING
+# ===========================
+
+# Hot users get their usage hash split across shards (see usage_tracking_service)
+USAGE_MAX_SHARDS = config('USAGE_MAX_SHARDS', default=16, cast=int)
+USAGE_SHARD_TARGET_RATE = config('USAGE_SHARD_TARGET_RATE', default=200, cast=int)  # writes/sec per shard
+USAGE_RATE_SAMPLE_EVERY = config('USAGE_RATE_SAMPLE_EVERY', default=16, cast=int)
+USAGE_SHARD_COUNT_CACHE_TTL = 30  # seconds
+USAGE_TOTAL_CACHE_TTL = config('USAGE_TOTAL_CACHE_TTL', default=5, cast=int)  # seconds
+
+# Rate limit tokens are leased from Redis in batches and spent in-process
+RATE_LIMIT_LEASE_MIN = 1
+RATE_LIMIT_LEASE_MAX = config('RATE_LIMIT_LEASE_MAX', default=50, cast=int)
+RATE_LIMIT_LEASE_MAX_FRACTION = config('RATE_LIMIT_LEASE_MAX_FRACTION', default=0.02, cast=float)  # of the route limit
+RATE_LIMIT_LEASE_TTL = config('RATE_LIMIT_LEASE_TTL', default=1.0, cast=float)  # seconds
+
+# Proxies/load balancers whose X-Forwarded-For is trusted when resolving client IPs
+TRUSTED_PROXIES = [
+    proxy.strip() for proxy in config(
+        'TRUSTED_PROXIES',
+        default='127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16'
+    ).split(',') if proxy.strip()
+]
+
+# API key authentication cache: per-process LRU in front of the shared cache
+API_KEY_CACHE_TTL = 300  # seconds
+API_KEY_CACHE_LOCAL_TTL = config('API_KEY_CACHE_LOCAL_TTL', default=30, cast=int)  # seconds
+API_KEY_CACHE_LOCAL_MAXSIZE = 10000
+
+# Streaming transaction export reads this many rows per server-side cursor fetch
+TRANSACTION_EXPORT_CHUNK_SIZE = 2000
+
+# Background Parquet exports (DataExportJob) are written to the 'exports' storage under <job id>/.
+# Web and worker dynos do not share a filesystem, so production sets EXPORT_STORAGE_BUCKET to
+# keep exports in S3 (credentials from the standard AWS_* environment variables); downloads then
+# redirect to signed URLs valid for DATA_EXPORT_URL_EXPIRY seconds. Without a bucket, files are
+# kept under EXPORT_ROOT, which only works when web and workers share a disk (development).
+EXPORT_ROOT = config('EXPORT_ROOT', default=str(BASE_DIR / 'exports'))
+EXPORT_STORAGE_BUCKET = config('EXPORT_STORAGE_BUCKET', default='')
+DATA_EXPORT_URL_EXPIRY = config('DATA_EXPORT_URL_EXPIRY', default=900, cast=int)  # seconds
+if EXPORT_STORAGE_BUCKET:
+    EXPORT_STORAGE = {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            'bucket_name': EXPORT_STORAGE_BUCKET,
+            'location': config('EXPORT_STORAGE_PREFIX', default='exports'),
+            'default_acl': 'private',
+            'querystring_auth': True,
+            'querystring_expire': DATA_EXPORT_URL_EXPIRY,
+            'file_overwrite': True,
+        },
+    }
+else:
+    EXPORT_STORAGE = {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': EXPORT_ROOT},
+    }
+
+# 'default' and 'staticfiles' are Django's defaults; STORAGES replaces them as a whole
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'exports': EXPORT_STORAGE,
+}
+
+DATA_EXPORT_BATCH_SIZE = config('DATA_EXPORT_BATCH_SIZE', default=10000, cast=int)  # rows per record batch
+DATA_EXPORT_ROWS_PER_FILE = config('DATA_EXPORT_ROWS_PER_FILE', default=1000000, cast=int)
+DATA_EXPORT_MAX_DAYS = 366
+DATA_EXPORT_RETENTION_DAYS = config('DATA_EXPORT_RETENTION_DAYS', default=7, cast=int)
+DATA_EXPORT_TIME_LIMIT = config('DATA_EXPORT_TIME_LIMIT', default=6 * 3600, cast=int)  # seconds per job
+# A job still 'running' this long after it started has lost its worker (past the task's hard time limit)
+DATA_EXPORT_STALE_AFTER = DATA_EXPORT_TIME_LIMIT + 900
+
+# JWT principal cache: user id -> account fields and plan tier
+JWT_PRINCIPAL_CACHE_TTL = config('JWT_PRINCIPAL_CACHE_TTL', default=60, cast=int)  # seconds
+JWT_PRINCIPAL_CACHE_LOCAL_TTL = config('JWT_PRINCIPAL_CACHE_LOCAL_TTL', default=5, cast=int)  # seconds
+JWT_PRINCIPAL_CACHE_LOCAL_MAXSIZE = 10000
+
+# Analytics responses are cached per user until a transaction or webhook delivery bumps the user's version
+ANALYTICS_CACHE_TTL = config('ANALYTICS_CACHE_TTL', default=300, cast=int)  # seconds
+ANALYTICS_CACHE_LOCK_TIMEOUT = 10  # seconds a concurrent miss waits for the computing request
+ANALYTICS_LIVE_CACHE_TTL = config('ANALYTICS_LIVE_CACHE_TTL', default=30, cast=int)  # seconds, for payloads that include live API traffic
+
+# Per-day HyperLogLog sketches of each merchant's customers and cards
+CUSTOMER_SKETCH_RETENTION_DAYS = config('CUSTOMER_SKETCH_RETENTION_DAYS', default=400, cast=int)
+CUSTOMER_SKETCH_LOOKBACK_DAYS = 90  # days before a range that make a customer "returning"
+
+# Transaction distributions: per-process NumPy frames of each merchant's last VECTOR_ANALYTICS_MAX_DAYS
+VECTOR_ANALYTICS_MAX_DAYS = 90
+VECTOR_ANALYTICS_MEMORY_BUDGET = config('VECTOR_ANALYTICS_MEMORY_BUDGET', default=256 * 1024 * 1024, cast=int)  # bytes
+VECTOR_ANALYTICS_TTL = config('VECTOR_ANALYTICS_TTL', default=60, cast=int)  # seconds
+VECTOR_ANALYTICS_CHUNK_SIZE = 50000
+VECTOR_ANALYTICS_LOAD_WAIT = 30  # seconds a request waits for another load or for budget
+
+# API request logs are buffered in-process and bulk inserted
+API_LOG_BUFFER_MAXLEN = config('API_LOG_BUFFER_MAXLEN', default=10000, cast=int)  # oldest dropped when full
+API_LOG_BATCH_SIZE = config('API_LOG_BATCH_SIZE', default=500, cast=int)
+API_LOG_FLUSH_INTERVAL = config('API_LOG_FLUSH_INTERVAL', default=2.0, cast=float)  # seconds
+
+# Successful requests are stored 1-in-N per plan tier (errors and slow requests always)
+API_LOG_SAMPLE_RATES = {
+    'free': 1,
+    'starter': 1,
+    'growth': 5,
+    'enterprise': 10,
+}
+API_LOG_SAMPLE_OVERRIDES = {}  # user id -> N for individual merchants
+API_LOG_SLOW_REQUEST_MS = 1000
+API_LOG_TARGET_ROWS_PER_MINUTE = config('API_LOG_TARGET_ROWS_PER_MINUTE', default=600, cast=int)  # per merchant, per process
+API_LOG_MAX_SAMPLE_RATE = 1000
+
+# Log retention; on Postgres the log tables are partitioned by created_at
+API_LOG_RETENTION_DAYS = config('API_LOG_RETENTION_DAYS', default=90, cast=int)
+AUDIT_LOG_RETENTION_DAYS = config('AUDIT_LOG_RETENTION_DAYS', default=365, cast=int)
+LOG_PARTITION_PREMAKE = 7  # future partitions kept ready
+
+
 # ============================================
 # Webhook Configuration
 # ============================================
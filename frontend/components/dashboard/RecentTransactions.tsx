@@ -17,22 +17,26 @@ export function RecentTransactions() {
     const fetchTransactions = async () => {
       const query = `
         query {
-          transactions {
-            id
-            reference
-            amount
-            currency
-            status
-            provider
-            customerEmail
-            description
-            createdAt
+          transactions(first: 10) {
+            edges {
+              node {
+                id
+                reference
+                amount
+                currency
+                status
+                provider
+                customerEmail
+                description
+                createdAt
+              }
+            }
           }
         }
       `
       const response = await graphQLQuery<any>(query)
       if (response.data?.transactions) {
-        const txns = response.data.transactions.map((txn: any) => ({
+        const txns = response.data.transactions.edges.map(({ node: txn }: any) => ({
           id: txn.id,
           reference: txn.reference,
           amount: parseFloat(txn.amount),